@@ -2,7 +2,6 @@ import pandas as pd
 import plotly.graph_objs as go
 from plotly.subplots import make_subplots
 import yfinance as yf
-import ta
 import numpy as np
 import numpy_financial as npf
 # Heavy AI imports moved to local scope for memory efficiency on Render
@@ -19,10 +18,12 @@ import json
 import plotly.express as px
 import random
 import re
+import secrets
 
 # FastAPI imports
 from fastapi import FastAPI, HTTPException, Depends, Request, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 from starlette.concurrency import run_in_threadpool
 from typing import List, Optional, Dict, Any
@@ -37,18 +38,21 @@ VERCEL_FRONTEND_URL = "https://stockseer--ai.vercel.app"
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
+import deadline as request_deadline
 
 class TimeoutAdapter(HTTPAdapter):
     def __init__(self, *args, **kwargs):
         self.timeout = kwargs.pop('timeout', 25) # 25s timeout for individual requests
         super().__init__(*args, **kwargs)
     def send(self, request, **kwargs):
-        kwargs['timeout'] = kwargs.get('timeout', self.timeout)
+        # Never wait past the incoming request's deadline budget (deadline.py)
+        kwargs['timeout'] = request_deadline.timeout(kwargs.get('timeout') or self.timeout)
         return super().send(request, **kwargs)
 
 def create_yf_session():
     session = requests.Session()
-    retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+    # 429s are not retried here: upstream_scheduler backs off every worker instead
+    retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504])
     adapter = TimeoutAdapter(max_retries=retries)
     session.mount('https://', adapter)
     session.mount('http://', adapter)
@@ -89,6 +93,32 @@ from about_tab import (
     render_about_tab
 )
 from company_mappings import get_company_name
+from singleflight import SingleFlight
+from market_data_provider import market_data
+from tiered_cache import data_cache, FRESH, NAMESPACES
+from market_calendar import ttl_for, market_status
+from upstream_scheduler import (
+    upstream_scheduler, UpstreamThrottled, YAHOO, BATCH, is_rate_limit_error, priority
+)
+from ohlcv_store import ohlcv_store, slice_period, period_days
+from resample_utils import BASE_INTERVAL, BASE_PERIOD, BASE_MAX_DAYS, can_resample, resample_ohlcv
+from history_cache import history_cache
+from indicator_cache import indicator_cache
+import indicator_engine
+from indicator_state import latest_indicators
+from info_cache import info_cache
+from ticker_validity import ticker_validity, is_invalid_symbol_error
+import cache_metrics
+import circuit_breaker
+from circuit_breaker import CircuitOpen, yfinance_breaker, gemini_breaker, breaker_for_url
+from deadline import DeadlineExceeded, deadline_scope, budget_from_header, BUDGET_HEADER
+import hedging
+from hedging import quote_hedger, history_hedger, chart_hedger
+from quote_store import get_daily_history
+from prewarm import start_prewarmer, stop_prewarmer, DEFAULT_WATCHLIST, hot_symbols
+from cache_snapshot import start_snapshots, stop_snapshots
+import yahoo_client
+from yahoo_client import YahooClientError, YahooSymbolNotFound
 import os
 from dotenv import load_dotenv
 # genai is now imported locally in _get_gemini_model to save startup memory
@@ -627,32 +657,24 @@ market_icons = {
     "Swedish": "🇸🇪", "Norwegian": "🇳🇴", "Danish": "🇩🇰", "Finnish": "🇫🇮",
     "Israeli": "🇮🇱", "New Zealand": "🇳🇿", "South African": "🇿🇦"
 }
-class RateLimiter:
-    def __init__(self, max_requests=30, time_window=60):
-        self.max_requests = max_requests
-        self.time_window = time_window
-        self.requests = []
-    
-    def acquire(self):
-        now = datetime.now()
-        # Remove old requests outside the time window
-        self.requests = [req_time for req_time in self.requests 
-                        if now - req_time < timedelta(seconds=self.time_window)]
-        
-        if len(self.requests) >= self.max_requests:
-            # Instead of sleeping and blocking the event loop, raise a 429
-            # or return False so the handler can raise it.
-            return False
-        
-        self.requests.append(now)
-        return True
+async def ensure_upstream_capacity(detail="Too many requests. Please try again later."):
+    """Fail fast with a 429 while Yahoo's shared budget is exhausted or backing off after a 429."""
+    admitted, retry_after = await upstream_scheduler.available_async(YAHOO)
+    if not admitted:
+        raise HTTPException(status_code=429, detail=detail, headers={"Retry-After": str(max(1, int(retry_after + 0.999)))})
+
+# Quotes and search lookups live in data_cache (tiered_cache.py): bounded LRU + Redis, stale-while-revalidate
+
+# Coalesces concurrent identical yfinance calls (history, quote) into one; .info goes through info_cache
+upstream_flight = SingleFlight()
 
-# Global rate limiter instance
-rate_limiter = RateLimiter(max_requests=30, time_window=60)  # Increased limit
+def quote_ttl(symbol):
+    """Quote freshness: the namespace TTL while the market trades, until the next open once it has closed."""
+    return ttl_for(symbol, NAMESPACES["quote"][0])
 
-# Simple cache for stock info to reduce API calls
-stock_cache = {}
-cache_ttl = 300  # 5 minutes cache TTL
+# Info fields that move with the price may only come from a recently fetched .info
+QUOTE_INFO_MAX_AGE = 300
+SEARCH_INFO_FIELDS = ('regularMarketPrice', 'regularMarketChangePercent')
 
 # Load environment variables
 load_dotenv()
@@ -672,9 +694,11 @@ async def lifespan(app: FastAPI):
         try:
             from database import engine, Base, SQLALCHEMY_AVAILABLE
             from news_worker import start_news_scheduler
+            from quote_store import ensure_hypertable
             if SQLALCHEMY_AVAILABLE and engine:
                 async with engine.begin() as conn:
                     await conn.run_sync(Base.metadata.create_all)
+                await ensure_hypertable()
                 start_news_scheduler()
                 print("[STARTUP] DB & News Scheduler active.")
         except Exception as e:
@@ -682,10 +706,20 @@ async def lifespan(app: FastAPI):
 
     # Kick off background init
     asyncio.create_task(run_migrations_and_worker())
+    # Reload the last cache snapshot in the background, then keep snapshotting
+    start_snapshots()
+    # Keep quotes and daily history for the hot set warm
+    start_prewarmer(
+        warm_stock_info,
+        lambda symbol, period: get_daily_history(symbol, period, fetch_stock_data_async),
+    )
     
     print("[STARTUP] Lifespan yielded. Server should be reachable via port.")
     yield
     print("\n[SHUTDOWN] Stopping processes...")
+    await stop_prewarmer()
+    await stop_snapshots()
+    await yahoo_client.close_client()
 
 # Initialize FastAPI app with lifespan
 app = FastAPI(title="StockSeer API", version="1.0.0", lifespan=lifespan)
@@ -732,21 +766,18 @@ async def get_metals(currency: str = 'USD'):
         rate = exchange_rates.get(currency.upper(), 1.0)
         results = []
         
+        # One batched upstream call for all metals (last close vs previous close)
+        quotes = await run_in_threadpool(get_stock_info_many, [m['symbol'] for m in metal_tickers.values()])
+        
         for code, info in metal_tickers.items():
-            ticker = yf.Ticker(info['symbol'])
-            # Fetch last 2 days to get current price and calculate 24h change
-            hist = ticker.history(period="2d")
+            quote = quotes.get(info['symbol'])
             
-            if len(hist) > 0:
-                current_price = float(hist['Close'].iloc[-1])
+            if quote:
+                current_price = float(quote['price'])
                 
                 # Calculate 24h change
-                change24h = 0.0
-                changePercent24h = 0.0
-                if len(hist) >= 2:
-                    prev_close = float(hist['Close'].iloc[-2])
-                    change24h = current_price - prev_close
-                    changePercent24h = (change24h / prev_close) * 100
+                change24h = float(quote.get('change') or 0.0)
+                changePercent24h = float(quote.get('changePercent') or 0.0)
                 
                 # Convert to Kilograms (1 kg = 32.1507 troy ounces)
                 kg_multiplier = 32.1507
@@ -903,14 +934,13 @@ except Exception as _e:
             if df is None or df.empty:
                 raise HTTPException(status_code=404, detail=f"No data for {symbol}")
 
-            from stock_utils import add_technical_indicators as _add_ti
-            dfi = _add_ti(df)
-            latest = dfi.iloc[-1]
+            # Only the three indicators the score reads, not the whole basic set
+            latest = indicator_engine.latest_values(df, ('RSI', 'MACD_hist', 'SMA_20'))
 
-            rsi = float(latest.get('RSI', 50.0))
-            macd_hist = float(latest.get('MACD_hist', 0.0))
-            close = float(latest.get('Close', 0.0))
-            sma20 = float(latest.get('SMA_20', close))
+            rsi = latest['RSI']
+            macd_hist = latest['MACD_hist']
+            close = float(df['Close'].iloc[-1])
+            sma20 = latest['SMA_20']
 
             score = 0.5
             if rsi < 30:
@@ -926,7 +956,7 @@ except Exception as _e:
             else:
                 score -= 0.05
 
-            returns = dfi['Close'].pct_change().dropna()
+            returns = df['Close'].pct_change().dropna()
             sharpe = float((returns.mean() / (returns.std() + 1e-9)) * _np.sqrt(252)) if not returns.empty else 0.0
             if returns.size > 0:
                 cummax = (1 + returns).cumprod().cummax()
@@ -977,13 +1007,12 @@ def ml_predict_alias(symbol: str, days: int = 5):
         if df is None or df.empty:
             return {"ticker": symbol.upper(), "error": f"No price data available for '{symbol}'."}
 
-        dfi = add_technical_indicators(df)
-        latest = dfi.iloc[-1]
+        latest = indicator_engine.latest_values(df, ('RSI', 'MACD_hist', 'SMA_20'))
 
-        rsi = float(latest.get('RSI', 50.0))
-        macd_hist = float(latest.get('MACD_hist', 0.0))
-        close = float(latest.get('Close', 0.0))
-        sma20 = float(latest.get('SMA_20', close))
+        rsi = latest['RSI']
+        macd_hist = latest['MACD_hist']
+        close = float(df['Close'].iloc[-1])
+        sma20 = latest['SMA_20']
 
         score = 0.5
         if rsi < 30:
@@ -999,7 +1028,7 @@ def ml_predict_alias(symbol: str, days: int = 5):
         else:
             score -= 0.05
 
-        returns = dfi['Close'].pct_change().dropna()
+        returns = df['Close'].pct_change().dropna()
         sharpe = float((returns.mean() / (returns.std() + 1e-9)) * np.sqrt(252)) if not returns.empty else 0.0
         if returns.size > 0:
             cummax = (1 + returns).cumprod().cummax()
@@ -1047,6 +1076,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def request_deadline_budget(request: Request, call_next):
+    """Give each request an upstream time budget; X-Request-Budget-Ms lets callers ask for less (or more, up to a cap)."""
+    with deadline_scope(budget_from_header(request.headers.get(BUDGET_HEADER))):
+        return await call_next(request)
+
 # Dependency to get user subscription from headers
 def get_user_subscription_from_headers(
     x_subscription_plan: str = Header(default="free"),
@@ -1172,6 +1207,7 @@ class StockData(BaseModel):
     open: Optional[float] = None
     previousClose: Optional[float] = None
     currency: Optional[str] = None
+    stale: Optional[bool] = None  # True when Yahoo is unavailable and this is the last good quote
 
 class StockChartData(BaseModel):
     date: str
@@ -1294,13 +1330,19 @@ async def chat_endpoint(req: ChatRequest) -> ChatResponse:
 
 User: {req.message}
 Assistant:"""
-        result = model.generate_content(prompt)
+        result = gemini_breaker.call(model.generate_content, prompt)
         text = (getattr(result, "text", "") or "").strip()
         if not text:
             text = "I'm sorry, I couldn't generate a response right now. Please try again."
         return ChatResponse(reply=text)
     except HTTPException:
         raise
+    except CircuitOpen as e:
+        raise HTTPException(
+            status_code=503,
+            detail="The AI assistant is temporarily unavailable. Please try again shortly.",
+            headers={"Retry-After": str(int(e.retry_after) + 1)}
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
 
@@ -1315,62 +1357,206 @@ def get_currency_symbol(currency_code):
     return symbols.get(str(currency_code).upper(), str(currency_code))
 
 def fetch_stock_data(ticker_symbol, period='1y', interval='1d', max_retries=3):
+    """Fetch OHLCV history; concurrent identical requests share one upstream call."""
+    symbol = str(ticker_symbol).upper()
+    try:
+        if interval != '1d':
+            key = ("history", symbol, period, interval)
+            return upstream_flight.do(key, _fetch_stock_data_stored, ticker_symbol, period, interval, max_retries)
+
+        # Daily bars: answer shorter periods by slicing the longest cached window
+        cached = history_cache.get(symbol, period)
+        if cached is not None:
+            return cached
+        window = history_cache.window_for(period)
+        df = upstream_flight.do(("history", symbol, window, interval), _fetch_stock_data_stored, ticker_symbol, window, interval, max_retries)
+    except DeadlineExceeded as e:
+        print(f"[UPSTREAM] History for {ticker_symbol}: {e}")
+        return _history_past_deadline(ticker_symbol, period, interval)
+    return _slice_daily_window(ticker_symbol, window, period, df)
+
+def _history_past_deadline(ticker_symbol, period, interval):
+    # Only daily windows have a stale copy to fall back on
+    if interval != '1d':
+        return pd.DataFrame()
+    return _slice_daily_window(ticker_symbol, period, period, pd.DataFrame())
+
+def _slice_daily_window(ticker_symbol, window, period, df, invalid=None):
+    symbol = str(ticker_symbol).upper()
+    if df.empty:
+        # Yahoo failed or its breaker is open: an expired window, marked stale, beats no bars
+        if invalid is None:
+            invalid = ticker_validity.is_invalid(symbol)
+        if not invalid:
+            stale = history_cache.get(symbol, period, allow_stale=True)
+            if stale is not None:
+                return stale
+        return df
+    history_cache.put(symbol, window, df)
+    sliced = slice_period(df, period).copy()
+    sliced.attrs['ticker_symbol'] = ticker_symbol
+    return sliced
+
+async def fetch_stock_data_async(ticker_symbol, period='1y', interval='1d'):
+    """Event-loop counterpart of fetch_stock_data on the pooled async Yahoo client.
+
+    Nothing blocks a threadpool slot while the request is in flight; if the chart
+    endpoint is unreachable we fall back to the threaded yfinance path.
+    """
+    symbol = str(ticker_symbol).upper()
+    try:
+        if interval != '1d':
+            key = ("history", symbol, period, interval)
+            return await upstream_flight.do_async(key, _fetch_stock_data_stored_async, ticker_symbol, period, interval)
+        cached = history_cache.get(symbol, period)
+        if cached is not None:
+            return cached
+        window = history_cache.window_for(period)
+        df = await upstream_flight.do_async(("history", symbol, window, interval), _fetch_stock_data_stored_async, ticker_symbol, window, interval)
+    except (YahooClientError, CircuitOpen) as e:
+        # With the breaker open the threaded path fails fast too, and serves stored or stale bars
+        print(f"[YAHOO CLIENT] {ticker_symbol} falling back to yfinance: {e}")
+        return await run_in_threadpool(fetch_stock_data, ticker_symbol, period, interval)
+    except UpstreamThrottled as e:
+        print(f"[SCHEDULER] Skipping history for {ticker_symbol}: {e}")
+        return pd.DataFrame()
+    except DeadlineExceeded as e:
+        print(f"[UPSTREAM] History for {ticker_symbol}: {e}")
+        return _history_past_deadline(ticker_symbol, period, interval)
+    invalid = df.empty and await ticker_validity.is_invalid_async(symbol)
+    return _slice_daily_window(ticker_symbol, window, period, df, invalid)
+
+async def _fetch_stock_data_stored_async(ticker_symbol, period='1y', interval='1d'):
+    async def _fetch(period=None, start=None):
+        if await ticker_validity.is_invalid_async(ticker_symbol):
+            return pd.DataFrame()
+        try:
+            df = await chart_hedger.call_async(market_data.history_async, ticker_symbol, period, interval, start=start)
+        except YahooSymbolNotFound as e:
+            if _proves_missing(interval, start):
+                await ticker_validity.mark_invalid_async(ticker_symbol, e)
+            return pd.DataFrame()
+        if not df.empty:
+            await ticker_validity.mark_valid_async(ticker_symbol)
+        return df
+    df = await ohlcv_store.read_through_async(ticker_symbol, period, interval, _fetch)
+    df.attrs['ticker_symbol'] = ticker_symbol
+    return df
+
+def fetch_resampled_stock_data(ticker_symbol, period='1d', interval='5m', max_retries=3):
+    """Intraday history built from one shared BASE_INTERVAL series, resampled locally.
+
+    The chart's 1D, 1W and custom intraday views all read the same 5m bars, so
+    switching between them doesn't trigger another upstream download.
+    """
+    base_period = _resample_base_period(period, interval)
+    if base_period is None:
+        return fetch_stock_data(ticker_symbol, period, interval, max_retries)
+    base = fetch_stock_data(ticker_symbol, base_period, BASE_INTERVAL, max_retries)
+    return _resampled_view(ticker_symbol, base, period, interval)
+
+async def fetch_resampled_stock_data_async(ticker_symbol, period='1d', interval='5m'):
+    base_period = _resample_base_period(period, interval)
+    if base_period is None:
+        return await fetch_stock_data_async(ticker_symbol, period, interval)
+    base = await fetch_stock_data_async(ticker_symbol, base_period, BASE_INTERVAL)
+    return _resampled_view(ticker_symbol, base, period, interval)
+
+def _resample_base_period(period, interval):
+    """Period of BASE_INTERVAL bars to fetch for a view, or None if it can't be derived from them."""
+    days = period_days(period)
+    if days is None or days > BASE_MAX_DAYS or not can_resample(BASE_INTERVAL, interval):
+        return None
+    return BASE_PERIOD if days <= period_days(BASE_PERIOD) else period
+
+def _resampled_view(ticker_symbol, base, period, interval):
+    if base.empty:
+        return base
+    df = slice_period(base, period)
+    df = df.copy() if interval == BASE_INTERVAL else resample_ohlcv(df, interval)
+    df.attrs['ticker_symbol'] = ticker_symbol
+    return df
+
+def _proves_missing(interval, start):
+    # Only a full daily download that Yahoo rejects as an unknown symbol proves it is gone:
+    # yfinance reports "no price data" for thin intraday windows and for incremental
+    # (start=...) fetches with no new bar too. A plain empty frame is never enough.
+    return interval == '1d' and start is None
+
+def _note_missing_symbol(ticker_symbol, interval, start, error):
+    if _proves_missing(interval, start):
+        ticker_validity.mark_invalid(ticker_symbol, error)
+
+def _fetch_stock_data_stored(ticker_symbol, period='1y', interval='1d', max_retries=3):
+    """Serve history from the local OHLCV store, downloading only bars it doesn't have yet."""
+    def _fetch(period=None, start=None):
+        return _fetch_stock_data_upstream(ticker_symbol, period, interval, max_retries, start=start)
+    df = ohlcv_store.read_through(ticker_symbol, period, interval, _fetch)
+    df.attrs['ticker_symbol'] = ticker_symbol
+    return df
+
+def _fetch_stock_data_upstream(ticker_symbol, period='1y', interval='1d', max_retries=3, start=None):
+    if ticker_validity.is_invalid(ticker_symbol):
+        return pd.DataFrame()
     for attempt in range(max_retries):
         try:
-            stock = yf.Ticker(ticker_symbol)
-            df = stock.history(period=period, interval=interval)
+            request_deadline.check(f"history attempt {attempt + 1}")
+            yfinance_breaker.check()
+        except (DeadlineExceeded, CircuitOpen) as e:
+            print(f"[UPSTREAM] Skipping history for {ticker_symbol}: {e}")
+            return pd.DataFrame()
+        try:
+            upstream_scheduler.acquire(YAHOO)
+        except UpstreamThrottled as e:
+            print(f"[SCHEDULER] Skipping history for {ticker_symbol}: {e}")
+            return pd.DataFrame()
+        try:
+            df = history_hedger.call(_download_history, ticker_symbol, period, interval, start)
             df.dropna(inplace=True)
             df.attrs['ticker_symbol'] = ticker_symbol
             
-            # Check if we got any data
+            # Check if we got any data; an empty answer is treated as transient
+            # and doesn't count as a success that would close Yahoo's breaker
             if df.empty:
                 print(f"Warning: No data returned for {ticker_symbol}")
                 return pd.DataFrame()
             
+            yfinance_breaker.record_success()
+            ticker_validity.mark_valid(ticker_symbol)
             return df
+        except DeadlineExceeded as e:
+            print(f"[UPSTREAM] Giving up on history for {ticker_symbol}: {e}")
+            return pd.DataFrame()
         except Exception as e:
             print(f"Attempt {attempt + 1} failed for {ticker_symbol}: {e}")
-            if "rate limit" in str(e).lower() and attempt < max_retries - 1:
-                time.sleep(2 ** attempt)  # Exponential backoff
-                continue
+            if is_invalid_symbol_error(e):
+                _note_missing_symbol(ticker_symbol, interval, start, e)
+                return pd.DataFrame()
+            if is_rate_limit_error(e):
+                # The next acquire() waits out the shared backoff window
+                upstream_scheduler.report_throttled(YAHOO)
+                if attempt < max_retries - 1:
+                    continue
+            else:
+                yfinance_breaker.record_failure(e)
             if attempt == max_retries - 1:
                 print(f"All attempts failed for {ticker_symbol}")
                 return pd.DataFrame()  # Return empty DataFrame instead of raising exception
     return pd.DataFrame()
 
+def _download_history(ticker_symbol, period, interval, start):
+    stock = market_data.ticker(ticker_symbol)
+    # Raise yfinance's missing-ticker errors instead of logging them and returning an empty frame
+    if start is not None:
+        return stock.history(start=start, interval=interval, raise_errors=True)
+    return stock.history(period=period, interval=interval, raise_errors=True)
+
+@indicator_cache.memoize("basic", adds_columns=True)
 def add_technical_indicators(df):
     if df.empty or 'Close' not in df.columns:
         return pd.DataFrame()
-    
-    df_ta = df.copy()
-    
-    if len(df_ta) > 20:
-        df_ta['SMA_20'] = ta.trend.sma_indicator(df_ta['Close'], window=20)
-        bb_indicator = ta.volatility.BollingerBands(close=df_ta['Close'], window=20, window_dev=2)
-        df_ta['BB_High'] = bb_indicator.bollinger_hband()
-        df_ta['BB_Mid'] = bb_indicator.bollinger_mavg()
-        df_ta['BB_Low'] = bb_indicator.bollinger_lband()
-    else:
-        df_ta['SMA_20'], df_ta['BB_High'], df_ta['BB_Mid'], df_ta['BB_Low'] = np.nan, np.nan, np.nan, np.nan
-    
-    if len(df_ta) > 50:
-        df_ta['SMA_50'] = ta.trend.sma_indicator(df_ta['Close'], window=50)
-    else:
-        df_ta['SMA_50'] = np.nan
-    
-    if len(df_ta) > 14:
-        df_ta['RSI'] = ta.momentum.rsi(df_ta['Close'], window=14)
-    else:
-        df_ta['RSI'] = np.nan
-    
-    if len(df_ta) > 34:
-        df_ta['MACD_line'] = ta.trend.macd(df_ta['Close'])
-        df_ta['MACD_signal'] = ta.trend.macd_signal(df_ta['Close'])
-        df_ta['MACD_hist'] = ta.trend.macd_diff(df_ta['Close'])
-    else:
-        df_ta['MACD_line'], df_ta['MACD_signal'], df_ta['MACD_hist'] = np.nan, np.nan, np.nan
-    
-    return df_ta
+    # SMA_20/50, Bollinger, RSI and MACD in one pass; NaN until each indicator has enough bars
+    return indicator_engine.basic_indicators(df)
 
 def generate_signal(df, overall_news_sentiment_score=0.0, company_name="the company"):
     MIN_DATA_POINTS = 35
@@ -1614,88 +1800,157 @@ def detect_currency_from_symbol(symbol, info=None):
 
 def get_stock_info(ticker_symbol, max_retries=2):
     """Get stock information using optimized fast_info to avoid 60s timeouts."""
-    cache_key = f"info_{ticker_symbol}"
-    if cache_key in stock_cache:
-        cache_time, cache_data = stock_cache[cache_key]
-        if (datetime.now() - cache_time).seconds < cache_ttl:
-            return cache_data
-    
+    symbol = str(ticker_symbol).upper()
+    # Stale quotes are returned at once while a background refresh runs;
+    # concurrent misses for the same symbol share one upstream fetch
+    try:
+        return data_cache.get_or_load(
+            "quote", symbol,
+            lambda: _load_quote(symbol, ticker_symbol, max_retries),
+            ttl=quote_ttl(symbol)
+        )
+    except HTTPException as e:
+        if e.status_code < 500:
+            raise
+        # Yahoo is down (or its breaker open) and the cached entry has expired:
+        # serve the last good quote, marked stale and never written back to the cache
+        last_good = yfinance_breaker.last_good(("quote", symbol))
+        if last_good is None:
+            raise
+        print(f"[CIRCUIT] Serving last good quote for {symbol}: {e.detail}")
+        return last_good
+
+def _load_quote(symbol, ticker_symbol, max_retries):
+    try:
+        quote = upstream_flight.do(("quote", symbol), _get_stock_info_upstream, ticker_symbol, max_retries)
+    except DeadlineExceeded as e:
+        # Waited on another request's fetch past our own deadline
+        raise HTTPException(status_code=504, detail=f"Timed out fetching stock info for {ticker_symbol}: {e}")
+    yfinance_breaker.remember(("quote", symbol), quote)
+    return quote
+
+def warm_stock_info(ticker_symbol, within=0):
+    """Prewarm hook: load a full quote into the "quote" entry get_stock_info serves.
+
+    A cached quote that can still be served, fresh or stale, for more than `within`
+    seconds is left alone: requests revalidate stale quotes themselves, so the
+    warmer only fills gaps before they open. Upstream throttling is re-raised as
+    UpstreamThrottled so the prewarmer backs off.
+    """
+    symbol = clean_ticker_symbol(ticker_symbol)
+    if ticker_validity.is_invalid(symbol):
+        return False
+    servable = data_cache.servable_for("quote", symbol)
+    if servable is not None and servable > within:
+        return False
+    try:
+        quote = _load_quote(symbol, symbol, 1)
+    except HTTPException as e:
+        if e.status_code == 429:
+            raise UpstreamThrottled(YAHOO, 0)
+        raise
+    data_cache.set("quote", symbol, quote, ttl=quote_ttl(symbol))
+    return True
+
+def _fast_quote(ticker_symbol):
+    """One quote from fast_info (history as a price fallback); a single hedgeable upstream round."""
+    # Use the global session for connection pooling
+    stock = market_data.ticker(ticker_symbol)
+    
+    # Use a short timeout for the fast_info access if possible
+    fast = stock.fast_info
+    
+    if not fast or len(fast) == 0:
+        raise ValueError("Empty fast_info")
+
+    # Real-time metrics from fast_info
+    current_price = fast.get('lastPrice', fast.get('last_price', 0))
+    if not current_price:
+        # Fallback to history for price if fast_info has no price
+        hist = stock.history(period="1d")
+        if hist.empty:
+            raise LookupError(f"No price data found for {ticker_symbol}")
+        current_price = hist['Close'].iloc[-1]
+        previous_close = hist['Open'].iloc[-1] if len(hist) > 1 else current_price
+    else:
+        previous_close = fast.get('previousClose', fast.get('previous_close', 0))
+    
+    # Metadata fallbacks from local mapping or fast_info
+    company_name = get_company_name(ticker_symbol)
+    
+    # Logic for change
+    today_change = current_price - previous_close if current_price and previous_close else 0
+    today_change_percent = (today_change / previous_close * 100) if previous_close else 0
+    
+    result = {
+        'symbol': ticker_symbol,
+        'name': company_name,
+        'price': float(current_price) if current_price else 0,
+        'change': float(today_change),
+        'changePercent': float(today_change_percent),
+        'volume': int(fast.get('lastVolume', fast.get('last_volume', 0))),
+        'marketCap': float(fast.get('market_cap', 0)),
+        'pe': None,
+        'dividend': None,
+        'high': float(fast.get('day_high', 0)),
+        'low': float(fast.get('day_low', 0)),
+        'open': float(fast.get('open', 0)),
+        'previousClose': float(previous_close),
+        'sector': None,
+        'industry': None,
+        'description': None,
+        'currency': fast.get('currency', 'USD'),
+        'high52Week': float(fast.get('year_high', 0)),
+        'low52Week': float(fast.get('year_low', 0)),
+        'timestamp': format_timestamp(datetime.now())
+    }
+    return result
+
+def _get_stock_info_upstream(ticker_symbol, max_retries=2):
+    if ticker_validity.is_invalid(ticker_symbol):
+        raise HTTPException(status_code=404, detail=f"No market data for {ticker_symbol}; the symbol may be invalid or delisted")
     # 1. Try Optimized Fetch (fast_info doesn't trigger heavy scraping)
     for attempt in range(max_retries):
         try:
-            # Use the global session for connection pooling
-            stock = yf.Ticker(ticker_symbol, session=YF_SESSION)
-            
-            # Use a short timeout for the fast_info access if possible
-            fast = stock.fast_info
-            
-            if not fast or len(fast) == 0:
-                raise ValueError("Empty fast_info")
-
-            # Real-time metrics from fast_info
-            current_price = fast.get('lastPrice', fast.get('last_price', 0))
-            if not current_price:
-                # Fallback to history for price if fast_info has no price
-                hist = stock.history(period="1d")
-                if not hist.empty:
-                    current_price = hist['Close'].iloc[-1]
-                    previous_close = hist['Open'].iloc[-1] if len(hist) > 1 else current_price
-                else:
-                    current_price = 0
-                    previous_close = 0
-            else:
-                previous_close = fast.get('previousClose', fast.get('previous_close', 0))
-            
-            # Metadata fallbacks from local mapping or fast_info
-            company_name = get_company_name(ticker_symbol)
-            
-            # Logic for change
-            today_change = current_price - previous_close if current_price and previous_close else 0
-            today_change_percent = (today_change / previous_close * 100) if previous_close else 0
-            
-            result = {
-                'symbol': ticker_symbol,
-                'name': company_name,
-                'price': float(current_price) if current_price else 0,
-                'change': float(today_change),
-                'changePercent': float(today_change_percent),
-                'volume': int(fast.get('lastVolume', fast.get('last_volume', 0))),
-                'marketCap': float(fast.get('market_cap', 0)),
-                'pe': None,
-                'dividend': None,
-                'high': float(fast.get('day_high', 0)),
-                'low': float(fast.get('day_low', 0)),
-                'open': float(fast.get('open', 0)),
-                'previousClose': float(previous_close),
-                'sector': None,
-                'industry': None,
-                'description': None,
-                'currency': fast.get('currency', 'USD'),
-                'high52Week': float(fast.get('year_high', 0)),
-                'low52Week': float(fast.get('year_low', 0)),
-                'timestamp': format_timestamp(datetime.now())
-            }
-            
-            stock_cache[cache_key] = (datetime.now(), result)
+            request_deadline.check(f"quote attempt {attempt + 1}")
+            yfinance_breaker.check()
+        except DeadlineExceeded as e:
+            raise HTTPException(status_code=504, detail=f"Timed out fetching stock info for {ticker_symbol}: {e}")
+        except CircuitOpen as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after) + 1)})
+        try:
+            upstream_scheduler.acquire(YAHOO)
+        except UpstreamThrottled:
+            raise HTTPException(status_code=429, detail=f"Rate limit exceeded for {ticker_symbol}")
+        try:
+            # A duplicate is sent if fast_info is slower than recent p95 (hedging.py)
+            result = quote_hedger.call(_fast_quote, ticker_symbol)
+            yfinance_breaker.record_success()
             return result
-            
+        except DeadlineExceeded as e:
+            raise HTTPException(status_code=504, detail=f"Timed out fetching stock info for {ticker_symbol}: {e}")
         except Exception as e:
             error_str = str(e).lower()
             print(f"[FETCH ERROR] attempt {attempt+1} for {ticker_symbol}: {error_str}")
             
+            # Unknown or delisted: retrying (or the .info fallback) won't help
+            if is_invalid_symbol_error(e):
+                ticker_validity.mark_invalid(ticker_symbol, e)
+                raise HTTPException(status_code=404, detail=f"No market data for {ticker_symbol}; the symbol may be invalid or delisted")
+            
             # Handle rate limiting specifically
-            if "too many requests" in error_str or "rate limit" in error_str:
+            if is_rate_limit_error(e):
+                upstream_scheduler.report_throttled(YAHOO)
                 if attempt < max_retries - 1:
-                    wait_time = (2 ** attempt) + 1
-                    time.sleep(wait_time)
                     continue
                 else:
                     raise HTTPException(status_code=429, detail=f"Rate limit exceeded for {ticker_symbol}")
+            yfinance_breaker.record_failure(e)
 
             # Try Legacy Fallback inside the exception block for standard errors
             try:
                 print(f"[FALLBACK] Trying legacy info for {ticker_symbol}")
-                info = stock.info
+                info = info_cache.get(ticker_symbol, max_age=QUOTE_INFO_MAX_AGE)
                 if info and info.get('currentPrice'):
                     result = {
                         'symbol': ticker_symbol,
@@ -1714,14 +1969,14 @@ def get_stock_info(ticker_symbol, max_retries=2):
                         'currency': info.get('currency', 'USD'),
                         'timestamp': format_timestamp(datetime.now())
                     }
-                    stock_cache[cache_key] = (datetime.now(), result)
                     return result
             except Exception as fe:
                 print(f"[FALLBACK FAILED] {ticker_symbol}: {fe}")
 
-            # Final retry logic
+            # Final retry logic (the pause never outlasts the request's deadline)
             if attempt < max_retries - 1:
-                time.sleep(1)
+                left = request_deadline.remaining()
+                time.sleep(1 if left is None else max(0.0, min(1, left)))
                 continue
             
             raise HTTPException(
@@ -1731,6 +1986,154 @@ def get_stock_info(ticker_symbol, max_retries=2):
 
     raise HTTPException(status_code=500, detail="Unexpected end of fetch loop")
 
+def _refresh_search_info(symbol):
+    """Background revalidation of a stale search live-price entry."""
+    with priority(BATCH):
+        info = info_cache.get(symbol, SEARCH_INFO_FIELDS, max_age=QUOTE_INFO_MAX_AGE)
+    data_cache.set("search_info", symbol, info, ttl=quote_ttl(symbol))
+
+def _quote_from_bars(ticker_symbol, bars):
+    """Build a StockData-shaped quote from the daily bars of one symbol."""
+    bars = bars.dropna(subset=['Close'])
+    if bars.empty:
+        return None
+    last = bars.iloc[-1]
+    current_price = float(last['Close'])
+    # With a single bar there is no previous close; the open is not one
+    previous_close = float(bars['Close'].iloc[-2]) if len(bars) > 1 else None
+    today_change = current_price - previous_close if previous_close else None
+    today_change_percent = (today_change / previous_close * 100) if previous_close else None
+    return {
+        'symbol': ticker_symbol,
+        'name': get_company_name(ticker_symbol),
+        'price': current_price,
+        'change': today_change,
+        'changePercent': today_change_percent,
+        'volume': int(last['Volume']) if pd.notna(last.get('Volume')) else 0,
+        'marketCap': None,
+        'pe': None,
+        'dividend': None,
+        'high': float(last['High']),
+        'low': float(last['Low']),
+        'open': float(last['Open']),
+        'previousClose': previous_close,
+        'currency': detect_currency_from_symbol(ticker_symbol),
+        'timestamp': format_timestamp(datetime.now())
+    }
+
+def _download_quotes(ticker_symbols):
+    """One batched download round trip for all symbols; returns {symbol: quote}."""
+    def _download():
+        upstream_scheduler.acquire(YAHOO)
+        return market_data.download(ticker_symbols, period="5d", interval="1d", auto_adjust=False)
+    try:
+        # Raises CircuitOpen at once while Yahoo's breaker is open
+        df = yfinance_breaker.call(_download)
+    except UpstreamThrottled as e:
+        print(f"[BATCH QUOTE] Skipping {len(ticker_symbols)} symbols: {e}")
+        return {}
+    quotes = {}
+    if df is None or df.empty:
+        return quotes
+    for symbol in ticker_symbols:
+        try:
+            if isinstance(df.columns, pd.MultiIndex):
+                if symbol not in df.columns.get_level_values(0):
+                    continue
+                bars = df[symbol]
+            else:
+                # Older yfinance returns flat columns for a single ticker
+                bars = df
+            quote = _quote_from_bars(symbol, bars)
+            if quote:
+                quotes[symbol] = quote
+        except Exception as e:
+            print(f"[BATCH QUOTE] Skipping {symbol}: {e}")
+    return quotes
+
+def get_stock_info_many(ticker_symbols, refresh=False):
+    """Get quotes for many symbols with a single batched upstream call.
+
+    A fresh full quote (from get_stock_info) is used when cached. Otherwise the
+    bar-derived quote in "quote_bars" is used; it is never written over a full
+    quote, and its market cap, P/E and dividend are filled from the cached full
+    quote or info entry (None only when neither exists). Cached quotes are reused
+    (unless `refresh`); stale ones are returned and refreshed together in the
+    background, and missing symbols are fetched in one batched download.
+    Returns {symbol: quote} with the same fields as StockData.
+    """
+    symbols = list(dict.fromkeys(clean_ticker_symbol(s) for s in ticker_symbols if s))
+    results, missing, stale = {}, [], []
+    # One MGET per namespace covers every symbol the in-process LRU doesn't have
+    full = {} if refresh else data_cache.get_many("quote", symbols)
+    need = [symbol for symbol in symbols if full.get(symbol, (None, None))[1] != FRESH]
+    from_bars = data_cache.get_many("quote_bars", need) if need and not refresh else {}
+    for symbol in symbols:
+        quote, state = full.get(symbol, (None, None))
+        bar_quote, bar_state = from_bars.get(symbol, (None, None))
+        if state != FRESH and bar_state is not None and (state is None or bar_state == FRESH):
+            quote, state = bar_quote, bar_state
+        if state is None:
+            missing.append(symbol)
+            continue
+        results[symbol] = quote
+        if state != FRESH:
+            stale.append(symbol)
+
+    if stale:
+        data_cache.refresh_in_background(("batch_quote", tuple(sorted(stale))), _fetch_quotes_into_cache, stale)
+    missing = [symbol for symbol in missing if not ticker_validity.is_invalid(symbol)]
+    if missing:
+        results.update(_fetch_quotes_into_cache(missing))
+    return _with_slow_fields(results, full)
+
+# Bar-derived quote field -> info field it is filled from
+_SLOW_QUOTE_FIELDS = {'marketCap': 'marketCap', 'pe': 'trailingPE', 'dividend': 'dividendYield'}
+
+def _with_slow_fields(quotes, full=None):
+    """Fill the fields bars can't provide from a cached full quote (even stale) or cached info; no upstream calls."""
+    lacking = [symbol for symbol, quote in quotes.items() if any(quote.get(f) is None for f in _SLOW_QUOTE_FIELDS)]
+    if not lacking:
+        return quotes
+    cached = dict(full or {})
+    unseen = [symbol for symbol in lacking if symbol not in cached]
+    if unseen:
+        cached.update(data_cache.get_many("quote", unseen))
+    for symbol in lacking:
+        known = cached.get(symbol, (None, None))[0] or {}
+        quote = dict(quotes[symbol])  # never annotate the cached entry
+        for field, info_field in _SLOW_QUOTE_FIELDS.items():
+            if quote.get(field) is None and known.get(field) is not None:
+                quote[field] = known[field]
+        if any(quote.get(f) is None for f in _SLOW_QUOTE_FIELDS):
+            info = info_cache.peek(symbol, list(_SLOW_QUOTE_FIELDS.values()))
+            for field, info_field in _SLOW_QUOTE_FIELDS.items():
+                if quote.get(field) is None:
+                    quote[field] = info.get(info_field)
+        quotes[symbol] = quote
+    return quotes
+
+def _fetch_quotes_into_cache(symbols):
+    try:
+        fetched = upstream_flight.do(("batch_quote", tuple(sorted(symbols))), _download_quotes, symbols)
+    except Exception as e:
+        print(f"[BATCH QUOTE ERROR] {len(symbols)} symbols: {e}")
+        # Answer with the last good quotes, marked stale; they are not written back to the cache
+        stale = {}
+        for symbol in symbols:
+            quote = yfinance_breaker.last_good(("quote", symbol)) or yfinance_breaker.last_good(("quote_bars", symbol))
+            if quote is not None:
+                stale[symbol] = quote
+        return stale
+    # Bar-derived quotes lack fields a full quote has, so they are kept apart from "quote"
+    by_ttl = {}
+    for symbol, quote in fetched.items():
+        yfinance_breaker.remember(("quote_bars", symbol), quote)
+        by_ttl.setdefault(quote_ttl(symbol), {})[symbol] = quote
+    for ttl, quotes in by_ttl.items():
+        data_cache.set_many("quote_bars", quotes, ttl=ttl)
+    return fetched
+
 async def get_stock_news(ticker_symbol, max_articles=8):
     """Get news for a stock with robust scraper and sophisticated fallback"""
     try:
@@ -1763,9 +2166,7 @@ async def get_stock_news(ticker_symbol, max_articles=8):
             company_name = ticker_symbol
             info = {}
             try:
-                stock = yf.Ticker(ticker_symbol)
-                # Use a small timeout or just trust yfinance for this fallback
-                info = stock.info
+                info = info_cache.get(ticker_symbol)
                 if info and info.get('shortName'):
                     company_name = info.get('shortName', ticker_symbol)
             except Exception as e:
@@ -1871,8 +2272,8 @@ def get_about_stock_info(ticker_symbol):
     info_dict, financials_df, earnings_df, analyst_recs_df, analyst_price_target_dict, company_officers_list = {}, pd.DataFrame(), pd.DataFrame(), None, None, []
     
     try:
-        stock = yf.Ticker(ticker_symbol)
-        info = stock.info
+        stock = market_data.ticker(ticker_symbol)
+        info = info_cache.get(ticker_symbol)
         
         if info:
             description = info.get('longBusinessSummary', description)
@@ -2347,10 +2748,11 @@ def calculate_advanced_metrics(df, risk_free_rate=0.03):
 def get_watchlist_data(watchlist_symbols):
     """Get data for watchlist symbols"""
     watchlist_data = []
+    quotes = get_stock_info_many(watchlist_symbols)
     
     for symbol in watchlist_symbols:
         try:
-            stock_info = get_stock_info(symbol)
+            stock_info = quotes.get(clean_ticker_symbol(symbol))
             if stock_info:
                 watchlist_data.append({
                     'symbol': symbol,
@@ -2373,15 +2775,18 @@ def screen_stocks(criteria):
         # For now, return a sample of stocks that meet basic criteria
         sample_stocks = ['AAPL', 'GOOGL', 'MSFT', 'TSLA', 'AMZN', 'META', 'NVDA', 'NFLX']
         screened_results = []
+        quotes = get_stock_info_many(sample_stocks)
         
         for symbol in sample_stocks:
             try:
-                stock_info = get_stock_info(symbol)
+                stock_info = quotes.get(symbol)
                 if stock_info:
-                    # Apply screening criteria
-                    if (stock_info.get('marketCap', 0) >= criteria.get('min_market_cap', 0) and
-                        stock_info.get('trailingPE', float('inf')) <= criteria.get('max_pe', float('inf')) and
-                        stock_info.get('dividendYield', 0) * 100 >= criteria.get('min_dividend_yield', 0)):
+                    # Apply screening criteria; an unknown market cap or P/E fails a criterion set on it,
+                    # an unknown dividend counts as none
+                    market_cap, pe = stock_info.get('marketCap'), stock_info.get('pe')
+                    if (('min_market_cap' not in criteria or (market_cap is not None and market_cap >= criteria['min_market_cap'])) and
+                        ('max_pe' not in criteria or (pe is not None and pe <= criteria['max_pe'])) and
+                        (stock_info.get('dividend') or 0) * 100 >= criteria.get('min_dividend_yield', 0)):
                         
                         screened_results.append({
                             'symbol': symbol,
@@ -2429,71 +2834,14 @@ def check_alert_conditions(alert, stock_data):
     except Exception as e:
         return False, f"Error checking alert: {str(e)}"
 
+@indicator_cache.memoize("enhanced", adds_columns=True)
 def get_enhanced_technical_indicators(df):
     """Get enhanced technical indicators including more advanced ones"""
     if df.empty or 'Close' not in df.columns:
         return pd.DataFrame()
-    
-    df_ta = df.copy()
-    
-    # Basic moving averages
-    if len(df_ta) > 20:
-        df_ta['SMA_20'] = ta.trend.sma_indicator(df_ta['Close'], window=20)
-        df_ta['EMA_20'] = ta.trend.ema_indicator(df_ta['Close'], window=20)
-    if len(df_ta) > 50:
-        df_ta['SMA_50'] = ta.trend.sma_indicator(df_ta['Close'], window=50)
-        df_ta['EMA_50'] = ta.trend.ema_indicator(df_ta['Close'], window=50)
-    if len(df_ta) > 200:
-        df_ta['SMA_200'] = ta.trend.sma_indicator(df_ta['Close'], window=200)
-        df_ta['EMA_200'] = ta.trend.ema_indicator(df_ta['Close'], window=200)
-    
-    # Bollinger Bands
-    if len(df_ta) > 20:
-        bb_indicator = ta.volatility.BollingerBands(close=df_ta['Close'], window=20, window_dev=2)
-        df_ta['BB_High'] = bb_indicator.bollinger_hband()
-        df_ta['BB_Mid'] = bb_indicator.bollinger_mavg()
-        df_ta['BB_Low'] = bb_indicator.bollinger_lband()
-        df_ta['BB_Width'] = (df_ta['BB_High'] - df_ta['BB_Low']) / df_ta['BB_Mid']
-        df_ta['BB_Position'] = (df_ta['Close'] - df_ta['BB_Low']) / (df_ta['BB_High'] - df_ta['BB_Low'])
-    
-    # RSI
-    if len(df_ta) > 14:
-        df_ta['RSI'] = ta.momentum.rsi(df_ta['Close'], window=14)
-        df_ta['RSI_MA'] = ta.trend.sma_indicator(df_ta['RSI'], window=14)
-    
-    # MACD
-    if len(df_ta) > 34:
-        df_ta['MACD_line'] = ta.trend.macd(df_ta['Close'])
-        df_ta['MACD_signal'] = ta.trend.macd_signal(df_ta['Close'])
-        df_ta['MACD_hist'] = ta.trend.macd_diff(df_ta['Close'])
-    
-    # Stochastic Oscillator
-    if len(df_ta) > 14:
-        stoch = ta.momentum.StochasticOscillator(high=df_ta['High'], low=df_ta['Low'], close=df_ta['Close'])
-        df_ta['Stoch_K'] = stoch.stoch()
-        df_ta['Stoch_D'] = stoch.stoch_signal()
-    
-    # Williams %R
-    if len(df_ta) > 14:
-        df_ta['Williams_R'] = ta.momentum.williams_r(high=df_ta['High'], low=df_ta['Low'], close=df_ta['Close'])
-    
-    # Commodity Channel Index
-    if len(df_ta) > 20:
-        df_ta['CCI'] = ta.trend.cci(high=df_ta['High'], low=df_ta['Low'], close=df_ta['Close'])
-    
-    # Average True Range (ATR)
-    if len(df_ta) > 14:
-        df_ta['ATR'] = ta.volatility.average_true_range(high=df_ta['High'], low=df_ta['Low'], close=df_ta['Close'])
-    
-    # On Balance Volume (OBV)
-    if len(df_ta) > 1:
-        df_ta['OBV'] = ta.volume.on_balance_volume(close=df_ta['Close'], volume=df_ta['Volume'])
-    
-    # Money Flow Index
-    if len(df_ta) > 14:
-        df_ta['MFI'] = ta.volume.money_flow_index(high=df_ta['High'], low=df_ta['Low'], close=df_ta['Close'], volume=df_ta['Volume'])
-    
-    return df_ta
+    # Moving averages, Bollinger, RSI, MACD, stochastic, Williams %R, CCI, ATR, OBV and MFI,
+    # sharing intermediates; an indicator without enough bars is left out
+    return indicator_engine.enhanced_indicators(df)
 
 def generate_enhanced_signal(df, news_sentiment=0.0, company_name="the company"):
     """Generate enhanced trading signal with more indicators"""
@@ -2620,9 +2968,10 @@ def scrape_google_news(query_term):
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
     }
     
+    google_breaker = breaker_for_url(search_url)
+    upstream_failed = False
     try:
-        response = requests.get(search_url, headers=headers, timeout=15)
-        response.raise_for_status()
+        response = google_breaker.call(_get_page, search_url, headers, 15)
         
         soup = BeautifulSoup(response.text, 'html.parser')
         articles_tags = soup.find_all('article', limit=15)
@@ -2637,7 +2986,7 @@ def scrape_google_news(query_term):
                 # Try to get image from article
                 image_url = None
                 try:
-                    article_response = requests.get(full_link, headers=headers, timeout=5)
+                    article_response = requests.get(full_link, headers=headers, timeout=request_deadline.timeout(5))
                     if article_response.status_code == 200:
                         article_soup = BeautifulSoup(article_response.text, 'html.parser')
                         # Try to find the first valid image
@@ -2670,7 +3019,7 @@ def scrape_google_news(query_term):
                 # Try to get image from article
                 image_url = None
                 try:
-                    article_response = requests.get(full_link, headers=headers, timeout=5)
+                    article_response = requests.get(full_link, headers=headers, timeout=request_deadline.timeout(5))
                     if article_response.status_code == 200:
                         article_soup = BeautifulSoup(article_response.text, 'html.parser')
                         # Try to find the first valid image
@@ -2697,15 +3046,32 @@ def scrape_google_news(query_term):
         if not news_items:
             error_message = f"Google News: No articles for '{query_term}'."
             
+    except CircuitOpen as e:
+        upstream_failed = True
+        error_message = f"Google News unavailable for '{query_term}': {str(e)}"
     except requests.exceptions.Timeout:
+        upstream_failed = True
         error_message = f"Google News: Timeout for '{query_term}'."
     except requests.exceptions.RequestException as e:
+        upstream_failed = True
         error_message = f"Google News Error for '{query_term}': {str(e)}"
     except Exception as e:
         error_message = f"Google News Unexpected Error for '{query_term}': {str(e)}"
     
+    if news_items:
+        google_breaker.remember(search_url, news_items[:7])
+    elif upstream_failed:
+        # Serve the last results for this query, marked stale, rather than nothing
+        stale = google_breaker.last_good(search_url)
+        if stale:
+            return stale, None
     return news_items[:7], error_message
 
+def _get_page(url, headers, timeout):
+    response = requests.get(url, headers=headers, timeout=request_deadline.timeout(timeout))
+    response.raise_for_status()
+    return response
+
 def scrape_yahoo_finance_news(ticker_symbol):
     """Scrape Yahoo Finance news for a specific ticker"""
     news_items, error_message = [], None
@@ -2716,7 +3082,7 @@ def scrape_yahoo_finance_news(ticker_symbol):
     }
     
     try:
-        response = requests.get(search_url, headers=headers, timeout=15)
+        response = requests.get(search_url, headers=headers, timeout=request_deadline.timeout(15))
         response.raise_for_status()
         
         soup = BeautifulSoup(response.text, 'html.parser')
@@ -2746,7 +3112,7 @@ def scrape_yahoo_finance_news(ticker_symbol):
                 # Try to get image from article
                 image_url = None
                 try:
-                    article_response = requests.get(full_link, headers=headers, timeout=5)
+                    article_response = requests.get(full_link, headers=headers, timeout=request_deadline.timeout(5))
                     if article_response.status_code == 200:
                         article_soup = BeautifulSoup(article_response.text, 'html.parser')
                         # Try to find the first valid image
@@ -2885,7 +3251,7 @@ def get_stock_news_from_newsapi(ticker_symbol_or_company_name):
     
     query_term = ticker_symbol_or_company_name
     try:
-        stock_info_temp = yf.Ticker(ticker_symbol_or_company_name).info
+        stock_info_temp = info_cache.get(ticker_symbol_or_company_name, fields=('shortName',))
         if stock_info_temp and stock_info_temp.get('shortName'):
             company_name_for_search = stock_info_temp['shortName'].replace(" Inc.", "").replace(" Corp.", "").replace(" Ltd.", "")
             if len(company_name_for_search) > 3: 
@@ -3074,6 +3440,7 @@ async def root():
             "/simulation/monte-carlo",
             "/screener/run",
             "/market/simulation",
+            "/market/status",
             
             # Alerts
             "/alerts",
@@ -3087,7 +3454,9 @@ async def root():
             "/news/scrape/yahoo/{symbol}",
             
             # System
-            "/health"
+            "/health",
+            "/admin/cache-stats",
+            "/metrics"
         ]
     }
 
@@ -3098,6 +3467,12 @@ async def about_endpoint():
     except Exception:
         return {"title": "About", "content": {"status": "unavailable"}}
 
+@app.get("/market/status")
+async def get_market_status_endpoint(symbols: str = ""):
+    """Open/closed state, local time and next open/close for the exchanges of comma-separated symbols (US by default)"""
+    tickers = [clean_ticker_symbol(s) for s in symbols.split(',') if s.strip()] or [""]
+    return {ticker or "US": market_status(ticker) for ticker in tickers}
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -3105,11 +3480,101 @@ async def health_check():
         "status": "healthy", 
         "timestamp": datetime.now().isoformat(),
         "market_status": get_market_status(),
-        "rate_limiter": {
-            "current_requests": len(rate_limiter.requests),
-            "max_requests": rate_limiter.max_requests,
-            "time_window": rate_limiter.time_window
-        }
+        "upstream_scheduler": upstream_scheduler.stats(),
+        "data_cache": data_cache.stats(),
+        "ticker_validity": ticker_validity.stats(),
+        "circuit_breakers": circuit_breaker.stats(),
+        "hedging": hedging.stats()
+    }
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Admin endpoints are closed unless ADMIN_TOKEN is set and X-Admin-Token matches it."""
+    expected = os.getenv("ADMIN_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set ADMIN_TOKEN to enable them")
+    if not secrets.compare_digest(str(x_admin_token or ""), expected):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+@app.get("/admin/cache-stats", dependencies=[Depends(require_admin)])
+async def admin_cache_stats():
+    """Hits, stale hits, misses, evictions, entries and approximate bytes per cache namespace"""
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "caches": await run_in_threadpool(cache_metrics.snapshot)
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+async def prometheus_metrics():
+    """Cache and circuit breaker metrics in the Prometheus text exposition format"""
+    text = await run_in_threadpool(cache_metrics.prometheus_text) + circuit_breaker.prometheus_text()
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
+@app.get("/stocks/batch", response_model=List[StockData])
+async def get_stock_data_batch(symbols: str, user_subscription: dict = Depends(get_user_subscription_from_headers)):
+    """Get current stock data for many comma-separated symbols in one upstream round trip"""
+    tickers = list(dict.fromkeys(clean_ticker_symbol(s) for s in symbols.split(',') if s.strip()))
+    if not tickers:
+        raise HTTPException(status_code=400, detail="No symbols provided")
+    if len(tickers) > 100:
+        raise HTTPException(status_code=400, detail="A maximum of 100 symbols can be requested at once")
+    
+    for ticker in tickers:
+        if not validate_ticker_symbol(ticker):
+            raise HTTPException(status_code=400, detail=f"Invalid ticker symbol format: {ticker}")
+        validate_market_access(get_market_from_symbol(ticker), user_subscription)
+    
+    await ensure_upstream_capacity()
+    
+    try:
+        quotes = await run_in_threadpool(get_stock_info_many, tickers)
+    except Exception as e:
+        print(f"Internal Backend Error for batch {tickers}: {e}")
+        raise HTTPException(status_code=500, detail="Error retrieving batch stock data")
+    return [quotes[t] for t in tickers if t in quotes]
+
+BATCH_INDICATOR_CONCURRENCY = 8
+
+@app.get("/stocks/batch/indicators")
+async def get_batch_indicators(symbols: Optional[str] = None, period: str = "1y", bars: Optional[int] = None,
+                               user_subscription: dict = Depends(get_user_subscription_from_headers)):
+    """Latest enhanced indicators for many symbols (by default the warm set) in one vectorised pass"""
+    if symbols:
+        tickers = list(dict.fromkeys(clean_ticker_symbol(s) for s in symbols.split(',') if s.strip()))
+        if len(tickers) > 200:
+            raise HTTPException(status_code=400, detail="A maximum of 200 symbols can be requested at once")
+        for ticker in tickers:
+            if not validate_ticker_symbol(ticker):
+                raise HTTPException(status_code=400, detail=f"Invalid ticker symbol format: {ticker}")
+            validate_market_access(get_market_from_symbol(ticker), user_subscription)
+    else:
+        tickers = [t for t in hot_symbols() if check_market_access(user_subscription, get_market_from_symbol(t))]
+    if bars is not None and bars < 2:
+        raise HTTPException(status_code=400, detail="bars must be at least 2")
+    
+    await ensure_upstream_capacity()
+    
+    semaphore = asyncio.Semaphore(BATCH_INDICATOR_CONCURRENCY)
+    
+    async def _history(ticker):
+        async with semaphore:
+            try:
+                return await fetch_stock_data_async(ticker, period)
+            except Exception as e:
+                print(f"[BATCH] History for {ticker} failed: {e}")
+                return pd.DataFrame()
+    
+    frames = dict(zip(tickers, await asyncio.gather(*(_history(t) for t in tickers))))
+    # One (symbols x bars) matrix instead of one indicator pass per ticker
+    table = await run_in_threadpool(indicator_engine.cross_section, frames, bars)
+    results = {
+        symbol: {name: None if pd.isna(value) else value for name, value in row.items()}
+        for symbol, row in table.to_dict(orient='index').items()
+    }
+    return {
+        "period": period,
+        "count": len(results),
+        "indicators": results,
+        "missing": [t for t in tickers if t not in results],
     }
 
 @app.get("/stocks/{symbol}", response_model=StockData)
@@ -3125,8 +3590,7 @@ async def get_stock_data(symbol: str, user_subscription: dict = Depends(get_user
         validate_market_access(market, user_subscription)
         
         # Apply rate limiting
-        if not rate_limiter.acquire():
-            raise HTTPException(status_code=429, detail="Too many requests. Please try again later.")
+        await ensure_upstream_capacity()
         
         # Run synchronous stock info fetching in thread pool for better performance
         data = await run_in_threadpool(get_stock_info, symbol.upper())
@@ -3164,8 +3628,12 @@ async def get_stock_chart(symbol: str, period: str = "1y", interval: str = "1d",
             yf_period, yf_interval = period, interval
         
         print(f"Fetching chart data for {ticker} with period={yf_period}, interval={yf_interval}")
-        # Run synchronous stock data fetching in thread pool for better performance
-        df = await run_in_threadpool(fetch_stock_data, ticker, yf_period, yf_interval)
+        if yf_interval == '1d':
+            # Daily bars come from the stock_quotes table; yfinance only backfills gaps
+            df = await get_daily_history(ticker, yf_period, fetch_stock_data_async)
+        else:
+            # Intraday views share one 5m fetch and are resampled locally
+            df = await fetch_resampled_stock_data_async(ticker, yf_period, yf_interval)
         
         if df.empty:
             print(f"No data available for {ticker}")
@@ -3199,7 +3667,8 @@ async def get_stock_chart(symbol: str, period: str = "1y", interval: str = "1d",
             "period": period,
             "interval": yf_interval,
             "data": chart_data,
-            "simple_chart": simple_chart
+            "simple_chart": simple_chart,
+            "stale": bool(df.attrs.get("stale", False))
         }
     except HTTPException:
         # Re-raise HTTP exceptions as-is
@@ -3215,8 +3684,8 @@ async def get_stock_chart(symbol: str, period: str = "1y", interval: str = "1d",
 async def get_technical_indicators(symbol: str, period: str = "1y"):
     """Get technical indicators for a stock"""
     try:
-        # Run synchronous stock data fetching in thread pool for better performance
-        df = await run_in_threadpool(fetch_stock_data, symbol.upper(), period)
+        # Daily bars from the stock_quotes table, backfilled from yfinance when stale
+        df = await get_daily_history(symbol.upper(), period, fetch_stock_data_async)
         
         if df.empty:
             raise HTTPException(status_code=404, detail=f"No data available for {symbol}")
@@ -3719,30 +4188,34 @@ async def search_stocks_simple(q: str):
         
         for i, result in enumerate(search_results[:max_live_requests]):
             try:
-                # Check cache first
-                cache_key = f"price_{result['symbol']}"
-                if cache_key in stock_cache:
-                    cache_time, cache_data = stock_cache[cache_key]
-                    if (datetime.now() - cache_time).seconds < cache_ttl:
-                        if cache_data and 'regularMarketPrice' in cache_data and cache_data['regularMarketPrice']:
-                            live_data_results.append(StockSearchResult(
-                                symbol=result['symbol'],
-                                name=result['name'],
-                                price=cache_data.get('regularMarketPrice'),
-                                change=cache_data.get('regularMarketChangePercent', 0),
-                                sector=result.get('sector'),
-                                relevance=result.get('relevance')
-                            ))
-                            continue
+                # Check cache first (stale entries are served and refreshed in the background)
+                cache_key = result['symbol'].upper()
+                cache_data, cache_state = await data_cache.get_async("search_info", cache_key)
+                if cache_state is not None:
+                    if cache_state != FRESH:
+                        data_cache.refresh_in_background(("search_info", cache_key), _refresh_search_info, cache_key)
+                    if cache_data and 'regularMarketPrice' in cache_data and cache_data['regularMarketPrice']:
+                        live_data_results.append(StockSearchResult(
+                            symbol=result['symbol'],
+                            name=result['name'],
+                            price=cache_data.get('regularMarketPrice'),
+                            change=cache_data.get('regularMarketChangePercent', 0),
+                            sector=result.get('sector'),
+                            relevance=result.get('relevance')
+                        ))
+                        continue
                 
                 # Try to get live data with rate limiting
                 try:
-                    rate_limiter.acquire()
-                    ticker = yf.Ticker(result['symbol'])
-                    info = ticker.info
+                    # Don't queue behind the limiter for a nice-to-have price; info_cache takes the token
+                    allowed, retry_after = await upstream_scheduler.available_async(YAHOO, BATCH)
+                    if not allowed:
+                        raise UpstreamThrottled(YAHOO, retry_after)
+                    with priority(BATCH):
+                        info = await run_in_threadpool(info_cache.get, cache_key, SEARCH_INFO_FIELDS, QUOTE_INFO_MAX_AGE)
                     
                     # Cache the result
-                    stock_cache[cache_key] = (datetime.now(), info)
+                    await data_cache.set_async("search_info", cache_key, info, ttl=quote_ttl(cache_key))
                     
                     if info and 'regularMarketPrice' in info and info['regularMarketPrice']:
                         live_data_results.append(StockSearchResult(
@@ -3947,7 +4420,7 @@ async def search_stocks_simple(q: str):
 async def get_stock_prediction(symbol: str):
     """Get prediction for a specific stock"""
     try:
-        stock_data = fetch_stock_data(symbol, period='3mo', interval='1d')
+        stock_data = await run_in_threadpool(fetch_stock_data, symbol, period='3mo', interval='1d')
         
         if stock_data.empty:
             raise HTTPException(status_code=404, detail=f"Data for {symbol} not found")
@@ -3987,9 +4460,25 @@ async def get_stock_prediction(symbol: str):
 @app.get("/portfolio")
 async def get_portfolio():
     """Get all portfolio holdings"""
-    metrics = calculate_portfolio_metrics(portfolio_holdings)
+    # Price every holding with one batched quote call; the stored holdings are left as they are
+    holdings = dict(portfolio_holdings)
+    if holdings:
+        quotes = await run_in_threadpool(get_stock_info_many, list(holdings.keys()))
+        for symbol, holding in holdings.items():
+            quote = quotes.get(symbol)
+            if not quote or not quote.get('price'):
+                continue
+            total_value = holding.shares * quote['price']
+            cost = holding.shares * holding.avgPrice
+            holdings[symbol] = holding.model_copy(update={
+                'currentPrice': quote['price'],
+                'totalValue': total_value,
+                'gainLoss': total_value - cost,
+                'gainLossPercent': ((total_value - cost) / cost) * 100 if holding.avgPrice > 0 else 0,
+            })
+    metrics = calculate_portfolio_metrics(holdings)
     return {
-        "holdings": list(portfolio_holdings.values()),
+        "holdings": list(holdings.values()),
         "metrics": metrics
     }
 
@@ -3998,7 +4487,7 @@ async def add_portfolio_holding(symbol: str, shares: int, avg_price: float):
     """Add or update a portfolio holding"""
     try:
         # Get current price
-        stock_info = get_stock_info(symbol.upper())
+        stock_info = await run_in_threadpool(get_stock_info, symbol.upper())
         current_price = stock_info['price']
         
         # Calculate values
@@ -4040,9 +4529,9 @@ async def chatbot_query(query: str, symbol: str):
     try:
         # Create a minimal stock data bundle for the chatbot
         stock_data_bundle = {
-            's_info_full': get_about_stock_info(symbol.upper())[4],  # Get info_dict
-            'df_ta': add_technical_indicators(fetch_stock_data(symbol.upper(), period='3mo')),
-            'current_price': get_stock_info(symbol.upper()).price,
+            's_info_full': (await run_in_threadpool(get_about_stock_info, symbol.upper()))[4],  # Get info_dict
+            'df_ta': add_technical_indicators(await run_in_threadpool(fetch_stock_data, symbol.upper(), period='3mo')),
+            'current_price': (await run_in_threadpool(get_stock_info, symbol.upper())).price,
             'processed_news': [],
             'overall_news_sentiment_stats': {},
             'signal': 'N/A',
@@ -4268,8 +4757,7 @@ async def get_news_sentiment_for_trading(symbol: str):
         # Get company name for signal generation
         company_name = ticker
         try:
-            stock = yf.Ticker(ticker)
-            info = stock.info
+            info = info_cache.get(ticker, fields=('shortName',))
             if info and info.get('shortName'):
                 company_name = info.get('shortName', ticker)
         except:
@@ -4491,7 +4979,7 @@ async def run_monte_carlo_simulation(
 async def get_advanced_metrics(symbol: str, period: str = "1y", risk_free_rate: float = 0.03):
     """Get advanced financial metrics for a stock"""
     try:
-        df = fetch_stock_data(symbol.upper(), period)
+        df = await run_in_threadpool(fetch_stock_data, symbol.upper(), period)
         
         if df.empty:
             raise HTTPException(status_code=404, detail=f"No data available for {symbol}")
@@ -4526,9 +5014,7 @@ async def get_advanced_metrics(symbol: str, period: str = "1y", risk_free_rate:
 async def get_dividend_debug(symbol: str):
     """Debug endpoint to check dividend yield data"""
     try:
-        import yfinance as yf
-        ticker = yf.Ticker(symbol.upper())
-        info = ticker.info
+        info = info_cache.get(symbol.upper())
         
         dividend_debug = {
             "symbol": symbol.upper(),
@@ -4553,8 +5039,8 @@ async def get_watchlist():
     try:
         # In a real app, this would come from user's session/database
         # For now, return a sample watchlist
-        sample_watchlist = ['AAPL', 'GOOGL', 'MSFT', 'TSLA', 'AMZN']
-        watchlist_data = get_watchlist_data(sample_watchlist)
+        sample_watchlist = DEFAULT_WATCHLIST
+        watchlist_data = await run_in_threadpool(get_watchlist_data, sample_watchlist)
         
         return {
             "watchlist": watchlist_data,
@@ -4569,7 +5055,7 @@ async def add_to_watchlist(symbol: str):
     """Add a stock to watchlist"""
     try:
         # In a real app, this would save to user's watchlist
-        stock_info = get_stock_info(symbol.upper())
+        stock_info = await run_in_threadpool(get_stock_info, symbol.upper())
         
         return {
             "message": f"Added {symbol.upper()} to watchlist",
@@ -4611,7 +5097,7 @@ async def run_stock_screener(
             'sector': sector
         }
         
-        screened_results = screen_stocks(criteria)
+        screened_results = await run_in_threadpool(screen_stocks, criteria)
         
         return {
             "criteria": criteria,
@@ -4626,8 +5112,8 @@ async def run_stock_screener(
 async def get_stock_financials(symbol: str):
     """Get financial statements for a stock"""
     try:
-        stock = yf.Ticker(symbol.upper())
-        info = stock.info
+        stock = market_data.ticker(symbol.upper())
+        info = info_cache.get(symbol.upper())
         
         if not info:
             raise HTTPException(status_code=404, detail=f"Financial data not found for {symbol}")
@@ -4912,11 +5398,10 @@ async def get_company_info(symbol: str):
     """Get comprehensive company information (similar to main app.py)"""
     try:
         # Apply rate limiting
-        if not rate_limiter.acquire():
-            raise HTTPException(status_code=429, detail="Rate limit exceeded. Please wait a moment.")
+        await ensure_upstream_capacity("Rate limit exceeded. Please wait a moment.")
         
         # Get comprehensive company information using the same function as main app.py
-        description, sector, industry, market_cap, exchange, info_dict, financials_df, earnings_df, analyst_recs_df, analyst_price_target_dict, company_officers_list = get_about_stock_info(symbol.upper())
+        description, sector, industry, market_cap, exchange, info_dict, financials_df, earnings_df, analyst_recs_df, analyst_price_target_dict, company_officers_list = await run_in_threadpool(get_about_stock_info, symbol.upper())
         
         # Utilize yfinance-based helper as enrichment to satisfy import usage
         try:
@@ -5023,7 +5508,7 @@ async def get_company_info(symbol: str):
 async def get_analyst_recommendations(symbol: str):
     """Get analyst recommendations and price targets"""
     try:
-        stock = yf.Ticker(symbol.upper())
+        stock = market_data.ticker(symbol.upper())
         
         # Get analyst data
         recommendations = stock.recommendations
@@ -5044,7 +5529,7 @@ async def get_analyst_recommendations(symbol: str):
 async def get_stock_holders(symbol: str):
     """Get institutional and major holders"""
     try:
-        stock = yf.Ticker(symbol.upper())
+        stock = market_data.ticker(symbol.upper())
         
         # Get holder data
         institutional_holders = stock.institutional_holders
@@ -5150,7 +5635,7 @@ async def get_enhanced_technical_analysis(symbol: str, period: str = "1y"):
     """Get enhanced technical analysis with more indicators"""
     try:
         # Run synchronous stock data fetching in thread pool for better performance
-        df = await run_in_threadpool(fetch_stock_data, symbol.upper(), period)
+        df = await fetch_stock_data_async(symbol.upper(), period)
         if df.empty:
             raise HTTPException(status_code=404, detail=f"No data available for {symbol}")
         df_enhanced = get_enhanced_technical_indicators(df)
@@ -5200,6 +5685,22 @@ async def get_enhanced_technical_analysis(symbol: str, period: str = "1y"):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/stocks/{symbol}/indicators/latest")
+async def get_latest_indicators(symbol: str, period: str = "1y", interval: str = "1d"):
+    """Latest indicator values from the symbol's streaming state; only bars it hasn't seen are folded in"""
+    df = await fetch_stock_data_async(symbol.upper(), period, interval)
+    if df.empty:
+        raise HTTPException(status_code=404, detail=f"No data available for {symbol}")
+    row = await run_in_threadpool(latest_indicators, df, symbol.upper())
+    return {
+        "symbol": symbol.upper(),
+        "interval": interval,
+        "date": str(df.index[-1]),
+        "price": float(df['Close'].iat[-1]),
+        "stale": bool(df.attrs.get('stale', False)),
+        "indicators": {name: None if pd.isna(value) else float(value) for name, value in row.items()},
+    }
+
 # Alert Management System
 alerts_storage = {}  # In-memory storage for alerts (replace with database in production)
 
@@ -5304,7 +5805,7 @@ async def check_alerts_for_symbol(symbol: str):
     """Check all alerts for a specific symbol"""
     try:
         # Get current stock data
-        stock_data = get_stock_info(symbol.upper())
+        stock_data = await run_in_threadpool(get_stock_info, symbol.upper())
         
         triggered_alerts = []
         
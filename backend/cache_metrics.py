@@ -0,0 +1,118 @@
+"""
+Instrumentation shared by the backend's in-process caches.
+
+Each cache registers under a name and records hits, stale hits, misses and
+evictions per namespace; it also supplies a `usage()` callback reporting
+entry counts and approximate bytes per namespace. Sizes come from what the
+cache already knows (a frame's nbytes, the packed length of an entry) so a
+scrape never re-serializes values. `snapshot()` feeds the /admin/cache-stats
+endpoint and `prometheus_text()` the /metrics endpoint.
+"""
+import sys
+import threading
+from collections import Counter, defaultdict
+
+import pandas as pd
+
+from compact_frame import CompactFrame
+
+EVENTS = ("hits", "stale_hits", "misses", "evictions")
+
+_registry = {}  # cache name -> CacheMetrics
+
+
+def approx_bytes(value):
+    """Rough in-memory footprint without serializing: exact for frames and bytes, shallow otherwise."""
+    if isinstance(value, CompactFrame):
+        return value.nbytes
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=False).sum())
+    if isinstance(value, (bytes, str)):
+        return len(value)
+    return sys.getsizeof(value)
+
+
+def tally_sizes(pairs):
+    """{namespace: (entries, bytes)} from (namespace, nbytes) pairs, for usage() callbacks."""
+    usage = defaultdict(lambda: [0, 0])
+    for namespace, nbytes in pairs:
+        usage[namespace][0] += 1
+        usage[namespace][1] += nbytes
+    return {namespace: tuple(row) for namespace, row in usage.items()}
+
+
+def tally(pairs):
+    """tally_sizes for (namespace, value) pairs, sized with approx_bytes."""
+    return tally_sizes((namespace, approx_bytes(value)) for namespace, value in pairs)
+
+
+class CacheMetrics:
+    def __init__(self, name, usage=None):
+        self.name = name
+        self.usage = usage  # () -> {namespace: (entries, bytes)}
+        self._counts = defaultdict(Counter)
+        self._lock = threading.Lock()
+
+    def record(self, namespace, event, n=1):
+        with self._lock:
+            self._counts[namespace][event] += n
+
+    def counts(self):
+        with self._lock:
+            return {namespace: dict(counter) for namespace, counter in self._counts.items()}
+
+
+def register(name, usage=None):
+    """Create (or replace, on module reload) the metrics object for a cache."""
+    metrics = CacheMetrics(name, usage)
+    _registry[name] = metrics
+    return metrics
+
+
+def snapshot():
+    """{cache: {namespace: {hits, stale_hits, misses, evictions, hit_ratio, entries, bytes}}}"""
+    result = {}
+    for name, metrics in list(_registry.items()):
+        counts = metrics.counts()
+        try:
+            usage = metrics.usage() if metrics.usage else {}
+        except Exception as e:
+            print(f"[CACHE METRICS] usage() failed for {name}: {e}")
+            usage = {}
+        namespaces = {}
+        for namespace in sorted(set(counts) | set(usage)):
+            row = {event: counts.get(namespace, {}).get(event, 0) for event in EVENTS}
+            lookups = row["hits"] + row["stale_hits"] + row["misses"]
+            row["hit_ratio"] = round((row["hits"] + row["stale_hits"]) / lookups, 4) if lookups else None
+            row["entries"], row["bytes"] = usage.get(namespace, (0, 0))
+            namespaces[namespace] = row
+        result[name] = namespaces
+    return result
+
+
+_PROMETHEUS = (
+    ("hits", "counter", "Cache lookups served fresh"),
+    ("stale_hits", "counter", "Cache lookups served stale while revalidating"),
+    ("misses", "counter", "Cache lookups that had to load the value"),
+    ("evictions", "counter", "Entries dropped to respect the size bound"),
+    ("entries", "gauge", "Entries currently held"),
+    ("bytes", "gauge", "Approximate memory held by entries"),
+)
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def prometheus_text(snap=None):
+    """Prometheus text exposition (format 0.0.4) of snapshot()."""
+    snap = snapshot() if snap is None else snap
+    lines = []
+    for field, kind, help_text in _PROMETHEUS:
+        metric = f"stockseer_cache_{field}" + ("_total" if kind == "counter" else "")
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for name, namespaces in snap.items():
+            for namespace, row in namespaces.items():
+                lines.append(f'{metric}{{cache="{_label(name)}",namespace="{_label(namespace)}"}} {row[field]}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,225 @@
+"""
+Snapshots of the in-process caches, so a restart or deploy starts warm.
+
+Written periodically and on shutdown, reloaded in the background at boot:
+
+- data_cache (quotes, search prices) and validity_cache (ticker validity) go
+  to one length-prefixed file each of the same packed entries they keep in Redis. The
+  absolute fresh/stale deadlines travel with each entry, so TTLs keep running
+  across the restart and expired entries are dropped on load.
+- history_cache and indicator_cache frames go to one uncompressed Arrow IPC
+  file each, which are memory-mapped on load so reading them is cheap.
+
+info_cache needs no snapshot: it is already backed by data/info/.
+"""
+import asyncio
+import json
+import os
+import shutil
+import struct
+import threading
+import time
+
+try:
+    import pyarrow as pa
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+from history_cache import history_cache
+from indicator_cache import indicator_cache
+from ticker_validity import validity_cache
+from tiered_cache import data_cache
+
+SNAPSHOT_DIR = os.getenv("CACHE_SNAPSHOT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "snapshots"))
+SNAPSHOT_ENABLED = os.getenv("CACHE_SNAPSHOT_ENABLED", "1") not in ("0", "false", "False")
+SNAPSHOT_INTERVAL = int(os.getenv("CACHE_SNAPSHOT_SECONDS", "600"))
+
+PACKED_CACHES = {"data_cache": data_cache, "validity_cache": validity_cache}
+_RECORD = struct.Struct("<II")  # key length, payload length
+_META_KEY = b"stockseer.snapshot"
+_lock = threading.Lock()
+_task = None
+_loaded = False
+
+
+def _tuplify(value):
+    """JSON turns tuples into lists; cache keys need them back as (hashable) tuples."""
+    if isinstance(value, list):
+        return tuple(_tuplify(v) for v in value)
+    return value
+
+
+# --- data_cache: packed entries ---
+
+def _write_packed(path, items):
+    with open(path, "wb") as f:
+        for namespace, key, packed in items:
+            header = json.dumps([namespace, key]).encode()
+            f.write(_RECORD.pack(len(header), len(packed)))
+            f.write(header)
+            f.write(packed)
+
+
+def _read_packed(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    items, offset = [], 0
+    while offset < len(data):
+        key_len, payload_len = _RECORD.unpack_from(data, offset)
+        offset += _RECORD.size
+        namespace, key = json.loads(data[offset:offset + key_len])
+        offset += key_len
+        items.append((namespace, key, data[offset:offset + payload_len]))
+        offset += payload_len
+    return items
+
+
+# --- Frame caches: one Arrow IPC file per entry ---
+
+def _write_frame(path, frame, meta):
+    table = pa.Table.from_pandas(frame, preserve_index=True)
+    metadata = dict(table.schema.metadata or {})
+    metadata[_META_KEY] = json.dumps(meta, default=str).encode()
+    table = table.replace_schema_metadata(metadata)
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def _read_frame(path):
+    with pa.memory_map(path, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+    meta = json.loads(table.schema.metadata[_META_KEY])
+    frame = table.to_pandas()
+    frame.attrs["ticker_symbol"] = meta.get("symbol")
+    return frame, meta
+
+
+def _write_frames(directory, entries):
+    """entries: [(meta, frame)]; written into a fresh directory that then replaces the old one."""
+    staging = f"{directory}.{os.getpid()}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    for i, (meta, frame) in enumerate(entries):
+        if frame is None or frame.empty:
+            continue
+        try:
+            _write_frame(os.path.join(staging, f"{i:05d}.arrow"), frame, meta)
+        except Exception as e:
+            print(f"[SNAPSHOT] Skipping frame {meta}: {e}")
+    retired = f"{directory}.{os.getpid()}.old"
+    if os.path.exists(directory):
+        os.replace(directory, retired)
+    os.replace(staging, directory)
+    shutil.rmtree(retired, ignore_errors=True)
+
+
+def _read_frames(directory):
+    if not os.path.isdir(directory):
+        return []
+    frames = []
+    # Files are numbered oldest first, so LRU order survives the reload
+    for name in sorted(os.listdir(directory)):
+        try:
+            frame, meta = _read_frame(os.path.join(directory, name))
+            frames.append((meta, frame))
+        except Exception as e:
+            print(f"[SNAPSHOT] Unreadable snapshot file {name}, ignoring: {e}")
+    return frames
+
+
+# --- Public API ---
+
+def save_snapshot(directory=SNAPSHOT_DIR):
+    """Write all cache snapshots; safe to call from a worker thread."""
+    with _lock:
+        started = time.monotonic()
+        os.makedirs(directory, exist_ok=True)
+        counts = {}
+        for name, cache in PACKED_CACHES.items():
+            items = cache.export()
+            tmp_path = os.path.join(directory, f"{name}.bin.{os.getpid()}.tmp")
+            _write_packed(tmp_path, items)
+            os.replace(tmp_path, os.path.join(directory, f"{name}.bin"))
+            counts[name] = len(items)
+        if ARROW_AVAILABLE:
+            windows = history_cache.export()
+            _write_frames(os.path.join(directory, "history"), [
+                ({"symbol": symbol, "fetched_at": fetched_at, "period": period}, frame)
+                for symbol, fetched_at, period, frame in windows
+            ])
+            indicators = indicator_cache.export()
+            _write_frames(os.path.join(directory, "indicators"), [
+                ({"symbol": key[-1][0], "key": key}, frame) for key, frame in indicators
+            ])
+            counts.update(history_cache=len(windows), indicator_cache=len(indicators))
+        print(f"[SNAPSHOT] Saved {counts} in {time.monotonic() - started:.2f}s")
+        return counts
+
+
+def load_snapshot(directory=SNAPSHOT_DIR):
+    """Reload caches from the last snapshot; expired entries are skipped."""
+    global _loaded
+    with _lock:
+        started = time.monotonic()
+        counts = {}
+        for name, cache in PACKED_CACHES.items():
+            packed_path = os.path.join(directory, f"{name}.bin")
+            if os.path.exists(packed_path):
+                try:
+                    counts[name] = cache.restore(_read_packed(packed_path))
+                except Exception as e:
+                    print(f"[SNAPSHOT] Could not reload {name}: {e}")
+        if ARROW_AVAILABLE:
+            counts["history_cache"] = history_cache.restore([
+                (meta["symbol"], meta["fetched_at"], meta["period"], frame)
+                for meta, frame in _read_frames(os.path.join(directory, "history"))
+            ])
+            counts["indicator_cache"] = indicator_cache.restore([
+                (_tuplify(meta["key"]), frame)
+                for meta, frame in _read_frames(os.path.join(directory, "indicators"))
+            ])
+        _loaded = True
+        print(f"[SNAPSHOT] Reloaded {counts} in {time.monotonic() - started:.2f}s")
+        return counts
+
+
+async def _run(interval):
+    # Reload first: saving before the reload finished would overwrite the snapshot with empty caches
+    try:
+        await asyncio.to_thread(load_snapshot)
+    except Exception as e:
+        print(f"[SNAPSHOT] Reload failed: {e}")
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(save_snapshot)
+        except Exception as e:
+            print(f"[SNAPSHOT] Periodic save failed: {e}")
+
+
+def start_snapshots(interval=SNAPSHOT_INTERVAL):
+    """Reload at boot without delaying readiness, then snapshot every `interval` seconds."""
+    global _task
+    if not SNAPSHOT_ENABLED or _task is not None:
+        return None
+    _task = asyncio.create_task(_run(interval))
+    return _task
+
+
+async def stop_snapshots():
+    """Cancel the periodic task and write a final snapshot."""
+    global _task
+    if _task is None:
+        return
+    _task.cancel()
+    try:
+        await _task
+    except asyncio.CancelledError:
+        pass
+    _task = None
+    if _loaded:
+        try:
+            await asyncio.to_thread(save_snapshot)
+        except Exception as e:
+            print(f"[SNAPSHOT] Shutdown save failed: {e}")
@@ -0,0 +1,252 @@
+"""
+Per-upstream circuit breakers.
+
+When an upstream (Yahoo through yfinance, the Google News scraper, the Yahoo,
+Economic Times and MoneyControl RSS feeds, Gemini) degrades, every call would
+otherwise wait out its full timeout and retries while holding a threadpool
+slot. After CIRCUIT_FAILURE_THRESHOLD consecutive failures a breaker opens and
+calls fail at once with CircuitOpen. Once CIRCUIT_RESET_SECONDS have passed a
+single probe call is let through (half-open): success closes the breaker, a
+failure reopens it with the wait doubled, up to CIRCUIT_MAX_RESET_SECONDS.
+
+Breakers also remember the last good result per key, so a caller can answer
+with that value, marked `stale`, instead of an error while its upstream is
+down. State is per process; each worker trips on its own failures.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+import pandas as pd
+
+from deadline import DeadlineExceeded
+from ticker_validity import is_invalid_symbol_error
+from upstream_scheduler import UpstreamThrottled, is_rate_limit_error
+
+FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+MAX_RESET_SECONDS = float(os.getenv("CIRCUIT_MAX_RESET_SECONDS", "300"))
+LAST_GOOD_MAX = int(os.getenv("CIRCUIT_LAST_GOOD_MAX", "2000"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+YFINANCE = "yfinance"
+GOOGLE_NEWS = "google_news"
+YAHOO_RSS = "yahoo_rss"
+ECONOMIC_TIMES = "economic_times"
+MONEYCONTROL = "moneycontrol"
+GEMINI = "gemini"
+
+# Hosts fetched by URL (news scrapers and feeds) -> breaker name
+HOST_BREAKERS = {
+    "news.google.com": GOOGLE_NEWS,
+    "feeds.finance.yahoo.com": YAHOO_RSS,
+    "economictimes.indiatimes.com": ECONOMIC_TIMES,
+    "moneycontrol.com": MONEYCONTROL,
+}
+
+
+class CircuitOpen(Exception):
+    def __init__(self, name, retry_after):
+        super().__init__(f"Upstream {name} unavailable (circuit open), retry after {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+def counts_as_failure(error):
+    """
+    Our own throttling and the host's 429s are handled by upstream_scheduler, not the breaker,
+    and a spent request budget says nothing about the upstream.
+    """
+    if isinstance(error, (CircuitOpen, UpstreamThrottled, DeadlineExceeded)):
+        return False
+    return not is_rate_limit_error(error)
+
+
+def _yfinance_failure(error):
+    # "No such symbol" means Yahoo answered; ticker_validity deals with it
+    return counts_as_failure(error) and not is_invalid_symbol_error(error)
+
+
+def mark_stale(value):
+    """Copy of a last-good value flagged `stale` (dict key, DataFrame attr, or per item of a list)."""
+    if isinstance(value, pd.DataFrame):
+        value = value.copy()
+        value.attrs["stale"] = True
+        return value
+    if isinstance(value, dict):
+        return {**value, "stale": True}
+    if isinstance(value, list):
+        return [mark_stale(item) for item in value]
+    return value
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD, reset_seconds=RESET_SECONDS,
+                 max_reset_seconds=MAX_RESET_SECONDS, is_failure=counts_as_failure, last_good_max=LAST_GOOD_MAX):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.max_reset_seconds = max_reset_seconds
+        self.is_failure = is_failure
+        self.last_good_max = last_good_max
+        self.state = CLOSED
+        self._failures = 0
+        self._wait = reset_seconds
+        self._open_until = 0.0
+        self._probe_until = 0.0
+        self._last_good = OrderedDict()  # key -> (stored_at, value)
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.rejected = 0
+        self.stale_served = 0
+        self.last_error = None
+
+    # --- State machine ---
+
+    def check(self):
+        """Raise CircuitOpen unless a call may go upstream now."""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            now = time.monotonic()
+            if now >= self._open_until and now >= self._probe_until:
+                # Half-open: this caller is the probe; the others keep failing fast until it reports
+                self.state = HALF_OPEN
+                self._probe_until = now + self._wait
+                return
+            self.rejected += 1
+            retry_after = max(self._open_until, self._probe_until) - now
+        raise CircuitOpen(self.name, retry_after)
+
+    def record_success(self):
+        with self._lock:
+            recovered = self.state != CLOSED
+            self.state = CLOSED
+            self._failures = 0
+            self._wait = self.reset_seconds
+            self._probe_until = 0.0
+        if recovered:
+            print(f"[CIRCUIT] {self.name} recovered, closing")
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self._failures += 1
+            self.last_error = f"{type(error).__name__}: {error}" if error is not None else None
+            if self.state == HALF_OPEN:
+                self._wait = min(self.max_reset_seconds, self._wait * 2)
+            elif self.state == OPEN or self._failures < self.failure_threshold:
+                return
+            self.state = OPEN
+            self.opened += 1
+            self._open_until = time.monotonic() + self._wait
+            self._probe_until = 0.0
+            failures, wait = self._failures, self._wait
+        print(f"[CIRCUIT] {self.name} open for {wait:.0f}s after {failures} consecutive failures: {error}")
+
+    def _settle(self, error):
+        if self.is_failure(error):
+            self.record_failure(error)
+
+    def call(self, fn, *args, **kwargs):
+        """fn(*args, **kwargs) through the breaker; raises CircuitOpen without calling fn while open."""
+        self.check()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self._settle(e)
+            raise
+        self.record_success()
+        return result
+
+    async def call_async(self, coro_fn, *args, **kwargs):
+        self.check()
+        try:
+            result = await coro_fn(*args, **kwargs)
+        except Exception as e:
+            self._settle(e)
+            raise
+        self.record_success()
+        return result
+
+    # --- Last good values ---
+
+    def remember(self, key, value):
+        with self._lock:
+            self._last_good[key] = (time.time(), value)
+            self._last_good.move_to_end(key)
+            while len(self._last_good) > self.last_good_max:
+                self._last_good.popitem(last=False)
+
+    def last_good(self, key):
+        """The last value remembered for key, marked stale, or None."""
+        with self._lock:
+            entry = self._last_good.get(key)
+            if entry is None:
+                return None
+            self.stale_served += 1
+        return mark_stale(entry[1])
+
+    def stats(self):
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "state": self.state,
+                "consecutive_failures": self._failures,
+                "retry_after": round(max(0.0, self._open_until - now), 1) if self.state == OPEN else 0.0,
+                "opened": self.opened,
+                "rejected": self.rejected,
+                "stale_served": self.stale_served,
+                "last_good_entries": len(self._last_good),
+                "last_error": self.last_error,
+            }
+
+
+breakers = {
+    name: CircuitBreaker(name, is_failure=_yfinance_failure if name == YFINANCE else counts_as_failure)
+    for name in (YFINANCE, GOOGLE_NEWS, YAHOO_RSS, ECONOMIC_TIMES, MONEYCONTROL, GEMINI)
+}
+_breakers_lock = threading.Lock()
+
+yfinance_breaker = breakers[YFINANCE]
+gemini_breaker = breakers[GEMINI]
+
+
+def breaker_for_url(url):
+    """Breaker for the host of a URL; hosts without a named breaker get one of their own."""
+    host = urlparse(url).netloc.split(":")[0].lower()
+    if host.startswith("www."):
+        host = host[4:]
+    name = HOST_BREAKERS.get(host, host)
+    with _breakers_lock:
+        if name not in breakers:
+            breakers[name] = CircuitBreaker(name)
+        return breakers[name]
+
+
+def stats():
+    return {name: breaker.stats() for name, breaker in list(breakers.items())}
+
+
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+def prometheus_text(snap=None):
+    """Breaker state (0 closed, 1 half-open, 2 open) and counters in the Prometheus text format."""
+    snap = stats() if snap is None else snap
+    lines = []
+    for field, kind, help_text in (
+        ("state", "gauge", "Circuit state: 0 closed, 1 half-open, 2 open"),
+        ("opened", "counter", "Times the circuit opened"),
+        ("rejected", "counter", "Calls failed fast while the circuit was open"),
+        ("stale_served", "counter", "Last good values served while the upstream was failing"),
+    ):
+        metric = f"stockseer_circuit_{field}" + ("_total" if kind == "counter" else "")
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for name, row in snap.items():
+            value = _STATE_VALUES[row["state"]] if field == "state" else row[field]
+            lines.append(f'{metric}{{upstream="{name}"}} {value}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,139 @@
+"""
+Compact columnar frames for the in-process price and indicator caches.
+
+The indicator caches kept a full copy of the price columns next to each
+indicator set, every cached pandas frame carried its own block manager and
+index objects, and every hit paid a `df.copy()`. A CompactFrame holds:
+
+- the index as int64 epoch timestamps, plus its unit, timezone and name,
+- every column in its own dtype, floats at full float64 precision, so a
+  cache hit returns exactly the values a miss computed (crossover signals
+  sit right at thresholds, and OBV/Volume sums outgrow float32).
+
+Columns of one dtype share a single (columns x bars) block, and frames with the
+same columns share one copy of the names and layout, so a small frame isn't
+mostly per-array overhead. Blocks are read-only and `slice()` returns views:
+cutting a 1mo request out of a cached 1y window copies nothing until
+`to_pandas()` builds the float64 frame that callers get.
+"""
+import numpy as np
+import pandas as pd
+
+_layouts = {}  # (columns, locations) -> the same tuple, shared by every frame with that layout
+_column_indexes = {}  # layout -> pd.Index of its columns, so hits don't rebuild it
+
+
+def _frozen(values):
+    values.flags.writeable = False
+    return values
+
+
+class CompactFrame:
+    __slots__ = ('timestamps', 'blocks', 'layout', 'unit', 'tz', 'index_name', 'attrs')
+
+    def __init__(self, timestamps, blocks, layout, unit='ns', tz=None, index_name=None, attrs=None):
+        self.timestamps = timestamps  # int64 epoch values in `unit`, UTC for tz-aware indexes
+        self.blocks = blocks  # one (columns x bars) array per stored dtype
+        self.layout = layout  # (column names, (block, row) of each)
+        self.unit = unit
+        self.tz = tz
+        self.index_name = index_name
+        self.attrs = dict(attrs or {})
+
+    @classmethod
+    def from_pandas(cls, df):
+        """Compact copy of a DatetimeIndex frame; raises TypeError for any other index."""
+        index = df.index
+        if not isinstance(index, pd.DatetimeIndex):
+            raise TypeError(f"CompactFrame needs a DatetimeIndex, got {type(index).__name__}")
+        names = tuple(df.columns)
+        values = [df.iloc[:, position].to_numpy() for position in range(len(names))]
+        dtypes = [column.dtype for column in values]
+        groups = list(dict.fromkeys(dtypes))
+        blocks = [np.empty((dtypes.count(dtype), len(index)), dtype=dtype) for dtype in groups]
+        rows = [0] * len(groups)
+        locations = []
+        for column, dtype in zip(values, dtypes):
+            block = groups.index(dtype)
+            blocks[block][rows[block]] = column
+            locations.append((block, rows[block]))
+            rows[block] += 1
+        layout = (names, tuple(locations))
+        layout = _layouts.setdefault(layout, layout)
+        return cls(
+            _frozen(index.asi8.copy()), tuple(_frozen(block) for block in blocks), layout,
+            index.unit, index.tz, index.name, df.attrs,
+        )
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def columns(self):
+        return self.layout[0]
+
+    @property
+    def empty(self):
+        return not len(self) or not self.columns
+
+    @property
+    def nbytes(self):
+        return self.timestamps.nbytes + sum(block.nbytes for block in self.blocks)
+
+    @property
+    def index(self):
+        index = pd.DatetimeIndex(self.timestamps.view(f'M8[{self.unit}]'), name=self.index_name)
+        return index if self.tz is None else index.tz_localize('UTC').tz_convert(self.tz)
+
+    def slice(self, start=None, stop=None):
+        """Rows start:stop (positions) as a CompactFrame of views."""
+        return CompactFrame(
+            self.timestamps[start:stop], tuple(block[:, start:stop] for block in self.blocks), self.layout,
+            self.unit, self.tz, self.index_name, self.attrs,
+        )
+
+    def to_pandas(self, columns=None, index=None):
+        """
+        Float64 DataFrame of the requested columns (all by default) with the original attrs.
+
+        Pass `index` to reuse an equal pandas index instead of rebuilding one from the timestamps.
+        """
+        names, locations = self.layout
+        where = dict(zip(names, locations))
+        wanted = names if columns is None else [name for name in columns if name in where]
+        index = self.index if index is None else index
+        # One upcast or copy per block; the frame can own the fresh arrays as they are
+        used = {where[name][0] for name in wanted}
+        blocks = {
+            block: self.blocks[block].astype(np.float64) if self.blocks[block].dtype.kind == 'f' else self.blocks[block].copy()
+            for block in used
+        }
+        if len(used) == 1:
+            # All from one block (indicator entries always are): pandas takes the 2-D array as one block
+            (values,) = blocks.values()
+            rows = [where[name][1] for name in wanted]
+            if rows != list(range(len(values))):
+                values = values[rows]
+            columns = _column_indexes.get(self.layout) if wanted is names else None
+            if columns is None:
+                columns = pd.Index(wanted)
+                if wanted is names:
+                    _column_indexes[self.layout] = columns
+            df = pd.DataFrame(values.T, index=index, columns=columns, copy=False)
+        else:
+            data = {name: blocks[where[name][0]][where[name][1]] for name in wanted}
+            df = pd.DataFrame(data, index=index, copy=False)
+        df.attrs = dict(self.attrs)
+        return df
+
+
+def compact(df):
+    """CompactFrame for df, or df itself when it can't be compacted (no DatetimeIndex)."""
+    if isinstance(df, pd.DataFrame) and isinstance(df.index, pd.DatetimeIndex):
+        return CompactFrame.from_pandas(df)
+    return df
+
+
+def expand(value):
+    """pandas DataFrame for a cached value, compact or not; a plain DataFrame is copied."""
+    return value.to_pandas() if isinstance(value, CompactFrame) else value.copy()
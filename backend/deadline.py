@@ -0,0 +1,83 @@
+"""
+Per-request deadline budgets for upstream calls.
+
+Every API request gets a time budget: REQUEST_BUDGET_SECONDS, or the
+caller's X-Request-Budget-Ms header clamped to MIN_REQUEST_BUDGET_SECONDS ..
+MAX_REQUEST_BUDGET_SECONDS (the floor matters because coalesced fetches run
+under the budget of the request that started them).
+
+The absolute deadline lives in a contextvar, so it follows the request into
+run_in_threadpool and asyncio.to_thread work. Upstream calls size their
+timeouts with `timeout(cap)`, which is their usual timeout cut down to what
+is left of the budget, and retry loops stop once the budget is spent.
+Background work (cache revalidation, warmers, the news worker) runs without
+a deadline.
+"""
+import contextlib
+import contextvars
+import os
+import time
+
+REQUEST_BUDGET = float(os.getenv("REQUEST_BUDGET_SECONDS", "15"))
+MIN_REQUEST_BUDGET = float(os.getenv("MIN_REQUEST_BUDGET_SECONDS", "1"))
+MAX_REQUEST_BUDGET = float(os.getenv("MAX_REQUEST_BUDGET_SECONDS", "60"))
+BUDGET_HEADER = "x-request-budget-ms"
+
+_deadline = contextvars.ContextVar("request_deadline", default=None)  # time.monotonic() value or None
+
+
+class DeadlineExceeded(TimeoutError):
+    def __init__(self, what="upstream call"):
+        super().__init__(f"Request deadline exceeded before {what}")
+
+
+def budget_from_header(value):
+    """Seconds of budget for a request, from the X-Request-Budget-Ms header value if valid."""
+    try:
+        seconds = float(value) / 1000.0
+    except (TypeError, ValueError):
+        return REQUEST_BUDGET
+    return min(MAX_REQUEST_BUDGET, max(MIN_REQUEST_BUDGET, seconds)) if seconds > 0 else REQUEST_BUDGET
+
+
+@contextlib.contextmanager
+def deadline_scope(seconds):
+    """
+    Run the enclosed work with `seconds` of budget; never extends an enclosing deadline.
+
+    `None` clears the deadline, for background work started from inside a request.
+    """
+    if seconds is None:
+        deadline = None
+    else:
+        deadline = time.monotonic() + seconds
+        outer = _deadline.get()
+        if outer is not None:
+            deadline = min(deadline, outer)
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    """Seconds left in the current budget (may be negative), or None without a deadline."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def check(what="upstream call"):
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(what)
+
+
+def timeout(cap, what="upstream call"):
+    """Timeout for one upstream call: `cap` cut down to the remaining budget. Raises once it is spent."""
+    left = remaining()
+    if left is None:
+        return cap
+    if left <= 0:
+        raise DeadlineExceeded(what)
+    return left if cap is None else min(cap, left)
@@ -0,0 +1,189 @@
+"""
+Hedged upstream requests.
+
+Tail latency is dominated by the occasional very slow Yahoo response. A
+Hedger runs a call and, if it hasn't answered after the HEDGE_PERCENTILE
+latency of recent calls of the same kind, sends one duplicate; whichever
+succeeds first wins. Only the slowest ~5% of calls get a duplicate, so
+upstream load barely moves. No hedge is sent:
+
+- until HEDGE_MIN_SAMPLES latencies have been recorded,
+- when the request's deadline would run out before the hedge delay,
+- when the hedge pool is full or the host's rate-limit bucket has no token.
+
+An async loser is cancelled. A threaded loser can't be interrupted, so it
+finishes in the hedge pool and its result is dropped.
+"""
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+
+import deadline
+from deadline import DeadlineExceeded
+from upstream_scheduler import upstream_scheduler, YAHOO
+
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "1") not in ("0", "false", "False")
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY_SECONDS", "0.05"))
+HEDGE_WORKERS = int(os.getenv("HEDGE_WORKERS", "16"))
+SAMPLE_WINDOW = 256
+
+_executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="hedge")
+_slots = threading.BoundedSemaphore(HEDGE_WORKERS)
+
+
+class Hedger:
+    def __init__(self, name, host=None):
+        self.name = name
+        # Host whose rate-limit bucket pays for the duplicate; None when the call takes its own tokens
+        self.host = host
+        self._samples = deque(maxlen=SAMPLE_WINDOW)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_won = 0
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def delay(self):
+        """Seconds to wait before sending a duplicate, or None when this call shouldn't be hedged."""
+        if not HEDGE_ENABLED:
+            return None
+        with self._lock:
+            if len(self._samples) < HEDGE_MIN_SAMPLES:
+                return None
+            samples = list(self._samples)
+        delay = max(HEDGE_MIN_DELAY, float(np.percentile(samples, HEDGE_PERCENTILE)))
+        left = deadline.remaining()
+        if left is not None and left <= delay:
+            return None
+        return delay
+
+    def _admit_hedge(self):
+        if self.host is not None and not upstream_scheduler.try_acquire(self.host)[0]:
+            return False
+        with self._lock:
+            self.hedged += 1
+        return True
+
+    def _timed(self, fn, *args, **kwargs):
+        started = time.monotonic()
+        result = fn(*args, **kwargs)
+        self.record(time.monotonic() - started)
+        return result
+
+    async def _timed_async(self, coro_fn, *args, **kwargs):
+        started = time.monotonic()
+        result = await coro_fn(*args, **kwargs)
+        self.record(time.monotonic() - started)
+        return result
+
+    # --- Threaded calls ---
+
+    def _submit(self, fn, args, kwargs):
+        # Each attempt gets its own copy of the caller's context (deadline, upstream priority)
+        future = _executor.submit(contextvars.copy_context().run, self._timed, fn, *args, **kwargs)
+        future.add_done_callback(lambda _f: _slots.release())
+        return future
+
+    def call(self, fn, *args, **kwargs):
+        """fn(*args, **kwargs), duplicated once if it runs past the hedge delay."""
+        with self._lock:
+            self.calls += 1
+        delay = self.delay()
+        if delay is None or not _slots.acquire(blocking=False):
+            return self._timed(fn, *args, **kwargs)
+        attempts = [self._submit(fn, args, kwargs)]
+        done, _ = wait(attempts, timeout=delay)
+        if not done and _slots.acquire(blocking=False):
+            if self._admit_hedge():
+                attempts.append(self._submit(fn, args, kwargs))
+            else:
+                _slots.release()
+        return self._first_result(attempts)
+
+    def _first_result(self, attempts):
+        pending, error = set(attempts), None
+        while pending:
+            left = deadline.remaining()
+            done, pending = wait(pending, timeout=None if left is None else max(0.0, left), return_when=FIRST_COMPLETED)
+            if not done:
+                raise DeadlineExceeded(f"{self.name} response")
+            for future in done:
+                if future.exception() is None:
+                    if future is not attempts[0]:
+                        with self._lock:
+                            self.hedge_won += 1
+                    return future.result()
+                error = error or future.exception()
+        raise error
+
+    # --- Event-loop calls ---
+
+    async def call_async(self, coro_fn, *args, **kwargs):
+        """Async counterpart of call(); the losing attempt is cancelled."""
+        with self._lock:
+            self.calls += 1
+        delay = self.delay()
+        if delay is None:
+            return await self._timed_async(coro_fn, *args, **kwargs)
+        primary = asyncio.ensure_future(self._timed_async(coro_fn, *args, **kwargs))
+        attempts, error = [primary], None
+        pending = set(attempts)
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done and self._admit_hedge():
+                attempts.append(asyncio.ensure_future(self._timed_async(coro_fn, *args, **kwargs)))
+                pending.add(attempts[-1])
+            while pending:
+                left = deadline.remaining()
+                done, pending = await asyncio.wait(
+                    pending, timeout=None if left is None else max(0.0, left), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    raise DeadlineExceeded(f"{self.name} response")
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            with self._lock:
+                                self.hedge_won += 1
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in attempts:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self):
+        with self._lock:
+            samples = list(self._samples)
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_won": self.hedge_won,
+            "samples": len(samples),
+            f"p{HEDGE_PERCENTILE:g}_seconds": round(float(np.percentile(samples, HEDGE_PERCENTILE)), 3) if samples else None,
+        }
+
+
+# yfinance quote and history calls take their token before the hedged call, so the duplicate
+# pays for its own; the async chart client takes a token per request by itself
+quote_hedger = Hedger("quote", YAHOO)
+history_hedger = Hedger("history", YAHOO)
+chart_hedger = Hedger("chart")
+
+hedgers = {h.name: h for h in (quote_hedger, history_hedger, chart_hedger)}
+
+
+def stats():
+    return {"enabled": HEDGE_ENABLED, **{name: h.stats() for name, h in hedgers.items()}}
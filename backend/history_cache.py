@@ -0,0 +1,123 @@
+"""
+In-memory cache of the longest daily history window fetched per symbol.
+
+Daily requests for shorter periods (1mo, 3mo, 6mo, ...) are answered by slicing
+the cached window instead of making another upstream call. Windows expire
+HISTORY_TTL after the fetch while the symbol's market trades, and stay valid
+until the next open once its session has settled. Short requests are
+promoted to at least MIN_WINDOW so the first fetch already covers the common
+periods used by the chart, technical, prediction and ML endpoints.
+
+Windows are held as CompactFrames: a shorter period is a view of the window
+until it is handed out as a pandas frame.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from cache_metrics import register, tally
+from compact_frame import CompactFrame, compact, expand
+from market_calendar import valid_until
+from ohlcv_store import period_days, period_start, slice_period
+
+MIN_WINDOW = os.getenv("HISTORY_MIN_WINDOW", "1y")
+HISTORY_TTL = int(os.getenv("HISTORY_CACHE_TTL", "300"))
+MAX_SYMBOLS = int(os.getenv("HISTORY_CACHE_MAX_SYMBOLS", "500"))
+
+
+class HistoryWindowCache:
+    def __init__(self, ttl=HISTORY_TTL, max_symbols=MAX_SYMBOLS, min_window=MIN_WINDOW):
+        self.ttl = ttl
+        self.max_symbols = max_symbols
+        self.min_window = min_window
+        self._entries = OrderedDict()  # symbol -> (fetched_at, period, frame)
+        self._lock = threading.Lock()
+        self.metrics = register("history_cache", self.usage)
+
+    def window_for(self, period):
+        """The period to actually fetch for a request, so later shorter requests can be sliced."""
+        wanted = period_days(period)
+        if wanted is None:
+            return period
+        return period if wanted >= period_days(self.min_window) else self.min_window
+
+    def get(self, symbol, period, allow_stale=False):
+        """
+        Return a copy of the cached bars for `period`, or None if the window is missing, stale or too short.
+
+        With `allow_stale` (upstream unavailable) an expired window is returned too, with attrs['stale'] set.
+        """
+        wanted = period_days(period)
+        if wanted is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(symbol)
+            if entry is None:
+                self.metrics.record("daily", "misses")
+                return None
+            fetched_at, window, frame = entry
+            expired = time.time() >= valid_until(symbol, fetched_at, self.ttl)
+            if (expired and not allow_stale) or period_days(window) < wanted:
+                self.metrics.record("daily", "misses")
+                return None
+            self._entries.move_to_end(symbol)
+        self.metrics.record("daily", "stale_hits" if expired else "hits")
+        if isinstance(frame, CompactFrame):
+            index = frame.index
+            start = period_start(index, period)
+            sliced = frame.slice(start).to_pandas(index=index[start:])
+        else:
+            sliced = slice_period(frame, period).copy()
+        sliced.attrs['ticker_symbol'] = frame.attrs.get('ticker_symbol', symbol)
+        if expired:
+            sliced.attrs['stale'] = True
+        return sliced
+
+    def put(self, symbol, period, frame):
+        """Store a fetched window unless a fresh, longer one is already cached."""
+        if frame is None or frame.empty or period_days(period) is None:
+            return
+        now = time.time()
+        stored = compact(frame)
+        with self._lock:
+            entry = self._entries.get(symbol)
+            if entry is not None:
+                fetched_at, window, _ = entry
+                if now < valid_until(symbol, fetched_at, self.ttl) and period_days(window) > period_days(period):
+                    return
+            self._entries[symbol] = (now, period, stored)
+            self._entries.move_to_end(symbol)
+            while len(self._entries) > self.max_symbols:
+                self._entries.popitem(last=False)
+                self.metrics.record("daily", "evictions")
+
+    def usage(self):
+        with self._lock:
+            frames = [("daily", frame) for _, _, frame in self._entries.values()]
+        return tally(frames)
+
+    def export(self):
+        """[(symbol, fetched_at, period, frame)], oldest first, for cache_snapshot."""
+        with self._lock:
+            entries = list(self._entries.items())
+        return [(symbol, fetched_at, period, expand(frame)) for symbol, (fetched_at, period, frame) in entries]
+
+    def restore(self, items):
+        """Load exported windows that are still within the TTL."""
+        now, restored = time.time(), 0
+        for symbol, fetched_at, period, frame in items:
+            if now < valid_until(symbol, fetched_at, self.ttl):
+                stored = compact(frame)
+                with self._lock:
+                    self._entries[symbol] = (fetched_at, period, stored)
+                    self._entries.move_to_end(symbol)
+                restored += 1
+        return restored
+
+    def invalidate(self, symbol):
+        with self._lock:
+            self._entries.pop(symbol, None)
+
+
+history_cache = HistoryWindowCache()
@@ -0,0 +1,140 @@
+"""
+In-memory cache of computed indicator frames.
+
+The technical, enhanced-technical, prediction, chatbot and ML endpoints all run
+indicator functions over the same few history windows. Entries are keyed by
+(symbol, bar interval, indicator set, window, last bar), so every caller that
+sees the same bars shares one computation. When a new bar arrives, or the
+forming bar's close moves, the key changes and the old entry ages out of the
+LRU instead of needing explicit invalidation.
+
+Entries are CompactFrames. For functions that only add columns to their input
+(`adds_columns`), just those columns are kept; a hit joins them back onto the
+caller's frame, whose bars the key guarantees are the same.
+"""
+import functools
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from cache_metrics import register, tally
+from compact_frame import CompactFrame, compact, expand
+
+MAX_FRAMES = int(os.getenv("INDICATOR_CACHE_MAX_FRAMES", "256"))
+
+
+def bar_interval(index):
+    """Smallest spacing among the last few bars, so weekend gaps don't skew daily data."""
+    if len(index) < 2:
+        return None
+    try:
+        return str(np.diff(index[-5:]).min())
+    except TypeError:
+        return None
+
+
+def frame_key(df, symbol=None):
+    """
+    Identity of a bar window, or None when the frame can't be attributed to a symbol.
+
+    Made of plain strings and numbers so keys survive a JSON round trip in cache snapshots.
+    """
+    symbol = symbol or df.attrs.get('ticker_symbol')
+    if not symbol or df.empty:
+        return None
+    index = df.index
+    last_close = float(df['Close'].iat[-1]) if 'Close' in df.columns else None
+    return (str(symbol).upper(), bar_interval(index), len(df), str(index[0]), str(index[-1]), last_close)
+
+
+def _join(df, cached, symbol):
+    """df plus the cached columns it doesn't already have (entries from older snapshots hold whole frames)."""
+    added = [column for column in cached.columns if column not in df.columns]
+    added = cached.to_pandas(None if len(added) == len(cached.columns) else added, index=df.index)
+    out = pd.concat([df, added], axis=1)
+    out.attrs = {**df.attrs, 'ticker_symbol': symbol}
+    return out
+
+
+class IndicatorCache:
+    def __init__(self, max_frames=MAX_FRAMES):
+        self.max_frames = max_frames
+        self._frames = OrderedDict()  # (indicator set, args, frame key) -> indicator frame
+        self._lock = threading.Lock()
+        self.metrics = register("indicator_cache", self.usage)
+
+    def get_or_compute(self, name, df, fn, *args, symbol=None, adds_columns=False, **kwargs):
+        """
+        Return fn(df, ...) for this window, computing it at most once while the bars are unchanged.
+
+        `adds_columns` says fn returns df plus new columns, so only those need caching.
+        """
+        window = frame_key(df, symbol)
+        if window is None:
+            return fn(df, *args, **kwargs)
+        key = (name, args, tuple(sorted(kwargs.items())), window)
+        with self._lock:
+            cached = self._frames.get(key)
+            if cached is not None:
+                self._frames.move_to_end(key)
+        self.metrics.record(name, "hits" if cached is not None else "misses")
+        if cached is not None:
+            # Callers add columns to what they get back, so every hit builds a new frame
+            if adds_columns and isinstance(cached, CompactFrame) and len(cached) == len(df):
+                return _join(df, cached, window[0])
+            return expand(cached)
+
+        result = fn(df, *args, **kwargs)
+        result.attrs['ticker_symbol'] = window[0]
+        if adds_columns and result.index.equals(df.index):
+            entry = compact(result[[column for column in result.columns if column not in df.columns]])
+        else:
+            entry = compact(result)
+        if not isinstance(entry, CompactFrame):
+            # No DatetimeIndex to compact on: keep a private copy, since the caller gets `result`
+            entry = result.copy()
+        with self._lock:
+            self._frames[key] = entry
+            self._frames.move_to_end(key)
+            while len(self._frames) > self.max_frames:
+                (evicted_name, *_), _ = self._frames.popitem(last=False)
+                self.metrics.record(evicted_name, "evictions")
+        # The cache holds its own compact copy, so the fresh result can go to the caller as it is
+        return result
+
+    def memoize(self, name, adds_columns=False):
+        """Decorator for `fn(df, ...)` indicator functions; pass `symbol=` when df.attrs lacks it."""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(df, *args, symbol=None, **kwargs):
+                return self.get_or_compute(name, df, fn, *args, symbol=symbol, adds_columns=adds_columns, **kwargs)
+            return wrapper
+        return decorator
+
+    def usage(self):
+        with self._lock:
+            frames = [(key[0], frame) for key, frame in self._frames.items()]
+        return tally(frames)
+
+    def export(self):
+        """[(key, frame)], oldest first, for cache_snapshot."""
+        with self._lock:
+            items = list(self._frames.items())
+        return [(key, expand(frame)) for key, frame in items]
+
+    def restore(self, items):
+        # Keys embed the last bar, so a restored frame is only ever served for unchanged bars
+        items = [(key, compact(frame)) for key, frame in items]
+        with self._lock:
+            for key, frame in items:
+                self._frames[key] = frame
+                self._frames.move_to_end(key)
+            while len(self._frames) > self.max_frames:
+                self._frames.popitem(last=False)
+        return len(items)
+
+
+indicator_cache = IndicatorCache()
@@ -0,0 +1,450 @@
+"""
+Vectorised technical indicators on contiguous float64 arrays.
+
+The `ta` helpers each rebuild their own intermediates: macd, macd_signal and
+macd_diff compute the same 12/26 EMAs three times, Bollinger and SMA_20 both
+roll the same 20-bar window, stochastic and Williams %R both take the same
+14-bar highs and lows, and CCI and MFI go through pandas rolling.apply with a
+Python callback per bar.
+
+Here every indicator, and every intermediate shared between indicators (EMAs,
+rolling highs and lows, true range, typical price), is a node in INDICATORS
+that names the nodes it reads. A caller asks for output names; plan() walks
+their dependencies and IndicatorFrame evaluates just those nodes, each once.
+Asking for MACD_hist computes the two EMAs, MACD_line and MACD_signal and
+nothing else. A new indicator is one register() call.
+
+Every array operation runs along the last axis, so the same code handles one
+symbol's bars or a (symbols x bars) matrix: price_matrix() right-aligns many
+symbols' histories, with shorter ones NaN-padded on the left, and
+cross_section() computes the indicators for all of them at once.
+
+Outputs match ta 0.11 with fillna=False, including its warm-up NaNs and
+ATR's zero-filled start. Recursive averages run through scipy's lfilter when
+it is available, else through pandas' ewm.
+"""
+import functools
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    from scipy.signal import lfilter
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+SHIFTED_WINDOW_MAX = 40  # rolling windows up to this long are accumulated over shifted slices
+
+OHLCV_COLUMNS = ('Close', 'High', 'Low', 'Volume')
+
+
+def _as_array(values):
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+def _rolling(x, window, ufunc):
+    """ufunc.reduce over each `window`-bar window along the last axis: shape (..., n - window + 1)."""
+    n = x.shape[-1]
+    if n < window:
+        return np.empty(x.shape[:-1] + (0,))
+    if window > SHIFTED_WINDOW_MAX:
+        return ufunc.reduce(sliding_window_view(x, window, axis=-1), axis=-1)
+    # Short windows: `window` passes over whole rows beat reducing thousands of tiny windows
+    acc = x[..., window - 1:].copy()
+    for k in range(1, window):
+        ufunc(acc, x[..., window - 1 - k:n - k], out=acc)
+    return acc
+
+
+def _rolling_deviation(x, window, mean, fn):
+    """Mean of fn(x - window mean) over each window: np.square gives the population variance, np.abs the mean absolute deviation."""
+    n = x.shape[-1]
+    if not mean.shape[-1]:
+        return mean.copy()
+    if window > SHIFTED_WINDOW_MAX:
+        return fn(sliding_window_view(x, window, axis=-1) - mean[..., None]).mean(axis=-1)
+    acc = np.zeros_like(mean)
+    for k in range(window):
+        acc += fn(x[..., window - 1 - k:n - k] - mean)
+    return acc / window
+
+
+def _pad(values, n):
+    """Left-pad a per-window result with NaN back to length n (rolling min_periods=window)."""
+    out = np.full(values.shape[:-1] + (n,), np.nan)
+    if values.shape[-1]:
+        out[..., n - values.shape[-1]:] = values
+    return out
+
+
+def _shift(x):
+    """x one bar back along the last axis, NaN first (Series.shift(1))."""
+    out = np.empty_like(x)
+    out[..., :1] = np.nan
+    out[..., 1:] = x[..., :-1]
+    return out
+
+
+def _seen(x):
+    """True from each row's first non-NaN value on."""
+    return np.logical_or.accumulate(~np.isnan(x), axis=-1)
+
+
+def _recursive_mean(x, alpha, seed):
+    """y[..., 0] = seed, y[..., i] = (1 - alpha) * y[..., i-1] + alpha * x[..., i]."""
+    seed = np.asarray(seed, dtype=np.float64)
+    out = np.empty_like(x)
+    out[..., 0] = seed
+    if x.shape[-1] > 1:
+        if SCIPY_AVAILABLE:
+            zi = ((1.0 - alpha) * seed)[..., None]
+            out[..., 1:], _ = lfilter([alpha], [1.0, alpha - 1.0], x[..., 1:], axis=-1, zi=zi)
+        else:
+            rows = np.atleast_2d(out)
+            rows[:, 1:] = np.atleast_2d(x)[:, 1:]
+            rows[:] = pd.DataFrame(rows.T).ewm(alpha=alpha, adjust=False).mean().to_numpy().T
+    return out
+
+
+def ewm(x, alpha, min_periods):
+    """pandas ewm(alpha, adjust=False, min_periods).mean() along the last axis, for rows with only leading NaNs."""
+    x = _as_array(x)
+    seen = _seen(x)
+    if (np.isnan(x) & seen).any():
+        # Gaps inside a series: pandas' NaN weighting is not worth re-deriving
+        rows = pd.DataFrame(np.atleast_2d(x).T).ewm(alpha=alpha, min_periods=min_periods, adjust=False).mean()
+        return rows.to_numpy().T.reshape(x.shape)
+    # Filling each row's leading NaNs with its first value leaves the average at exactly that value until the row starts
+    first = np.take_along_axis(x, np.argmax(seen, axis=-1)[..., None], axis=-1)
+    out = _recursive_mean(np.where(seen, x, first), alpha, first[..., 0])
+    out[np.cumsum(seen, axis=-1) < min_periods] = np.nan
+    return out
+
+
+def sma(x, window):
+    x = _as_array(x)
+    return _pad(_rolling(x, window, np.add) / window, x.shape[-1])
+
+
+def ema(x, window):
+    return ewm(x, 2.0 / (window + 1), window)
+
+
+def rolling_max(x, window):
+    return _pad(_rolling(x, window, np.maximum), x.shape[-1])
+
+
+def rolling_min(x, window):
+    return _pad(_rolling(x, window, np.minimum), x.shape[-1])
+
+
+def rolling_std(x, window, mean):
+    """Population std over each window, given the padded rolling mean of x."""
+    return _pad(np.sqrt(_rolling_deviation(x, window, mean[..., window - 1:], np.square)), x.shape[-1])
+
+
+def true_range(high, low, prev_close):
+    # DataFrame.max(axis=1) skips NaN, so the first bar is just high - low
+    return np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+
+
+def rsi(close, window=14):
+    diff = np.diff(close, axis=-1, prepend=np.nan)
+    # The first bar's missing diff counts as 0; bars before a row starts stay NaN
+    started = _seen(close)
+    with np.errstate(invalid='ignore'):
+        up = np.where(started, np.where(diff > 0, diff, 0.0), np.nan)
+        down = np.where(started, np.where(diff < 0, -diff, 0.0), np.nan)
+    alpha = 1.0 / window
+    ema_up, ema_down = ewm(up, alpha, window), ewm(down, alpha, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(ema_down == 0, 100.0, 100.0 - 100.0 / (1.0 + ema_up / ema_down))
+
+
+def wilder_atr(ranges, window=14):
+    """Wilder ATR seeded with the mean of the first `window` true ranges; zeros before that, as in ta."""
+    shape, n = ranges.shape, ranges.shape[-1]
+    ranges = np.atleast_2d(ranges)
+    out = np.full(ranges.shape, np.nan)
+    seen = _seen(ranges)
+    starts = np.where(seen[:, -1], np.argmax(seen, axis=-1), n)  # rows without data never start
+    # Rows of a matrix start at different bars; each group of rows starting together is one filter pass
+    for start in np.unique(starts):
+        rows = starts == start
+        seed_at = start + window - 1
+        if seed_at >= n:
+            continue
+        block = ranges[rows]
+        out[rows, seed_at:] = _recursive_mean(block[:, seed_at:], 1.0 / window, np.nanmean(block[:, start:seed_at + 1], axis=-1))
+        out[rows, start:seed_at] = 0.0
+    return out.reshape(shape)
+
+
+def cci(typical, window=20, constant=0.015):
+    mean = _rolling(typical, window, np.add) / window
+    mad = _rolling_deviation(typical, window, mean, np.abs)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return _pad((typical[..., window - 1:] - mean) / (constant * mad), typical.shape[-1])
+
+
+def obv(close, prev_close, volume):
+    signed = np.where(close < prev_close, -volume, volume)
+    # Series.cumsum skips NaN volumes instead of poisoning the rest of the series
+    out = np.nancumsum(signed, axis=-1)
+    out[np.isnan(signed)] = np.nan
+    return out
+
+
+def mfi(typical, volume, window=14):
+    prev = _shift(typical)
+    direction = np.where(typical > prev, 1.0, np.where(typical < prev, -1.0, 0.0))
+    flow = typical * volume * direction
+    # A NaN flow counts as 0, as in ta's rolling.apply; bars before a row starts stay NaN
+    started = _seen(typical)
+    positive = _pad(_rolling(np.where(flow >= 0.0, flow, np.where(started, 0.0, np.nan)), window, np.add), typical.shape[-1])
+    negative = -_pad(_rolling(np.where(flow < 0.0, flow, np.where(started, 0.0, np.nan)), window, np.add), typical.shape[-1])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100.0 - 100.0 / (1.0 + positive / negative)
+
+
+def _ratio(numerator, denominator):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return numerator / denominator
+
+
+# --- Registry ---
+
+class Indicator:
+    """A named node: fn(*input arrays) -> array; `min_bars` is the frame length at or below which callers leave it out."""
+    __slots__ = ('name', 'inputs', 'fn', 'min_bars')
+
+    def __init__(self, name, inputs, fn, min_bars=0):
+        self.name = name
+        self.inputs = tuple(inputs)
+        self.fn = fn
+        self.min_bars = min_bars
+
+
+INDICATORS = {}
+
+
+def register(name, inputs, fn, min_bars=0):
+    """Declare an indicator (or an intermediate other indicators build on) and the nodes it reads."""
+    for dependency in inputs:
+        if dependency not in OHLCV_COLUMNS and dependency not in INDICATORS:
+            raise ValueError(f"{name} depends on unregistered {dependency}; register it first")
+    INDICATORS[name] = Indicator(name, inputs, fn, min_bars)
+
+
+# Shared intermediates
+register('PrevClose', ['Close'], _shift)
+register('TypicalPrice', ['High', 'Low', 'Close'], lambda high, low, close: (high + low + close) / 3.0)
+register('TrueRange', ['High', 'Low', 'PrevClose'], true_range)
+register('HighestHigh_14', ['High'], lambda high: rolling_max(high, 14))
+register('LowestLow_14', ['Low'], lambda low: rolling_min(low, 14))
+register('EMA_12', ['Close'], lambda close: ema(close, 12))
+register('EMA_26', ['Close'], lambda close: ema(close, 26))
+
+# Trend
+for _window in (20, 50, 200):
+    register(f'SMA_{_window}', ['Close'], lambda close, w=_window: sma(close, w), _window)
+    register(f'EMA_{_window}', ['Close'], lambda close, w=_window: ema(close, w), _window)
+register('MACD_line', ['EMA_12', 'EMA_26'], np.subtract, 34)
+register('MACD_signal', ['MACD_line'], lambda line: ema(line, 9), 34)
+register('MACD_hist', ['MACD_line', 'MACD_signal'], np.subtract, 34)
+register('CCI', ['TypicalPrice'], lambda typical: cci(typical, 20), 20)
+
+# Volatility
+register('BB_Std_20', ['Close', 'SMA_20'], lambda close, mean: rolling_std(close, 20, mean))
+register('BB_Mid', ['SMA_20'], lambda mean: mean, 20)
+register('BB_High', ['SMA_20', 'BB_Std_20'], lambda mean, std: mean + 2 * std, 20)
+register('BB_Low', ['SMA_20', 'BB_Std_20'], lambda mean, std: mean - 2 * std, 20)
+register('BB_Width', ['BB_High', 'BB_Low', 'SMA_20'], lambda high, low, mean: _ratio(high - low, mean), 20)
+register('BB_Position', ['Close', 'BB_High', 'BB_Low'], lambda close, high, low: _ratio(close - low, high - low), 20)
+register('ATR', ['TrueRange'], lambda ranges: wilder_atr(ranges, 14), 14)
+
+# Momentum
+register('RSI', ['Close'], lambda close: rsi(close, 14), 14)
+register('RSI_MA', ['RSI'], lambda values: sma(values, 14), 14)
+register('Stoch_K', ['Close', 'HighestHigh_14', 'LowestLow_14'],
+         lambda close, highest, lowest: _ratio(100.0 * (close - lowest), highest - lowest), 14)
+register('Stoch_D', ['Stoch_K'], lambda k: sma(k, 3), 14)
+register('Williams_R', ['Close', 'HighestHigh_14', 'LowestLow_14'],
+         lambda close, highest, lowest: _ratio(-100.0 * (highest - close), highest - lowest), 14)
+
+# Volume
+register('OBV', ['Close', 'PrevClose', 'Volume'], obv, 1)
+register('MFI', ['TypicalPrice', 'Volume'], lambda typical, volume: mfi(typical, volume, 14), 14)
+
+ENHANCED_COLUMNS = [
+    'SMA_20', 'EMA_20', 'SMA_50', 'EMA_50', 'SMA_200', 'EMA_200',
+    'BB_High', 'BB_Mid', 'BB_Low', 'BB_Width', 'BB_Position', 'RSI', 'RSI_MA',
+    'MACD_line', 'MACD_signal', 'MACD_hist', 'Stoch_K', 'Stoch_D', 'Williams_R', 'CCI', 'ATR', 'OBV', 'MFI',
+]
+BASIC_COLUMNS = ['SMA_20', 'BB_High', 'BB_Mid', 'BB_Low', 'SMA_50', 'RSI', 'MACD_line', 'MACD_signal', 'MACD_hist']
+
+
+@functools.lru_cache(maxsize=256)
+def _plan(outputs):
+    order, done, visiting = [], set(OHLCV_COLUMNS), set()
+
+    def visit(name):
+        if name in done:
+            return
+        if name not in INDICATORS:
+            raise KeyError(f"Unknown indicator: {name}")
+        if name in visiting:
+            raise ValueError(f"Indicator dependency cycle through {name}")
+        visiting.add(name)
+        for dependency in INDICATORS[name].inputs:
+            visit(dependency)
+        visiting.discard(name)
+        done.add(name)
+        order.append(name)
+
+    for name in outputs:
+        visit(name)
+    return tuple(order)
+
+
+def plan(outputs):
+    """Nodes needed for `outputs`, dependencies first; a node shared by several outputs appears once."""
+    return _plan(tuple(outputs))
+
+
+class IndicatorFrame:
+    """Lazily evaluated indicator nodes over one OHLCV frame, or a (symbols x bars) matrix of them."""
+
+    def __init__(self, df=None, close=None, high=None, low=None, volume=None):
+        if df is not None:
+            close, high, low, volume = (df[c] if c in df.columns else None for c in OHLCV_COLUMNS)
+        self._values = {
+            column: _as_array(values)
+            for column, values in zip(OHLCV_COLUMNS, (close, high, low, volume)) if values is not None
+        }
+        self.close = self._values['Close']
+        self.n = self.close.shape[-1]
+
+    def compute(self, outputs):
+        """{name: array} for the requested outputs, evaluating only the nodes they need (each at most once)."""
+        for name in plan(outputs):
+            if name not in self._values:
+                node = INDICATORS[name]
+                missing = [column for column in node.inputs if column in OHLCV_COLUMNS and column not in self._values]
+                if missing:
+                    raise KeyError(f"{name} needs the {', '.join(missing)} column(s)")
+                self._values[name] = node.fn(*(self._values[dependency] for dependency in node.inputs))
+        return {name: self._values[name] for name in outputs}
+
+    def get(self, name):
+        return self.compute((name,))[name]
+
+
+def _assign(df, columns):
+    """Copy of df with the computed columns added as one float64 block (existing ones overwritten in place)."""
+    if not columns:
+        return df.copy()
+    if any(name in df.columns for name in columns):
+        out = df.copy()
+        for name, values in columns.items():
+            # Memoised arrays are shared between columns (SMA_20 is BB_Mid); give each column its own
+            out[name] = values.copy() if isinstance(values, np.ndarray) else values
+        return out
+    # Inserting columns one at a time costs more than computing them; column_stack also copies
+    block = np.column_stack([np.broadcast_to(values, len(df)) for values in columns.values()])
+    out = pd.concat([df, pd.DataFrame(block, index=df.index, columns=list(columns))], axis=1)
+    out.attrs = dict(df.attrs)
+    return out
+
+
+def add_indicators(df, outputs, fill_gated=False):
+    """
+    Copy of df with the requested indicator columns.
+
+    An indicator needing more bars than df has is left out, or set to NaN with `fill_gated`.
+    """
+    n = len(df)
+    wanted = [name for name in outputs if n > INDICATORS[name].min_bars]
+    columns = IndicatorFrame(df).compute(wanted)
+    if fill_gated:
+        columns = {name: columns.get(name, np.nan) for name in outputs}
+    return _assign(df, columns)
+
+
+def latest_values(df, outputs):
+    """{name: float} for the last bar, NaN where df is too short for an indicator."""
+    n = len(df)
+    wanted = [name for name in outputs if n > INDICATORS[name].min_bars]
+    columns = IndicatorFrame(df).compute(wanted)
+    return {name: float(columns[name][-1]) if name in columns else float('nan') for name in outputs}
+
+
+def basic_indicators(df):
+    """Columns of add_technical_indicators: SMA_20/50, Bollinger, RSI and MACD, NaN until each has enough bars."""
+    return add_indicators(df, BASIC_COLUMNS, fill_gated=True)
+
+
+def enhanced_indicators(df):
+    """Columns of get_enhanced_technical_indicators; an indicator without enough bars is left out."""
+    return add_indicators(df, ENHANCED_COLUMNS)
+
+
+# --- Many symbols at once ---
+
+def _columns_block(df, columns):
+    """(bars x columns) float64 array; reading the frame's one numeric block beats selecting columns first."""
+    try:
+        values = df.to_numpy(dtype=np.float64)
+    except (TypeError, ValueError):
+        return np.column_stack([df[column].to_numpy(dtype=np.float64) for column in columns])
+    return values[:, [df.columns.get_loc(column) for column in columns]]
+
+
+def price_matrix(frames, bars=None):
+    """
+    Right-align OHLCV frames into (symbols x bars) arrays.
+
+    frames: {symbol: DataFrame}. Each row holds that symbol's own last `bars` bars (all of the
+    longest history by default), NaN-padded on the left when its history is shorter, so rows
+    line up by bar position rather than by date and exchanges with different holidays mix freely.
+    Every OHLCV column is returned; a symbol whose frame lacks one (no High/Low, no Volume) gets
+    a NaN row there, so only its own range- and volume-based indicators come out NaN.
+    Returns (symbols, {column: array}, last bar timestamp per symbol).
+    """
+    frames = {symbol: df for symbol, df in frames.items() if df is not None and not df.empty and 'Close' in df.columns}
+    symbols = list(frames)
+    width = bars or max((len(df) for df in frames.values()), default=0)
+    block = np.full((len(OHLCV_COLUMNS), len(symbols), width), np.nan)
+    for row, df in enumerate(frames.values()):
+        present = [position for position, column in enumerate(OHLCV_COLUMNS) if column in df.columns]
+        tail = _columns_block(df, [OHLCV_COLUMNS[position] for position in present])[-width:].T
+        block[present, row, width - tail.shape[1]:] = tail
+    matrix = dict(zip(OHLCV_COLUMNS, block))
+    return symbols, matrix, [frames[symbol].index[-1] for symbol in symbols]
+
+
+def matrix_indicators(close, high=None, low=None, volume=None, outputs=ENHANCED_COLUMNS):
+    """Requested indicators for a (symbols x bars) matrix: {name: (symbols x bars) array}, ungated."""
+    return IndicatorFrame(close=close, high=high, low=low, volume=volume).compute(outputs)
+
+
+def cross_section(frames, bars=None, outputs=ENHANCED_COLUMNS):
+    """
+    Latest indicators for many symbols in one vectorised pass.
+
+    Returns a DataFrame indexed by symbol with Date, Close and the requested indicator columns.
+    """
+    symbols, matrix, dates = price_matrix(frames, bars)
+    if not symbols:
+        return pd.DataFrame()
+    columns = matrix_indicators(matrix['Close'], matrix.get('High'), matrix.get('Low'), matrix.get('Volume'), outputs)
+    lengths = _seen(matrix['Close']).sum(axis=-1)
+    latest = {'Close': matrix['Close'][:, -1]}
+    for name, values in columns.items():
+        # Same per-symbol cut-offs as add_indicators, which leaves such columns out
+        latest[name] = np.where(lengths > INDICATORS[name].min_bars, values[:, -1], np.nan)
+    out = pd.DataFrame(latest, index=pd.Index(symbols, name='Symbol'))
+    out.insert(0, 'Date', [str(date) for date in dates])
+    return out
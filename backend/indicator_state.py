@@ -0,0 +1,436 @@
+"""
+Streaming indicator state: O(1) work per new bar instead of a full recompute.
+
+IndicatorState folds bars one at a time into small accumulators (EMAs for
+MACD, Wilder averages for RSI and ATR, sliding sums for SMA/Bollinger, the
+last 14 highs and lows for stochastic and Williams %R, a running OBV). Its
+latest row uses the same column names as indicator_engine and, over the same
+bars, the same values.
+
+States are kept per (symbol, bar interval) in data_cache as plain dicts, so
+they reach Redis and cache snapshots like any other entry. Only closed bars
+are folded in. The last bar of a frame may still be forming, so it is applied
+to a throwaway copy, and a moving intraday close never disturbs the stored
+state. Because the state carries on from the bars it was seeded with, EMA- and
+OBV-style values can differ slightly from a recompute over a shorter window.
+A state seeded with fewer than WARMUP_BARS bars is rebuilt as soon as a caller
+passes a frame reaching further back, so a short first request can't leave
+SMA_200 and friends NaN for longer ones.
+"""
+import copy
+import math
+import os
+from collections import deque
+
+from indicator_cache import bar_interval
+from tiered_cache import data_cache
+
+STATE_NAMESPACE = "indicator_state"
+STATE_TTL = int(os.getenv("INDICATOR_STATE_TTL_SECONDS", str(7 * 24 * 3600)))
+RESYNC_EVERY = 512  # sliding sums are recomputed from their window this often to shed rounding drift
+WARMUP_BARS = 200  # longest window (SMA/EMA 200): a state with fewer bars still benefits from older ones
+
+NAN = float("nan")
+
+
+def _f(value):
+    """Stored floats come back as None where they were NaN (JSON has no NaN)."""
+    return NAN if value is None else float(value)
+
+
+def _out(value):
+    return None if value is None or math.isnan(value) else value
+
+
+class _Accumulator:
+    _fields = ()  # scalar attributes persisted by to_dict
+    _windows = ()  # deque attributes persisted as lists
+
+    def to_dict(self):
+        state = {name: _out(getattr(self, name)) if isinstance(getattr(self, name), float) else getattr(self, name)
+                 for name in self._fields}
+        state.update({name: [_out(v) for v in getattr(self, name)] for name in self._windows})
+        return state
+
+    def load(self, state):
+        for name in self._fields:
+            value = state.get(name)
+            current = getattr(self, name)
+            setattr(self, name, _f(value) if isinstance(current, float) else value)
+        for name in self._windows:
+            window = getattr(self, name)
+            window.clear()
+            window.extend(_f(v) for v in state.get(name, ()))
+        return self
+
+
+class EWM(_Accumulator):
+    """pandas ewm(alpha, adjust=False, min_periods).mean(), one value at a time."""
+    _fields = ("mean", "count")
+
+    def __init__(self, alpha, min_periods):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.mean = NAN
+        self.count = 0
+
+    def update(self, x):
+        if math.isnan(x):
+            return
+        self.mean = x if self.count == 0 else self.mean + self.alpha * (x - self.mean)
+        self.count += 1
+
+    @property
+    def value(self):
+        return self.mean if self.count >= self.min_periods else NAN
+
+
+def ema(window):
+    return EWM(2.0 / (window + 1), window)
+
+
+class RollingWindow(_Accumulator):
+    """Mean and population std of the last `window` values, updated by sliding Welford sums."""
+    _fields = ("mean", "m2", "since_sync")
+    _windows = ("values",)
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.mean = NAN
+        self.m2 = NAN
+        self.since_sync = 0
+
+    def _resync(self):
+        n = len(self.values)
+        self.mean = sum(self.values) / n
+        self.m2 = sum((v - self.mean) ** 2 for v in self.values)
+        self.since_sync = 0
+
+    def update(self, x):
+        full = len(self.values) == self.window
+        dropped = self.values[0] if full else NAN
+        self.values.append(x)
+        if len(self.values) < self.window:
+            return
+        self.since_sync += 1
+        if not full or math.isnan(dropped) or math.isnan(self.mean) or math.isnan(x) or self.since_sync >= RESYNC_EVERY:
+            # NaN entering or leaving the window: recompute (NaN anywhere in the window gives NaN, as in pandas)
+            self._resync()
+            return
+        old_mean = self.mean
+        self.mean = old_mean + (x - dropped) / self.window
+        self.m2 = max(0.0, self.m2 + (x - dropped) * (x - self.mean + dropped - old_mean))
+
+    @property
+    def value(self):
+        return self.mean if len(self.values) == self.window else NAN
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / self.window) if len(self.values) == self.window else NAN
+
+
+class RSI(_Accumulator):
+    _fields = ("prev_close",)
+
+    def __init__(self, window=14):
+        self.prev_close = NAN
+        self.up = EWM(1.0 / window, window)
+        self.down = EWM(1.0 / window, window)
+
+    def update(self, close):
+        diff = close - self.prev_close
+        self.up.update(diff if diff > 0 else 0.0)
+        self.down.update(-diff if diff < 0 else 0.0)
+        self.prev_close = close
+
+    @property
+    def value(self):
+        up, down = self.up.value, self.down.value
+        if down == 0:
+            return 100.0
+        return 100.0 - 100.0 / (1.0 + up / down) if not (math.isnan(up) or math.isnan(down)) else NAN
+
+    def to_dict(self):
+        return {**super().to_dict(), "up": self.up.to_dict(), "down": self.down.to_dict()}
+
+    def load(self, state):
+        super().load(state)
+        self.up.load(state["up"])
+        self.down.load(state["down"])
+        return self
+
+
+class MACD(_Accumulator):
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = ema(fast)
+        self.slow = ema(slow)
+        self.signal = ema(signal)
+
+    def update(self, close):
+        self.fast.update(close)
+        self.slow.update(close)
+        # The signal line starts at the first defined MACD value, like ewm over leading NaNs
+        self.signal.update(self.line)
+
+    @property
+    def line(self):
+        return self.fast.value - self.slow.value
+
+    @property
+    def value(self):
+        """(line, signal, histogram)."""
+        line, signal = self.line, self.signal.value
+        return line, signal, line - signal
+
+    def to_dict(self):
+        return {"fast": self.fast.to_dict(), "slow": self.slow.to_dict(), "signal": self.signal.to_dict()}
+
+    def load(self, state):
+        for name in ("fast", "slow", "signal"):
+            getattr(self, name).load(state[name])
+        return self
+
+
+class ATR(_Accumulator):
+    """Wilder ATR seeded with the mean of the first `window` true ranges, as ta computes it."""
+    _fields = ("prev_close", "count", "seed_sum", "atr")
+
+    def __init__(self, window=14):
+        self.window = window
+        self.prev_close = NAN
+        self.count = 0
+        self.seed_sum = 0.0
+        self.atr = NAN
+
+    def update(self, high, low, close):
+        ranges = [r for r in (high - low, abs(high - self.prev_close), abs(low - self.prev_close)) if not math.isnan(r)]
+        true_range = max(ranges) if ranges else NAN
+        self.count += 1
+        if self.count < self.window:
+            self.seed_sum += true_range
+        elif self.count == self.window:
+            self.atr = (self.seed_sum + true_range) / self.window
+        else:
+            self.atr = (self.atr * (self.window - 1) + true_range) / self.window
+        self.prev_close = close
+
+    @property
+    def value(self):
+        return self.atr if self.count >= self.window else NAN
+
+
+class OBV(_Accumulator):
+    _fields = ("prev_close", "obv")
+
+    def __init__(self):
+        self.prev_close = NAN
+        self.obv = 0.0
+
+    def update(self, close, volume):
+        if not math.isnan(volume):
+            self.obv += -volume if close < self.prev_close else volume
+        self.prev_close = close
+
+    @property
+    def value(self):
+        return self.obv
+
+
+class Stochastic(_Accumulator):
+    """%K/%D and Williams %R over the same highest-high/lowest-low window."""
+    _fields = ("close",)
+    _windows = ("highs", "lows")
+
+    def __init__(self, window=14, smooth_window=3):
+        self.window = window
+        self.highs = deque(maxlen=window)
+        self.lows = deque(maxlen=window)
+        self.close = NAN
+        self.d = RollingWindow(smooth_window)
+
+    def _range(self):
+        if len(self.highs) < self.window or any(math.isnan(v) for v in (*self.highs, *self.lows)):
+            return NAN, NAN
+        return max(self.highs), min(self.lows)
+
+    def update(self, high, low, close):
+        self.highs.append(high)
+        self.lows.append(low)
+        self.close = close
+        self.d.update(self.k)
+
+    @property
+    def k(self):
+        highest, lowest = self._range()
+        span = highest - lowest
+        if math.isnan(span) or span == 0:
+            return NAN
+        return 100.0 * (self.close - lowest) / span
+
+    @property
+    def williams_r(self):
+        highest, lowest = self._range()
+        span = highest - lowest
+        if math.isnan(span) or span == 0:
+            return NAN
+        return -100.0 * (highest - self.close) / span
+
+    def to_dict(self):
+        return {**super().to_dict(), "d": self.d.to_dict()}
+
+    def load(self, state):
+        super().load(state)
+        self.d.load(state["d"])
+        return self
+
+
+class IndicatorState:
+    """All streaming indicators for one symbol and bar interval."""
+
+    def __init__(self):
+        self.sma = {window: RollingWindow(window) for window in (20, 50, 200)}
+        self.ema = {window: ema(window) for window in (20, 50, 200)}
+        self.rsi = RSI(14)
+        self.macd = MACD(12, 26, 9)
+        self.atr = ATR(14)
+        self.obv = OBV()
+        self.stochastic = Stochastic(14, 3)
+        self.bars = 0
+        self.last_index = None
+        self.last_close = NAN
+
+    def update(self, high, low, close, volume, index=None):
+        """Fold in one closed bar."""
+        high, low, close, volume = float(high), float(low), float(close), float(volume)
+        for window in self.sma.values():
+            window.update(close)
+        for average in self.ema.values():
+            average.update(close)
+        self.rsi.update(close)
+        self.macd.update(close)
+        self.atr.update(high, low, close)
+        self.obv.update(close, volume)
+        self.stochastic.update(high, low, close)
+        self.bars += 1
+        self.last_index = None if index is None else str(index)
+        self.last_close = close
+
+    def row(self):
+        """Latest values under indicator_engine's column names; NaN until an indicator has enough bars."""
+        bollinger = self.sma[20]
+        mid, std = bollinger.value, bollinger.std
+        line, signal, hist = self.macd.value
+        return {
+            'SMA_20': mid, 'SMA_50': self.sma[50].value, 'SMA_200': self.sma[200].value,
+            'EMA_20': self.ema[20].value, 'EMA_50': self.ema[50].value, 'EMA_200': self.ema[200].value,
+            'BB_High': mid + 2 * std, 'BB_Mid': mid, 'BB_Low': mid - 2 * std,
+            'RSI': self.rsi.value,
+            'MACD_line': line, 'MACD_signal': signal, 'MACD_hist': hist,
+            'Stoch_K': self.stochastic.k, 'Stoch_D': self.stochastic.d.value,
+            'Williams_R': self.stochastic.williams_r,
+            'ATR': self.atr.value,
+            'OBV': self.obv.value,
+        }
+
+    def preview(self, high, low, close, volume):
+        """Row with one more (forming) bar applied, leaving this state untouched."""
+        trial = copy.deepcopy(self)
+        trial.update(high, low, close, volume)
+        return trial.row()
+
+    def extend(self, df):
+        """Fold in every bar of an OHLCV frame."""
+        has_range = 'High' in df.columns and 'Low' in df.columns
+        close = df['Close'].to_numpy(dtype=float)
+        high = df['High'].to_numpy(dtype=float) if has_range else close
+        low = df['Low'].to_numpy(dtype=float) if has_range else close
+        volume = df['Volume'].to_numpy(dtype=float) if 'Volume' in df.columns else [NAN] * len(df)
+        for i, index in enumerate(df.index):
+            self.update(high[i], low[i], close[i], volume[i], index)
+        return self
+
+    # --- Serialisation ---
+
+    def to_dict(self):
+        return {
+            "bars": self.bars,
+            "last_index": self.last_index,
+            "last_close": _out(self.last_close),
+            "sma": {str(w): acc.to_dict() for w, acc in self.sma.items()},
+            "ema": {str(w): acc.to_dict() for w, acc in self.ema.items()},
+            "rsi": self.rsi.to_dict(),
+            "macd": self.macd.to_dict(),
+            "atr": self.atr.to_dict(),
+            "obv": self.obv.to_dict(),
+            "stochastic": self.stochastic.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        self = cls()
+        self.bars = state["bars"]
+        self.last_index = state["last_index"]
+        self.last_close = _f(state["last_close"])
+        for window, acc in self.sma.items():
+            acc.load(state["sma"][str(window)])
+        for window, acc in self.ema.items():
+            acc.load(state["ema"][str(window)])
+        for name in ("rsi", "macd", "atr", "obv", "stochastic"):
+            getattr(self, name).load(state[name])
+        return self
+
+
+def _state_key(symbol, df):
+    return f"{str(symbol).upper()}:{bar_interval(df.index)}"
+
+
+def _resume(state, df):
+    """Position in df of the state's last bar, or None when the state can't continue onto df."""
+    if state is None or state.last_index is None:
+        return None
+    # Scan back from the end: the stored bar is normally the one before the last
+    pos = next((i for i in range(len(df) - 1, -1, -1) if str(df.index[i]) == state.last_index), None)
+    if pos is None:
+        return None
+    # A revised close (split/dividend adjustment, corrected bar) invalidates everything folded in since
+    if not math.isclose(float(df['Close'].iat[pos]), state.last_close, rel_tol=1e-9):
+        return None
+    # df holds more bars up to that point than the state saw: it starts before the state's first
+    # bar, and a state that hasn't warmed up its longest window is better rebuilt from df
+    if pos + 1 > state.bars and state.bars < WARMUP_BARS:
+        return None
+    return pos
+
+
+def latest_indicators(df, symbol=None):
+    """
+    Indicator row for the last bar of df, advancing the stored state by the bars it hasn't seen.
+
+    A state that can't be continued (first call, gap, revised history) or that df
+    reaches further back than while it is still short of WARMUP_BARS is rebuilt from df.
+    """
+    symbol = symbol or df.attrs.get('ticker_symbol')
+    if df.empty or 'Close' not in df.columns:
+        return {}
+    if not symbol:
+        return IndicatorState().extend(df).row()
+    key = _state_key(symbol, df)
+    stored, _ = data_cache.get(STATE_NAMESPACE, key)
+    state = IndicatorState.from_dict(stored) if stored else None
+    pos = _resume(state, df)
+    if pos == len(df) - 1:
+        # df ends at a bar the state already folded in as closed
+        return state.row()
+    if pos is None:
+        state, pos = IndicatorState(), -1
+    closed = df.iloc[pos + 1:-1]
+    if len(closed) or stored is None:
+        state.extend(closed)
+        data_cache.set(STATE_NAMESPACE, key, state.to_dict(), ttl=STATE_TTL)
+    last = df.iloc[-1]
+    high = float(last['High']) if 'High' in df.columns else float(last['Close'])
+    low = float(last['Low']) if 'Low' in df.columns else float(last['Close'])
+    volume = float(last['Volume']) if 'Volume' in df.columns else NAN
+    return state.preview(high, low, float(last['Close']), volume)
@@ -0,0 +1,164 @@
+"""
+Long-lived cache of yfinance `Ticker.info` dicts.
+
+`.info` is one of the slowest upstream calls, and most callers only want a
+handful of slow-moving fields (name, sector, summary, dividend data). The full
+dict is fetched once per symbol, kept in memory and written to
+data/info/<SYMBOL>.json so it survives restarts. Callers project the fields
+they need with `fields=`; callers that read price fields pass a short
+`max_age` and share the same fetch.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from cache_metrics import register, tally_sizes
+from circuit_breaker import yfinance_breaker
+from market_data_provider import market_data
+from singleflight import SingleFlight
+from upstream_scheduler import upstream_scheduler, YAHOO
+from ticker_validity import ticker_validity
+
+INFO_DIR = os.getenv("INFO_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "info"))
+INFO_TTL = int(os.getenv("INFO_CACHE_TTL", str(24 * 3600)))
+MAX_SYMBOLS = int(os.getenv("INFO_CACHE_MAX_SYMBOLS", "2000"))
+
+
+class InfoCache:
+    def __init__(self, directory=INFO_DIR, ttl=INFO_TTL, max_symbols=MAX_SYMBOLS):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_symbols = max_symbols
+        self._entries = OrderedDict()  # symbol -> (fetched_at, info, size of its JSON)
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self.metrics = register("info_cache", self.usage)
+
+    # --- Disk tier ---
+
+    def path(self, symbol):
+        return os.path.join(self.directory, f"{symbol.replace('/', '_')}.json")
+
+    def _load(self, symbol):
+        if not self.directory:
+            return None
+        try:
+            with open(self.path(symbol)) as f:
+                text = f.read()
+            stored = json.loads(text)
+            return stored["fetched_at"], stored["info"], len(text)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"[INFO CACHE] Unreadable entry for {symbol}, ignoring: {e}")
+            return None
+
+    def _save(self, symbol, text):
+        if not self.directory:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self.path(symbol)
+            # Write-then-rename so other workers never read a partial file
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"[INFO CACHE] Could not persist {symbol}: {e}")
+
+    # --- Memory tier ---
+
+    def _entry(self, symbol):
+        with self._lock:
+            entry = self._entries.get(symbol)
+            if entry is not None:
+                self._entries.move_to_end(symbol)
+                return entry
+        entry = self._load(symbol)
+        if entry is not None:
+            self._remember(symbol, entry)
+        return entry
+
+    def _remember(self, symbol, entry):
+        with self._lock:
+            self._entries[symbol] = entry
+            self._entries.move_to_end(symbol)
+            while len(self._entries) > self.max_symbols:
+                self._entries.popitem(last=False)
+                self.metrics.record("info", "evictions")
+
+    # --- Public API ---
+
+    def refresh(self, symbol):
+        """Fetch `.info` upstream (coalesced across threads) and store it."""
+        symbol = symbol.upper()
+        if ticker_validity.is_invalid(symbol):
+            return {}
+
+        def _fetch():
+            upstream_scheduler.acquire(YAHOO)
+            return market_data.ticker(symbol).info
+
+        # While Yahoo's breaker is open this raises CircuitOpen at once and get() serves the old entry
+        info = self._flight.do(("info", symbol), yfinance_breaker.call, _fetch)
+        if info:
+            fetched_at, info = time.time(), dict(info)
+            # Serialized once here; its length doubles as the entry's size in the cache metrics
+            text = json.dumps({"fetched_at": fetched_at, "info": info}, default=str)
+            self._remember(symbol, (fetched_at, info, len(text)))
+            self._save(symbol, text)
+        return dict(info or {})
+
+    def get(self, symbol, fields=None, max_age=None):
+        """
+        The info dict for a symbol, projected to `fields` when given.
+
+        Entries older than `max_age` (default: the cache TTL) are refetched; if
+        that fails the old entry is served rather than nothing.
+        """
+        symbol = symbol.upper()
+        max_age = self.ttl if max_age is None else max_age
+        entry = self._entry(symbol)
+        if entry is not None and time.time() - entry[0] < max_age:
+            self.metrics.record("info", "hits")
+            info = entry[1]
+        else:
+            self.metrics.record("info", "misses")
+            try:
+                info = self.refresh(symbol)
+            except Exception:
+                if entry is None:
+                    raise
+                print(f"[INFO CACHE] Refresh failed for {symbol}, serving entry from {time.ctime(entry[0])}")
+                info = entry[1]
+        if fields is None:
+            # Callers annotate the dict they get back; keep the cached one clean
+            return dict(info)
+        return {field: info.get(field) for field in fields}
+
+    def peek(self, symbol, fields=None):
+        """Cached info (memory or disk) of any age, without going upstream; {} when there is none."""
+        entry = self._entry(symbol.upper())
+        info = entry[1] if entry is not None else {}
+        return dict(info) if fields is None else {field: info.get(field) for field in fields}
+
+    def invalidate(self, symbol):
+        symbol = symbol.upper()
+        with self._lock:
+            self._entries.pop(symbol, None)
+        if self.directory:
+            try:
+                os.remove(self.path(symbol))
+            except FileNotFoundError:
+                pass
+
+    def usage(self):
+        with self._lock:
+            sizes = [("info", entry[2]) for entry in self._entries.values()]
+        return tally_sizes(sizes)
+
+
+info_cache = InfoCache()
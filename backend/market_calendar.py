@@ -0,0 +1,377 @@
+"""
+Trading calendar for the exchanges behind Yahoo ticker suffixes.
+
+Answers "is this symbol's market open?", "when does it next open?" and "how
+long can data fetched now be trusted?" in the exchange's own time zone,
+including weekends (not Saturday/Sunday everywhere) and holidays. Cache TTLs
+are derived from it: a quote fetched after the close stays current until the
+next open, and daily bars stop changing once the session has settled.
+
+Holidays come from, in order of preference:
+- exchange_calendars, when installed (covers every exchange here);
+- built-in rules for NYSE, LSE, Euronext, Xetra, TSX and ASX;
+- MARKET_HOLIDAYS_FILE, a JSON {"<market>": ["YYYY-MM-DD", ...]} of extra
+  closures, for markets whose holidays follow lunar calendars. The shipped
+  market_holidays.json lists the NSE/BSE ("IN") closures for 2025-2026.
+  A year past the file's last date is treated as holiday-free and logged once.
+
+Refreshing market_holidays.json: NSE publishes the next year's trading holidays
+in a circular each December. Append those weekday dates to the "IN" list (keep
+one year behind for history) and restart; without exchange_calendars nothing
+else knows them.
+Regular sessions only: lunch breaks and auctions are ignored.
+"""
+import json
+import os
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+try:
+    import exchange_calendars as xcals
+    XCALS_AVAILABLE = True
+except ImportError:
+    XCALS_AVAILABLE = False
+
+HOLIDAYS_FILE = os.getenv("MARKET_HOLIDAYS_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "market_holidays.json"))
+# Closing prints and late trade reports keep trickling in for a while after the bell
+SETTLE_SECONDS = int(os.getenv("MARKET_SETTLE_SECONDS", "1800"))
+# Upper bound on "valid until next open", in case a holiday is missing from the calendar
+MAX_CLOSED_TTL = int(os.getenv("MARKET_MAX_CLOSED_TTL", str(4 * 86400)))
+
+FRI_SAT = (4, 5)
+SAT_SUN = (5, 6)
+NO_WEEKEND = ()
+
+Session = namedtuple("Session", ["market", "tz", "open", "close", "weekend", "calendar"], defaults=(SAT_SUN, None))
+
+# Yahoo suffix -> regular trading session. "" covers US listings without a suffix.
+# `calendar` names the built-in holiday rules or the exchange_calendars code.
+SESSIONS = {
+    "": Session("US", "America/New_York", time(9, 30), time(16, 0), calendar="XNYS"),
+    "NS": Session("IN", "Asia/Kolkata", time(9, 15), time(15, 30), calendar="XBOM"),
+    "BO": Session("IN", "Asia/Kolkata", time(9, 15), time(15, 30), calendar="XBOM"),
+    "SS": Session("CN", "Asia/Shanghai", time(9, 30), time(15, 0), calendar="XSHG"),
+    "SZ": Session("CN", "Asia/Shanghai", time(9, 30), time(15, 0), calendar="XSHG"),
+    "T": Session("JP", "Asia/Tokyo", time(9, 0), time(15, 30), calendar="XTKS"),
+    "KS": Session("KR", "Asia/Seoul", time(9, 0), time(15, 30), calendar="XKRX"),
+    "KQ": Session("KR", "Asia/Seoul", time(9, 0), time(15, 30), calendar="XKRX"),
+    "SI": Session("SG", "Asia/Singapore", time(9, 0), time(17, 0), calendar="XSES"),
+    "BK": Session("TH", "Asia/Bangkok", time(10, 0), time(16, 30), calendar="XBKK"),
+    "JK": Session("ID", "Asia/Jakarta", time(9, 0), time(16, 0), calendar="XIDX"),
+    "KL": Session("MY", "Asia/Kuala_Lumpur", time(9, 0), time(17, 0), calendar="XKLS"),
+    "PS": Session("PH", "Asia/Manila", time(9, 30), time(15, 0), calendar="XPHS"),
+    "VN": Session("VN", "Asia/Ho_Chi_Minh", time(9, 0), time(15, 0)),
+    "HK": Session("HK", "Asia/Hong_Kong", time(9, 30), time(16, 0), calendar="XHKG"),
+    "TO": Session("CA", "America/Toronto", time(9, 30), time(16, 0), calendar="XTSE"),
+    "V": Session("CA", "America/Toronto", time(9, 30), time(16, 0), calendar="XTSE"),
+    "L": Session("GB", "Europe/London", time(8, 0), time(16, 30), calendar="XLON"),
+    "DE": Session("DE", "Europe/Berlin", time(9, 0), time(17, 30), calendar="XETR"),
+    "PA": Session("FR", "Europe/Paris", time(9, 0), time(17, 30), calendar="XPAR"),
+    "AS": Session("NL", "Europe/Amsterdam", time(9, 0), time(17, 30), calendar="XAMS"),
+    "BR": Session("BE", "Europe/Brussels", time(9, 0), time(17, 30), calendar="XBRU"),
+    "SW": Session("CH", "Europe/Zurich", time(9, 0), time(17, 30), calendar="XSWX"),
+    "MC": Session("ES", "Europe/Madrid", time(9, 0), time(17, 30), calendar="XMAD"),
+    "MI": Session("IT", "Europe/Rome", time(9, 0), time(17, 30), calendar="XMIL"),
+    "ST": Session("SE", "Europe/Stockholm", time(9, 0), time(17, 30), calendar="XSTO"),
+    "OL": Session("NO", "Europe/Oslo", time(9, 0), time(16, 20), calendar="XOSL"),
+    "CO": Session("DK", "Europe/Copenhagen", time(9, 0), time(17, 0), calendar="XCSE"),
+    "HE": Session("FI", "Europe/Helsinki", time(10, 0), time(18, 30), calendar="XHEL"),
+    "AX": Session("AU", "Australia/Sydney", time(10, 0), time(16, 0), calendar="XASX"),
+    "SA": Session("BR", "America/Sao_Paulo", time(10, 0), time(17, 0), calendar="BVMF"),
+    "MX": Session("MX", "America/Mexico_City", time(8, 30), time(15, 0), calendar="XMEX"),
+    "JO": Session("ZA", "Africa/Johannesburg", time(9, 0), time(17, 0), calendar="XJSE"),
+    "TA": Session("IL", "Asia/Jerusalem", time(10, 0), time(17, 25), calendar="XTAE"),
+    "SR": Session("SA", "Asia/Riyadh", time(10, 0), time(15, 0), FRI_SAT, "XSAU"),
+    "QA": Session("QA", "Asia/Qatar", time(9, 30), time(13, 15), FRI_SAT),
+    "AE": Session("AE", "Asia/Dubai", time(10, 0), time(15, 0)),
+}
+_END_OF_DAY = time(23, 59, 59, 999999)
+# Futures and FX quotes (GC=F, EURUSD=X) trade around the clock on weekdays, crypto every day
+ALWAYS_OPEN = Session("24H", "UTC", time(0, 0), _END_OF_DAY)
+CRYPTO = Session("CRYPTO", "UTC", time(0, 0), _END_OF_DAY, NO_WEEKEND)
+
+
+def session_for(symbol):
+    """Regular session for a ticker, falling back to the US session for unknown suffixes."""
+    symbol = str(symbol).upper()
+    if symbol.endswith(("-USD", "-USDT", "-EUR", "-INR")):
+        return CRYPTO
+    if symbol.endswith(("=F", "=X")):
+        return ALWAYS_OPEN
+    suffix = symbol.rsplit(".", 1)[1] if "." in symbol else ""
+    return SESSIONS.get(suffix, SESSIONS[""])
+
+
+# --- Holiday rules ---
+
+def _easter(year):
+    """Gregorian Easter Sunday (anonymous algorithm)."""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = divmod(b, 4)
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _nth_weekday(year, month, weekday, n):
+    first = date(year, month, 1)
+    return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+
+
+def _last_weekday(year, month, weekday):
+    last = date(year, month + 1, 1) - timedelta(days=1) if month < 12 else date(year, 12, 31)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _nearest_weekday(day):
+    """US-style observance: Saturday holidays move to Friday, Sunday ones to Monday."""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+def _next_monday(day):
+    """Commonwealth-style observance: weekend holidays move to the following Monday."""
+    return day + timedelta(days=(7 - day.weekday()) % 7) if day.weekday() >= 5 else day
+
+
+def _christmas_break(year):
+    """Christmas and Boxing Day, pushed past the weekend as in the UK, Canada and Australia."""
+    christmas, boxing = date(year, 12, 25), date(year, 12, 26)
+    if christmas.weekday() == 5:
+        return {date(year, 12, 27), date(year, 12, 28)}
+    if christmas.weekday() == 6:
+        return {date(year, 12, 26), date(year, 12, 27)}
+    if christmas.weekday() == 4:  # Boxing Day on Saturday moves to Monday
+        return {christmas, date(year, 12, 28)}
+    return {christmas, boxing}
+
+
+def _nyse(year):
+    easter = _easter(year)
+    days = {
+        _nth_weekday(year, 1, 0, 3),            # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),            # Washington's Birthday
+        easter - timedelta(days=2),             # Good Friday
+        _last_weekday(year, 5, 0),              # Memorial Day
+        _nearest_weekday(date(year, 7, 4)),     # Independence Day
+        _nth_weekday(year, 9, 0, 1),            # Labor Day
+        _nth_weekday(year, 11, 3, 4),           # Thanksgiving
+        _nearest_weekday(date(year, 12, 25)),   # Christmas
+    }
+    if year >= 2022:
+        days.add(_nearest_weekday(date(year, 6, 19)))  # Juneteenth
+    # NYSE doesn't close on Friday Dec 31 when New Year's Day is a Saturday
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:
+        days.add(_nearest_weekday(new_year))
+    return days
+
+
+def _lse(year):
+    easter = _easter(year)
+    return {
+        _next_monday(date(year, 1, 1)),
+        easter - timedelta(days=2), easter + timedelta(days=1),
+        _nth_weekday(year, 5, 0, 1),            # Early May bank holiday
+        _last_weekday(year, 5, 0),              # Spring bank holiday
+        _last_weekday(year, 8, 0),              # Summer bank holiday
+    } | _christmas_break(year)
+
+
+def _euronext(year):
+    easter = _easter(year)
+    return {date(year, 1, 1), easter - timedelta(days=2), easter + timedelta(days=1),
+            date(year, 5, 1), date(year, 12, 25), date(year, 12, 26)}
+
+
+def _xetra(year):
+    return _euronext(year) | {date(year, 12, 24), date(year, 12, 31)}
+
+
+def _tsx(year):
+    easter = _easter(year)
+    return {
+        _next_monday(date(year, 1, 1)),
+        _nth_weekday(year, 2, 0, 3),            # Family Day
+        easter - timedelta(days=2),
+        date(year, 5, 24) - timedelta(days=date(year, 5, 24).weekday()),  # Victoria Day
+        _next_monday(date(year, 7, 1)),         # Canada Day
+        _nth_weekday(year, 8, 0, 1),            # Civic Holiday
+        _nth_weekday(year, 9, 0, 1),            # Labour Day
+        _nth_weekday(year, 10, 0, 2),           # Thanksgiving
+    } | _christmas_break(year)
+
+
+def _asx(year):
+    easter = _easter(year)
+    return {
+        _next_monday(date(year, 1, 1)),
+        _next_monday(date(year, 1, 26)),        # Australia Day
+        easter - timedelta(days=2), easter + timedelta(days=1),
+        date(year, 4, 25),                      # Anzac Day
+        _nth_weekday(year, 6, 0, 2),            # King's Birthday
+    } | _christmas_break(year)
+
+
+_RULES = {"XNYS": _nyse, "XLON": _lse, "XPAR": _euronext, "XAMS": _euronext, "XBRU": _euronext,
+          "XETR": _xetra, "XTSE": _tsx, "XASX": _asx}
+
+
+def _nyse_early_closes(year):
+    """13:00 closes: July 3rd, the day after Thanksgiving and Christmas Eve (when they are trading days)."""
+    days = {_nth_weekday(year, 11, 3, 4) + timedelta(days=1)}
+    for day in (date(year, 7, 3), date(year, 12, 24)):
+        if day.weekday() < 5 and day not in _nyse(year):
+            days.add(day)
+    return {day: time(13, 0) for day in days}
+
+
+@lru_cache(maxsize=None)
+def _holiday_file():
+    try:
+        with open(HOLIDAYS_FILE) as f:
+            return {market: {date.fromisoformat(d) for d in days} for market, days in json.load(f).items()}
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"[CALENDAR] Ignoring unreadable {HOLIDAYS_FILE}: {e}")
+        return {}
+
+
+_UNCOVERED_WARNED = set()
+
+
+def _warn_if_uncovered(market, year):
+    """Log once per market when the holidays file is its only source and stops before `year`."""
+    listed = _holiday_file().get(market)
+    if not listed or market in _UNCOVERED_WARNED or year <= max(listed).year:
+        return
+    _UNCOVERED_WARNED.add(market)
+    print(f"[CALENDAR] {HOLIDAYS_FILE} lists {market} holidays only up to {max(listed).year}; "
+          f"{year} is treated as holiday-free. Add the exchange's {year} dates or install exchange_calendars.")
+
+
+@lru_cache(maxsize=512)
+def holidays(session, year):
+    """Weekday closures for a session's exchange in `year`."""
+    days = {d for d in _holiday_file().get(session.market, ()) if d.year == year}
+    code = session.calendar
+    if code and XCALS_AVAILABLE:
+        try:
+            calendar = xcals.get_calendar(code)
+            weekdays = [d.date() for d in (datetime(year, 1, 1) + timedelta(days=i) for i in range(366))
+                        if d.year == year and d.weekday() not in session.weekend]
+            sessions = {d.date() for d in calendar.sessions_in_range(f"{year}-01-01", f"{year}-12-31")}
+            return frozenset(days | {d for d in weekdays if d not in sessions})
+        except Exception as e:
+            print(f"[CALENDAR] exchange_calendars has no {code} {year}, using built-in rules: {e}")
+    if code in _RULES:
+        days |= _RULES[code](year)
+    else:
+        _warn_if_uncovered(session.market, year)
+    return frozenset(days)
+
+
+def is_trading_day(session, day):
+    return day.weekday() not in session.weekend and day not in holidays(session, day.year)
+
+
+def session_close(session, day):
+    """Closing time on `day`, honouring NYSE early closes."""
+    if session.calendar == "XNYS":
+        return _nyse_early_closes(day.year).get(day, session.close)
+    return session.close
+
+
+# --- Queries ---
+
+def _local_now(session, now):
+    return (now or datetime.now(ZoneInfo("UTC"))).astimezone(ZoneInfo(session.tz))
+
+
+def _is_open_at(session, local):
+    day = local.date()
+    return is_trading_day(session, day) and session.open <= local.time() < session_close(session, day)
+
+
+def is_market_open(symbol, now=None):
+    session = session_for(symbol)
+    return _is_open_at(session, _local_now(session, now))
+
+
+def next_open(symbol, now=None):
+    """Next session open after `now` (aware datetime in the exchange time zone)."""
+    session = session_for(symbol)
+    local = _local_now(session, now)
+    tz = ZoneInfo(session.tz)
+    day = local.date()
+    for _ in range(30):
+        candidate = datetime.combine(day, session.open, tzinfo=tz)
+        if candidate > local and is_trading_day(session, day):
+            return candidate
+        day += timedelta(days=1)
+    return datetime.combine(day, session.open, tzinfo=tz)
+
+
+def last_close(symbol, now=None):
+    """Most recent session close at or before `now`, or None if none in the last month."""
+    session = session_for(symbol)
+    local = _local_now(session, now)
+    tz = ZoneInfo(session.tz)
+    day = local.date()
+    for _ in range(30):
+        if is_trading_day(session, day):
+            candidate = datetime.combine(day, session_close(session, day), tzinfo=tz)
+            if candidate <= local:
+                return candidate
+        day -= timedelta(days=1)
+    return None
+
+
+def market_status(symbol="", now=None):
+    """Open/closed state of a symbol's exchange with its next transition."""
+    session = session_for(symbol)
+    local = _local_now(session, now)
+    is_open = _is_open_at(session, local)
+    closes_at = datetime.combine(local.date(), session_close(session, local.date()), tzinfo=ZoneInfo(session.tz))
+    return {
+        "market": session.market,
+        "status": "OPEN" if is_open else "CLOSED",
+        "timezone": session.tz,
+        "local_time": local.isoformat(timespec="seconds"),
+        "closes_at": closes_at.isoformat() if is_open else None,
+        "next_open": None if is_open else next_open(symbol, now).isoformat(),
+    }
+
+
+def valid_until(symbol, fetched_at, open_ttl):
+    """
+    Epoch seconds until which market data fetched at `fetched_at` stays current.
+
+    While the session is open (or still settling after the close) that is
+    `open_ttl`; once it has settled nothing changes until the next open.
+    """
+    session = session_for(symbol)
+    fetched = datetime.fromtimestamp(fetched_at, ZoneInfo(session.tz))
+    if _is_open_at(session, fetched):
+        return fetched_at + open_ttl
+    closed_at = last_close(symbol, fetched)
+    if closed_at is not None and (fetched - closed_at).total_seconds() < SETTLE_SECONDS:
+        return fetched_at + open_ttl
+    reopen = next_open(symbol, fetched).timestamp()
+    return max(fetched_at + open_ttl, min(reopen, fetched_at + MAX_CLOSED_TTL))
+
+
+def ttl_for(symbol, open_ttl, now=None):
+    """Seconds data fetched now stays current; see valid_until."""
+    now = now if now is not None else datetime.now().timestamp()
+    return max(1, int(valid_until(symbol, now, open_ttl) - now))
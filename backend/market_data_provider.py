@@ -0,0 +1,327 @@
+"""
+Market-data provider abstraction.
+
+Every upstream read (history, batch quotes, info, news) goes through
+`market_data`, selected with MARKET_DATA_PROVIDER:
+
+- "yfinance" (default): live Yahoo Finance through yfinance and the async chart client.
+- "offline": deterministic replay for load tests and benchmarks on isolated
+  machines. Recorded fixtures under MARKET_DATA_FIXTURES are used when present
+  (history/<interval>/<SYMBOL>.csv, info/<SYMBOL>.json, news/<SYMBOL>.json);
+  anything else is synthesised from a per-symbol seed, so the same request
+  always returns the same bars. OFFLINE_LATENCY_MS adds a fixed delay per call
+  to mimic upstream latency.
+
+`ticker(symbol)` returns a yf.Ticker-compatible object, so call sites keep
+using `.history()`, `.info`, `.fast_info` and `.news` unchanged.
+
+Record fixtures from the live provider with:
+    python market_data_provider.py record AAPL MSFT RELIANCE.NS
+"""
+import abc
+import asyncio
+import json
+import os
+import sys
+import time
+import zlib
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from company_mappings import get_company_name
+from market_calendar import session_for
+from ohlcv_store import interval_seconds, is_intraday, slice_period, INTRADAY_RETENTION_DAYS
+from resample_utils import OHLCV_AGG
+import yahoo_client
+
+PROVIDER_NAME = os.getenv("MARKET_DATA_PROVIDER", "yfinance").lower()
+FIXTURES_DIR = os.getenv(
+    "MARKET_DATA_FIXTURES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "fixtures")
+)
+OFFLINE_LATENCY_MS = float(os.getenv("OFFLINE_LATENCY_MS", "0"))
+OFFLINE_DAILY_YEARS = 10
+
+
+class MarketDataProvider(abc.ABC):
+    """Subclasses supply `ticker`; history, download and news are built on it unless overridden."""
+    name = "base"
+
+    @abc.abstractmethod
+    def ticker(self, symbol, **kwargs):
+        """A yf.Ticker-compatible object for `symbol`."""
+
+    def history(self, symbol, period=None, interval="1d", start=None, auto_adjust=True):
+        stock = self.ticker(symbol)
+        if start is not None:
+            return stock.history(start=start, interval=interval, auto_adjust=auto_adjust)
+        return stock.history(period=period, interval=interval, auto_adjust=auto_adjust)
+
+    async def history_async(self, symbol, period=None, interval="1d", start=None):
+        return await asyncio.to_thread(self.history, symbol, period, interval, start)
+
+    def download(self, symbols, period="5d", interval="1d", auto_adjust=False):
+        """Several symbols at once, shaped like yf.download(group_by="ticker")."""
+        frames = {s: self.history(s, period=period, interval=interval, auto_adjust=auto_adjust) for s in symbols}
+        frames = {s: df for s, df in frames.items() if not df.empty}
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, axis=1)
+
+    def news(self, symbol):
+        return self.ticker(symbol).news or []
+
+
+class YFinanceProvider(MarketDataProvider):
+    name = "yfinance"
+
+    def ticker(self, symbol, **kwargs):
+        # yf.Ticker is resolved at call time so the app's session-injecting patch applies
+        return yf.Ticker(symbol, **kwargs)
+
+    async def history_async(self, symbol, period=None, interval="1d", start=None):
+        return await yahoo_client.fetch_history(symbol, period, interval, start=start)
+
+    def download(self, symbols, period="5d", interval="1d", auto_adjust=False):
+        return yf.download(
+            list(symbols), period=period, interval=interval, group_by="ticker",
+            auto_adjust=auto_adjust, progress=False, threads=False
+        )
+
+
+def _seed(*parts):
+    return zlib.crc32("|".join(str(p) for p in parts).encode())
+
+
+def _synthetic_index(symbol, interval, anchor):
+    session = session_for(symbol)
+    tz = session.tz
+    if not is_intraday(interval):
+        days = pd.bdate_range(end=anchor, periods=OFFLINE_DAILY_YEARS * 252)
+        return pd.DatetimeIndex(days.tz_localize(tz), name="Date")
+    step = pd.Timedelta(seconds=interval_seconds(interval))
+    stamps = []
+    for day in pd.bdate_range(end=anchor, periods=INTRADAY_RETENTION_DAYS.get(interval, 60)):
+        open_ts = pd.Timestamp.combine(day.date(), session.open).tz_localize(tz)
+        close_ts = pd.Timestamp.combine(day.date(), session.close).tz_localize(tz)
+        stamps.append(pd.date_range(open_ts, close_ts - step, freq=step))
+    return stamps[0].append(stamps[1:]).rename("Datetime")
+
+
+@lru_cache(maxsize=256)
+def _synthetic_history(symbol, interval, anchor):
+    """Seeded random walk ending on `anchor`; identical for every call with the same arguments."""
+    index = _synthetic_index(symbol, interval, anchor)
+    rng = np.random.default_rng(_seed(symbol, interval))
+    n = len(index)
+    bar_fraction = (interval_seconds(interval) or 86400) / (6.5 * 3600) if is_intraday(interval) else 1.0
+    vol = 0.02 * np.sqrt(bar_fraction)
+    start_price = 20 + _seed(symbol) % 480
+    close = start_price * np.exp(np.cumsum(rng.normal(0.0003 * bar_fraction, vol, n)))
+    open_ = np.concatenate([[start_price], close[:-1]]) * (1 + rng.normal(0, vol / 4, n))
+    wick = np.abs(rng.normal(0, vol / 2, (2, n)))
+    df = pd.DataFrame(
+        {
+            "Open": open_,
+            "High": np.maximum(open_, close) * (1 + wick[0]),
+            "Low": np.minimum(open_, close) * (1 - wick[1]),
+            "Close": close,
+            "Volume": rng.integers(100_000, 10_000_000, n) * bar_fraction,
+            "Dividends": 0.0,
+            "Stock Splits": 0.0,
+        },
+        index=index,
+    )
+    df["Volume"] = df["Volume"].astype("int64")
+    return df
+
+
+class OfflineTicker:
+    """yf.Ticker stand-in backed by fixtures or synthetic data."""
+
+    def __init__(self, provider, symbol):
+        self._provider = provider
+        self.ticker = str(symbol).upper()
+
+    def history(self, period="1mo", interval="1d", start=None, end=None, auto_adjust=True, _sleep=True, **kwargs):
+        if _sleep:
+            self._provider._delay()
+        df = self._provider._bars(self.ticker, interval)
+        if start is not None:
+            start = pd.Timestamp(start)
+            start = start.tz_convert(df.index.tz) if start.tzinfo else start.tz_localize(df.index.tz)
+            df = df[df.index >= start]
+        elif period:
+            df = slice_period(df, period)
+        df = df.copy()
+        if not auto_adjust:
+            df["Adj Close"] = df["Close"]
+        return df
+
+    @property
+    def info(self):
+        self._provider._delay()
+        recorded = self._provider._fixture_json("info", self.ticker)
+        if recorded is not None:
+            return recorded
+        daily = self._provider._bars(self.ticker, "1d")
+        last, prev = daily.iloc[-1], daily.iloc[-2]
+        year = daily.iloc[-252:]
+        price = float(last["Close"])
+        shares = 1e8 + _seed(self.ticker, "shares") % 9_000_000_000
+        return {
+            "symbol": self.ticker,
+            "shortName": get_company_name(self.ticker),
+            "longName": get_company_name(self.ticker),
+            "longBusinessSummary": f"Synthetic offline profile for {self.ticker}.",
+            "sector": "Technology",
+            "industry": "Software",
+            "exchange": session_for(self.ticker).market,
+            "currency": "INR" if session_for(self.ticker).market == "IN" else "USD",
+            "currentPrice": price,
+            "regularMarketPrice": price,
+            "previousClose": float(prev["Close"]),
+            "regularMarketChange": price - float(prev["Close"]),
+            "regularMarketChangePercent": (price / float(prev["Close"]) - 1) * 100,
+            "open": float(last["Open"]),
+            "dayHigh": float(last["High"]),
+            "dayLow": float(last["Low"]),
+            "regularMarketVolume": int(last["Volume"]),
+            "fiftyTwoWeekHigh": float(year["High"].max()),
+            "fiftyTwoWeekLow": float(year["Low"].min()),
+            "marketCap": price * shares,
+            "trailingPE": 10 + _seed(self.ticker, "pe") % 40,
+            "dividendYield": (_seed(self.ticker, "div") % 300) / 10000,
+            "companyOfficers": [],
+        }
+
+    @property
+    def fast_info(self):
+        info = self.info
+        return {
+            "lastPrice": info.get("currentPrice"),
+            "previousClose": info.get("previousClose"),
+            "open": info.get("open"),
+            "day_high": info.get("dayHigh"),
+            "day_low": info.get("dayLow"),
+            "lastVolume": info.get("regularMarketVolume"),
+            "market_cap": info.get("marketCap"),
+            "currency": info.get("currency"),
+            "year_high": info.get("fiftyTwoWeekHigh"),
+            "year_low": info.get("fiftyTwoWeekLow"),
+        }
+
+    @property
+    def news(self):
+        self._provider._delay()
+        recorded = self._provider._fixture_json("news", self.ticker)
+        if recorded is not None:
+            return recorded
+        now = int(pd.Timestamp(self._provider.anchor).timestamp())
+        return [
+            {
+                "title": f"{get_company_name(self.ticker)} market update #{i + 1}",
+                "link": f"https://example.invalid/news/{self.ticker}/{i}",
+                "publisher": "Offline Wire",
+                "providerPublishTime": now - i * 3600,
+            }
+            for i in range(5)
+        ]
+
+    @property
+    def analyst_price_target(self):
+        return None
+
+    def __getattr__(self, name):
+        # financials, earnings, recommendations, holders, ...: nothing recorded offline
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return pd.DataFrame()
+
+
+class OfflineProvider(MarketDataProvider):
+    name = "offline"
+
+    def __init__(self, fixtures_dir=FIXTURES_DIR, latency_ms=OFFLINE_LATENCY_MS, anchor=None):
+        self.fixtures_dir = fixtures_dir
+        self.latency = latency_ms / 1000.0
+        # Synthetic series end on this date; pin it with OFFLINE_ANCHOR_DATE for repeatable runs
+        self.anchor = pd.Timestamp(anchor or os.getenv("OFFLINE_ANCHOR_DATE") or pd.Timestamp.now()).normalize()
+
+    def _delay(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _fixture_json(self, kind, symbol):
+        path = os.path.join(self.fixtures_dir, kind, f"{symbol}.json")
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def _bars(self, symbol, interval):
+        path = os.path.join(self.fixtures_dir, "history", interval, f"{symbol}.csv")
+        if os.path.exists(path):
+            return _load_fixture_csv(path, session_for(symbol).tz)
+        if interval in ("1wk", "1mo", "3mo"):
+            daily = _synthetic_history(symbol, "1d", self.anchor)
+            rule = {"1wk": "W-FRI", "1mo": "MS", "3mo": "QS"}[interval]
+            return daily.resample(rule).agg({k: v for k, v in OHLCV_AGG.items() if k in daily}).dropna()
+        return _synthetic_history(symbol, interval, self.anchor)
+
+    def ticker(self, symbol, **kwargs):
+        return OfflineTicker(self, symbol)
+
+    async def history_async(self, symbol, period=None, interval="1d", start=None):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return OfflineTicker(self, symbol).history(period=period, interval=interval, start=start, _sleep=False)
+
+
+@lru_cache(maxsize=256)
+def _load_fixture_csv(path, tz):
+    df = pd.read_csv(path, index_col=0)
+    name = df.index.name
+    df.index = pd.to_datetime(df.index, utc=True).tz_convert(tz).rename(name)
+    return df
+
+
+def get_provider(name=PROVIDER_NAME):
+    if name == "offline":
+        return OfflineProvider()
+    if name != "yfinance":
+        print(f"[WARNING] Unknown MARKET_DATA_PROVIDER '{name}', using yfinance.")
+    return YFinanceProvider()
+
+
+# Shared provider used by the API, the async helpers and the ML pipeline
+market_data = get_provider()
+
+
+def record_fixtures(symbols, intervals=("1d", "5m"), fixtures_dir=FIXTURES_DIR):
+    """Snapshot live history, info and news so the offline provider can replay them."""
+    live = YFinanceProvider()
+    for symbol in symbols:
+        for interval in intervals:
+            period = "max" if not is_intraday(interval) else f"{INTRADAY_RETENTION_DAYS.get(interval, 60)}d"
+            df = live.history(symbol, period=period, interval=interval)
+            if df.empty:
+                continue
+            path = os.path.join(fixtures_dir, "history", interval, f"{symbol}.csv")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            df.to_csv(path)
+        for kind, value in (("info", live.ticker(symbol).info), ("news", live.news(symbol))):
+            path = os.path.join(fixtures_dir, kind, f"{symbol}.json")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                json.dump(value, f, default=str)
+        print(f"Recorded {symbol}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "record":
+        record_fixtures([s.upper() for s in sys.argv[2:]])
+    else:
+        print("Usage: python market_data_provider.py record SYMBOL [SYMBOL ...]")
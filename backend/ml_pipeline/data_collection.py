@@ -1,10 +1,17 @@
-import yfinance as yf
+import os
+import sys
 import pandas as pd
 
+# train.py runs from inside ml_pipeline/, so make the backend modules importable
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ohlcv_store import ohlcv_store, ticker_history_fetcher
+from market_data_provider import market_data
+
 def fetch_data(symbol: str, years: int = 10) -> pd.DataFrame:
-    """Fetches historical price data from yfinance."""
+    """Fetches historical price data, reusing the shared local OHLCV store."""
     print(f"Fetching {years} years of data for {symbol}...")
-    df = yf.download(symbol, period=f"{years}y", interval="1d")
+    fetch = ticker_history_fetcher(market_data.ticker(symbol), "1d")
+    df = ohlcv_store.read_through(symbol, f"{years}y", "1d", fetch)
     df.dropna(inplace=True)
     return df
 
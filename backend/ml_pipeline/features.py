@@ -1,5 +1,6 @@
 import pandas as pd
-import ta
+
+from indicator_engine import IndicatorFrame
 
 def engineer_features(df: pd.DataFrame) -> pd.DataFrame:
     """Engineers technical features for ML modeling."""
@@ -11,23 +12,24 @@ def engineer_features(df: pd.DataFrame) -> pd.DataFrame:
         
     df.columns = [str(c).title() for c in df.columns]
     
-    # Technical Indicators (ta library)
-    df['RSI'] = ta.momentum.RSIIndicator(df['Close'], window=14).rsi()
-    macd = ta.trend.MACD(df['Close'])
-    df['MACD_line'] = macd.macd()
-    df['MACD_signal'] = macd.macd_signal()
-    df['MACD_diff'] = macd.macd_diff()
+    # Technical Indicators (only the nodes these columns need; intermediates shared between them)
+    columns = IndicatorFrame(df).compute((
+        'RSI', 'MACD_line', 'MACD_signal', 'MACD_hist', 'BB_High', 'BB_Low', 'BB_Width', 'ATR', 'SMA_20', 'SMA_50',
+    ))
+    df['RSI'] = columns['RSI']
+    df['MACD_line'] = columns['MACD_line']
+    df['MACD_signal'] = columns['MACD_signal']
+    df['MACD_diff'] = columns['MACD_hist']
     
-    bb = ta.volatility.BollingerBands(df['Close'], window=20, window_dev=2)
-    df['BB_high'] = bb.bollinger_hband()
-    df['BB_low'] = bb.bollinger_lband()
-    df['BB_width'] = bb.bollinger_wband()
+    df['BB_high'] = columns['BB_High']
+    df['BB_low'] = columns['BB_Low']
+    df['BB_width'] = columns['BB_Width'] * 100
     
-    df['ATR'] = ta.volatility.AverageTrueRange(df['High'], df['Low'], df['Close'], window=14).average_true_range()
+    df['ATR'] = columns['ATR']
     
     # Moving Averages & Crossovers
-    df['SMA_20'] = ta.trend.sma_indicator(df['Close'], window=20)
-    df['SMA_50'] = ta.trend.sma_indicator(df['Close'], window=50)
+    df['SMA_20'] = columns['SMA_20']
+    df['SMA_50'] = columns['SMA_50']
     df['Crossover_20_50'] = (df['SMA_20'] > df['SMA_50']).astype(int)
     
     # Market Features (Returns & Volatility)
@@ -8,7 +8,8 @@ from dataclasses import dataclass
 from typing import List, Optional, Tuple
 
 import pandas as pd
-import yfinance as yf
+
+from market_data_provider import market_data
 
 
 @dataclass
@@ -19,11 +20,11 @@ class PriceIngestionConfig:
 
 def fetch_price_history(symbol: str, config: Optional[PriceIngestionConfig] = None) -> pd.DataFrame:
     """
-    Download OHLCV data using yfinance.
+    Download OHLCV data through the configured market-data provider.
     Returns a DataFrame with columns: [Open, High, Low, Close, Volume].
     """
     cfg = config or PriceIngestionConfig()
-    ticker = yf.Ticker(symbol)
+    ticker = market_data.ticker(symbol)
     # yfinance sometimes fails for certain periods; try a short cascade
     periods = [cfg.period] if cfg.period else ["2y", "1y", "6mo", "3mo", "1mo"]
     df = pd.DataFrame()
@@ -2,18 +2,26 @@ import os
 import joblib
 import pandas as pd
 from fastapi import APIRouter, HTTPException
-import yfinance as yf
 from ml_pipeline.features import engineer_features
+from ohlcv_store import ohlcv_store, ticker_history_fetcher
+from market_data_provider import market_data
+from indicator_cache import indicator_cache
+from cache_metrics import register
 
 router = APIRouter(prefix="/api/ml", tags=["ml"])
 
 # Global model cache to avoid reloading from disk on every request
 MODEL_CACHE = {}
+# symbol -> size of the loaded .joblib file, the cheapest stand-in for a model's memory footprint
+MODEL_BYTES = {}
+model_metrics = register("model_cache", lambda: {"models": (len(MODEL_CACHE), sum(MODEL_BYTES.values()))})
 
 def get_model(symbol: str):
     """Loads a custom ML model for a ticker, falling back to a general model if needed."""
     if symbol in MODEL_CACHE:
+        model_metrics.record("models", "hits")
         return MODEL_CACHE[symbol]
+    model_metrics.record("models", "misses")
         
     # Check if we have a model trained specifically for this symbol
     model_path = f"ml_pipeline/saved_models/{symbol}_best_model.joblib"
@@ -29,6 +37,7 @@ def get_model(symbol: str):
     try:
         model = joblib.load(model_path)
         MODEL_CACHE[symbol] = model
+        MODEL_BYTES[symbol] = os.path.getsize(model_path)
         return model
     except Exception as e:
         print(f"Failed to load model {model_path}: {e}")
@@ -42,12 +51,13 @@ async def predict_stock_movement(symbol: str):
         
     try:
         # 1. Fetch recent data
-        df = yf.download(symbol, period="3mo", interval="1d", progress=False)
+        # Same local dataset the training pipeline reads from
+        df = ohlcv_store.read_through(symbol, "3mo", "1d", ticker_history_fetcher(market_data.ticker(symbol), "1d"))
         if df.empty:
             raise HTTPException(status_code=404, detail=f"Market data not found for symbol {symbol}.")
             
-        # 2. Engineer features matching the exact training pipeline
-        df = engineer_features(df)
+        # 2. Engineer features matching the exact training pipeline (shared per bar window)
+        df = indicator_cache.get_or_compute("ml_features", df, engineer_features, symbol=symbol)
         
         # 3. Extract the exact features the tuned model kept during feature selection
         if isinstance(model, dict) and 'model' in model and 'features' in model:
@@ -4,10 +4,14 @@ from bs4 import BeautifulSoup
 import feedparser
 from datetime import datetime, timedelta
 from urllib.parse import quote_plus
-import yfinance as yf
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 import asyncio
 from company_mappings import get_company_name
+from market_data_provider import market_data
+from upstream_scheduler import upstream_scheduler, UpstreamThrottled, BATCH
+from circuit_breaker import CircuitOpen, breaker_for_url, yfinance_breaker
+import deadline as request_deadline
+from deadline import DeadlineExceeded
 
 async def fetch_url_async(url: str, headers: dict = None, timeout: int = 15):
     """Async URL fetcher with robust error handling and browser-like headers."""
@@ -20,16 +24,38 @@ async def fetch_url_async(url: str, headers: dict = None, timeout: int = 15):
             "Upgrade-Insecure-Requests": "1",
             "Cache-Control": "max-age=0",
         }
+    breaker = breaker_for_url(url)
+    try:
+        # Fails at once while the host's breaker is open
+        breaker.check()
+        # News scrapes queue behind interactive quote requests on shared hosts (Yahoo)
+        await upstream_scheduler.acquire_async(url, BATCH)
+        timeout = request_deadline.timeout(timeout)
+    except CircuitOpen as exc:
+        print(f"[FETCH ERROR] {exc}")
+        return None, 503
+    except DeadlineExceeded as exc:
+        print(f"[FETCH ERROR] {exc}")
+        return None, 504
+    except UpstreamThrottled as exc:
+        print(f"[FETCH ERROR] {exc}")
+        return None, 429
     async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as client:
         try:
             response = await client.get(url, headers=headers)
             response.raise_for_status()
+            breaker.record_success()
             return response.text, response.status_code
         except httpx.RequestError as exc:
             print(f"[FETCH ERROR] Request error for {exc.request.url!r}: {exc}")
+            breaker.record_failure(exc)
             return None, None
         except httpx.HTTPStatusError as exc:
             print(f"[FETCH ERROR] Status {exc.response.status_code} for {exc.request.url!r}")
+            if exc.response.status_code == 429:
+                upstream_scheduler.report_throttled(url, exc.response.headers.get("Retry-After"))
+            elif exc.response.status_code >= 500:
+                breaker.record_failure(exc)
             return None, exc.response.status_code
         except Exception as e:
             print(f"[FETCH ERROR] Unexpected error: {e}")
@@ -126,8 +152,13 @@ async def scrape_google_news(query_term, region='US'):
         search_url = f"https://news.google.com/search?q={safe_query}&hl={hl_val}&gl={gl_val}&ceid={ceid_val}"
         print(f"[NEWS] Scraping Google News: {query_term}")
         
-        html, _ = await fetch_url_async(search_url)
+        html, status = await fetch_url_async(search_url)
         if not html:
+            if status is None or status >= 500:
+                # Google News is down: reuse the last results for this query, marked stale
+                stale = breaker_for_url(search_url).last_good(search_url)
+                if stale:
+                    return stale, None
             return [], "Fetch Failed"
 
         def parse_google_html(html_text):
@@ -165,6 +196,8 @@ async def scrape_google_news(query_term, region='US'):
             return items
 
         news_items = await asyncio.to_thread(parse_google_html, html)
+        if news_items:
+            breaker_for_url(search_url).remember(search_url, news_items)
         return news_items, None
     except Exception as e:
         print(f"[GOOGLE NEWS ERROR] {e}")
@@ -178,9 +211,9 @@ async def scrape_yahoo_finance_news(ticker_symbol):
         
         # 1. Native yfinance news (Optimized)
         try:
-            stock = yf.Ticker(ticker_symbol)
+            stock = market_data.ticker(ticker_symbol)
             # Use fast_info if available or just news
-            yf_news = await asyncio.to_thread(lambda: stock.news)
+            yf_news = await asyncio.to_thread(yfinance_breaker.call, lambda: stock.news)
             if yf_news:
                 for item in yf_news:
                     news_items.append({
@@ -198,23 +231,36 @@ async def scrape_yahoo_finance_news(ticker_symbol):
 
         # 2. RSS Fallback
         feed_url = f"https://feeds.finance.yahoo.com/rss/2.0/headline?s={ticker_symbol}&region=US&lang=en-US"
+        rss_breaker = breaker_for_url(feed_url)
         try:
             headers = {"User-Agent": "Mozilla/5.0"}
-            async with httpx.AsyncClient(timeout=10) as client:
-                res = await client.get(feed_url, headers=headers)
-                if res.status_code == 200:
-                    feed = feedparser.parse(res.text)
-                    for entry in feed.entries[:5]:
-                        news_items.append({
-                            'title': entry.get('title', 'N/A'),
-                            'url': entry.get('link', ''),
-                            'source': 'Yahoo Finance (RSS)',
-                            'publisher': 'Yahoo Finance',
-                            'publishedAt': datetime.now().strftime('%Y-%m-%d %H:%M'),
-                            'description': entry.get('summary', entry.get('title', ''))
-                        })
+
+            async def _get_feed():
+                async with httpx.AsyncClient(timeout=request_deadline.timeout(10)) as client:
+                    res = await client.get(feed_url, headers=headers)
+                if res.status_code >= 500:
+                    res.raise_for_status()
+                return res
+
+            res = await rss_breaker.call_async(_get_feed)
+            if res.status_code == 200:
+                feed = feedparser.parse(res.text)
+                for entry in feed.entries[:5]:
+                    news_items.append({
+                        'title': entry.get('title', 'N/A'),
+                        'url': entry.get('link', ''),
+                        'source': 'Yahoo Finance (RSS)',
+                        'publisher': 'Yahoo Finance',
+                        'publishedAt': datetime.now().strftime('%Y-%m-%d %H:%M'),
+                        'description': entry.get('summary', entry.get('title', ''))
+                    })
+            if news_items:
+                rss_breaker.remember(feed_url, news_items)
         except Exception as e:
             print(f"[YAHOO RSS ERROR] {e}")
+            if not news_items:
+                # Feed unreachable: the last items we got for this ticker, marked stale
+                news_items = rss_breaker.last_good(feed_url) or []
 
         return news_items, None
     except Exception as e:
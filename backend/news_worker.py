@@ -2,6 +2,9 @@ import asyncio
 import httpx
 import datetime
 
+from upstream_scheduler import upstream_scheduler, BACKGROUND
+from circuit_breaker import breaker_for_url
+
 try:
     import feedparser
     from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
@@ -43,11 +46,20 @@ async def fetch_rss_feed(source_name: str, url: str):
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
-        async with httpx.AsyncClient(headers=headers, timeout=15.0, follow_redirects=True) as client:
-            response = await client.get(url)
+
+        async def _get_feed():
+            await upstream_scheduler.acquire_async(url, BACKGROUND)
+            async with httpx.AsyncClient(headers=headers, timeout=15.0, follow_redirects=True) as client:
+                response = await client.get(url)
+            if response.status_code == 429:
+                upstream_scheduler.report_throttled(url, response.headers.get("Retry-After"))
             response.raise_for_status()
-            feed = feedparser.parse(response.text)
-            return source_name, feed.entries
+            return response
+
+        # Skipped at once while the feed's breaker is open; the articles it gave before are already stored
+        response = await breaker_for_url(url).call_async(_get_feed)
+        feed = feedparser.parse(response.text)
+        return source_name, feed.entries
     except Exception as e:
         print(f"Error fetching {source_name}: {e}")
         return source_name, []
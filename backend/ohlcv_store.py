@@ -0,0 +1,268 @@
+"""
+Local columnar OHLCV store.
+
+One Parquet file per (interval, symbol) under OHLCV_DATA_DIR holds every bar we
+have already downloaded. Reads go through `read_through`, which only asks the
+upstream for the bars after the last stored timestamp (or for a longer window
+when the request reaches further back than what is stored), then answers the
+requested period from the local frame.
+"""
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+
+import pandas as pd
+
+from market_calendar import valid_until
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    print("[WARNING] pyarrow not available. Local OHLCV store disabled.")
+    PYARROW_AVAILABLE = False
+
+DATA_DIR = os.getenv("OHLCV_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "ohlcv"))
+STORE_ENABLED = os.getenv("OHLCV_STORE_ENABLED", "1") not in ("0", "false", "False")
+
+# Yahoo only serves fine intraday bars for a limited lookback, so don't keep more than that
+INTRADAY_RETENTION_DAYS = {
+    '1m': 7, '2m': 60, '5m': 60, '15m': 60, '30m': 60, '60m': 730, '90m': 60, '1h': 730
+}
+
+_META_KEY = b"stockseer"
+
+
+def period_days(period):
+    """Approximate calendar length of a yfinance period string, or None if unsupported."""
+    if period == 'max':
+        return float('inf')
+    if period == 'ytd':
+        now = pd.Timestamp.now()
+        return (now - now.replace(month=1, day=1)).days + 1
+    match = re.fullmatch(r"(\d+)(d|mo|y)", str(period or ''))
+    if not match:
+        return None
+    n, unit = int(match.group(1)), match.group(2)
+    return n * {'d': 1, 'mo': 31, 'y': 366}[unit]
+
+
+def period_start(index, period):
+    """Position of the first bar a yfinance request for `period` would have returned, in a sorted index."""
+    if not len(index) or period == 'max':
+        return 0
+    match = re.fullmatch(r"(\d+)(d|mo|y)", str(period))
+    if match and match.group(2) == 'd':
+        # Day periods count trading sessions, not calendar days
+        sessions = index.normalize().unique()
+        n = int(match.group(1))
+        return int(index.searchsorted(sessions[-n])) if len(sessions) > n else 0
+    now = pd.Timestamp.now(tz=index.tz)
+    if period == 'ytd':
+        cutoff = now.replace(month=1, day=1)
+    elif match and match.group(2) == 'mo':
+        cutoff = now - pd.DateOffset(months=int(match.group(1)))
+    elif match:
+        cutoff = now - pd.DateOffset(years=int(match.group(1)))
+    else:
+        return 0
+    return int(index.searchsorted(cutoff.normalize()))
+
+
+def slice_period(df, period):
+    """Return the rows of df that a yfinance request for `period` would have returned."""
+    start = period_start(df.index, period)
+    return df.iloc[start:] if start else df
+
+
+def interval_seconds(interval):
+    match = re.fullmatch(r"(\d+)(m|h|d|wk|mo)", str(interval))
+    if not match:
+        return None
+    n, unit = int(match.group(1)), match.group(2)
+    return n * {'m': 60, 'h': 3600, 'd': 86400, 'wk': 7 * 86400, 'mo': 30 * 86400}[unit]
+
+
+def is_intraday(interval):
+    seconds = interval_seconds(interval)
+    return seconds is not None and seconds < 86400
+
+
+def refresh_seconds(interval):
+    """How long a synced file is trusted before asking upstream for new bars."""
+    seconds = interval_seconds(interval) or 300
+    if is_intraday(interval):
+        return max(60, seconds)
+    return 300 if seconds <= 86400 else 3600
+
+
+def _merge(stored, fresh):
+    if stored.empty:
+        merged = fresh
+    elif fresh.empty:
+        merged = stored
+    else:
+        merged = pd.concat([stored, fresh])
+        # Re-fetched bars (e.g. today's still-forming bar) replace the stored copy
+        merged = merged[~merged.index.duplicated(keep='last')]
+    return merged.sort_index()
+
+
+def _has_corporate_action(df):
+    """Splits and dividends rewrite adjusted history, so appending is not enough."""
+    for col in ('Dividends', 'Stock Splits'):
+        if col in df.columns and (df[col].fillna(0) != 0).any():
+            return True
+    return False
+
+
+def ticker_history_fetcher(ticker, interval):
+    """Adapt a yf.Ticker to the fetch(period=..., start=...) callable read_through expects."""
+    def _fetch(period=None, start=None):
+        if start is not None:
+            df = ticker.history(start=start, interval=interval)
+        else:
+            df = ticker.history(period=period, interval=interval)
+        return df.dropna()
+    return _fetch
+
+
+class OHLCVStore:
+    def __init__(self, root=DATA_DIR, enabled=STORE_ENABLED):
+        self.root = root
+        self.enabled = bool(enabled and PYARROW_AVAILABLE)
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def path(self, symbol, interval):
+        safe_symbol = str(symbol).upper().replace(os.sep, "_")
+        return os.path.join(self.root, interval, f"{safe_symbol}.parquet")
+
+    def _lock_for(self, path):
+        with self._locks_guard:
+            return self._locks.setdefault(path, threading.Lock())
+
+    def load(self, symbol, interval):
+        """Return (frame, metadata) for a stored series; an empty frame if none."""
+        path = self.path(symbol, interval)
+        if not self.enabled or not os.path.exists(path):
+            return pd.DataFrame(), {}
+        try:
+            table = pq.read_table(path)
+            meta = json.loads((table.schema.metadata or {}).get(_META_KEY, b"{}"))
+            return table.to_pandas(), meta
+        except Exception as e:
+            print(f"[OHLCV STORE] Unreadable file {path}, ignoring: {e}")
+            return pd.DataFrame(), {}
+
+    def save(self, symbol, interval, df, meta):
+        path = self.path(symbol, interval)
+        retention = INTRADAY_RETENTION_DAYS.get(interval)
+        if retention and not df.empty:
+            df = df[df.index >= df.index[-1] - pd.Timedelta(days=retention)]
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        table = pa.Table.from_pandas(df, preserve_index=True)
+        metadata = dict(table.schema.metadata or {})
+        metadata[_META_KEY] = json.dumps(meta).encode()
+        table = table.replace_schema_metadata(metadata)
+        # Write-then-rename so concurrent readers (other workers) never see a partial file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+
+    def _plan(self, symbol, stored, meta, period, interval):
+        """Decide how to answer a request: ('full', period), ('append', start) or ('hit', None)."""
+        covered_days = period_days(meta.get('covered_period')) or 0
+        if stored.empty or period_days(period) > covered_days:
+            return 'full', period
+        # No new bars can appear between a settled close and the next open
+        if time.time() >= valid_until(symbol, meta.get('synced_at', 0), refresh_seconds(interval)):
+            return 'append', stored.index[-1]
+        return 'hit', None
+
+    def _persist(self, symbol, period, interval, merged, covered_period):
+        try:
+            self.save(symbol, interval, merged, {'covered_period': covered_period, 'synced_at': time.time()})
+        except Exception as e:
+            print(f"[OHLCV STORE] Failed to persist {symbol} {interval}: {e}")
+        return slice_period(merged, period)
+
+    def read_through(self, symbol, period, interval, fetch):
+        """Answer a history request from the store, fetching only what is missing.
+
+        `fetch(period=..., start=...)` downloads bars from upstream; it is called
+        with a period for a full window or with start=<last stored timestamp>
+        for an incremental append.
+        """
+        if not self.enabled or period_days(period) is None:
+            return fetch(period=period)
+
+        path = self.path(symbol, interval)
+        with self._lock_for(path):
+            stored, meta = self.load(symbol, interval)
+            covered_period = meta.get('covered_period')
+            action, arg = self._plan(symbol, stored, meta, period, interval)
+            if action == 'hit':
+                return slice_period(stored, period)
+            if action == 'full':
+                fresh = fetch(period=period)
+                if fresh.empty:
+                    return fresh
+                merged = _merge(stored, fresh)
+                if period_days(period) > (period_days(covered_period) or 0):
+                    covered_period = period
+            else:
+                fresh = fetch(start=arg)
+                if _has_corporate_action(fresh.iloc[1:]):
+                    print(f"[OHLCV STORE] Corporate action for {symbol}, reloading {covered_period} of {interval} bars")
+                    reloaded = fetch(period=covered_period)
+                    merged = reloaded if not reloaded.empty else _merge(stored, fresh)
+                else:
+                    merged = _merge(stored, fresh)
+            return self._persist(symbol, period, interval, merged, covered_period)
+
+    def _commit(self, symbol, period, interval, fresh, covered_period, replace=False):
+        """Merge fetched bars into what is on disk now and write it, under the path's lock.
+
+        The async path fetches without holding the lock, so another worker thread may
+        have written the file meanwhile; re-reading here keeps its bars and coverage.
+        """
+        with self._lock_for(self.path(symbol, interval)):
+            stored, meta = self.load(symbol, interval)
+            merged = fresh if replace else _merge(stored, fresh)
+            stored_period = meta.get('covered_period')
+            if (period_days(stored_period) or 0) > (period_days(covered_period) or 0):
+                covered_period = stored_period
+            return self._persist(symbol, period, interval, merged, covered_period)
+
+    async def read_through_async(self, symbol, period, interval, fetch):
+        """Async read_through: `fetch` is a coroutine function, disk I/O runs in a worker thread."""
+        if not self.enabled or period_days(period) is None:
+            return await fetch(period=period)
+
+        stored, meta = await asyncio.to_thread(self.load, symbol, interval)
+        covered_period = meta.get('covered_period')
+        action, arg = self._plan(symbol, stored, meta, period, interval)
+        if action == 'hit':
+            return slice_period(stored, period)
+        if action == 'full':
+            fresh = await fetch(period=period)
+            if fresh.empty:
+                return fresh
+            return await asyncio.to_thread(self._commit, symbol, period, interval, fresh, period)
+        fresh = await fetch(start=arg)
+        if _has_corporate_action(fresh.iloc[1:]):
+            print(f"[OHLCV STORE] Corporate action for {symbol}, reloading {covered_period} of {interval} bars")
+            reloaded = await fetch(period=covered_period)
+            if not reloaded.empty:
+                return await asyncio.to_thread(
+                    self._commit, symbol, period, interval, reloaded, covered_period, True
+                )
+        return await asyncio.to_thread(self._commit, symbol, period, interval, fresh, covered_period)
+
+# Shared instance used by the API, the async helpers and the ML pipeline
+ohlcv_store = OHLCVStore()
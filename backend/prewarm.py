@@ -0,0 +1,155 @@
+"""
+Background cache warmer for frequently requested symbols.
+
+Keeps quotes and daily history for a hot set (the mapped company tickers, the
+sample watchlist and anything listed in PREWARM_SYMBOLS) refreshed ahead of
+user requests. Each market is refreshed on its own cadence: often while its
+session is open, rarely while it is closed. Upstream calls run at BACKGROUND
+priority so they never take tokens interactive requests need.
+"""
+import asyncio
+import os
+import time
+from collections import defaultdict
+
+from starlette.concurrency import run_in_threadpool
+
+from company_mappings import TICKER_TO_NAME
+from market_calendar import is_market_open, session_for
+from upstream_scheduler import priority, BACKGROUND, UpstreamThrottled
+
+PREWARM_ENABLED = os.getenv("PREWARM_ENABLED", "1") not in ("0", "false", "False")
+DEFAULT_WATCHLIST = ['AAPL', 'GOOGL', 'MSFT', 'TSLA', 'AMZN']
+EXTRA_SYMBOLS = [s.strip().upper() for s in os.getenv("PREWARM_SYMBOLS", "").split(",") if s.strip()]
+
+# Seconds between passes. A quote pass only loads quotes that are missing or would drop
+# out of the cache's stale window before the next pass; stale ones are revalidated by
+# the requests that read them, so Yahoo isn't asked for quotes nobody is looking at
+QUOTE_REFRESH_OPEN = int(os.getenv("PREWARM_QUOTE_OPEN_SECONDS", "240"))
+QUOTE_REFRESH_CLOSED = int(os.getenv("PREWARM_QUOTE_CLOSED_SECONDS", "1800"))
+HISTORY_REFRESH_OPEN = int(os.getenv("PREWARM_HISTORY_OPEN_SECONDS", "900"))
+HISTORY_REFRESH_CLOSED = int(os.getenv("PREWARM_HISTORY_CLOSED_SECONDS", "21600"))
+HISTORY_PERIOD = os.getenv("PREWARM_HISTORY_PERIOD", "1y")
+QUOTE_CONCURRENCY = 4
+HISTORY_CONCURRENCY = 4
+TICK_SECONDS = 30
+
+_task = None
+
+
+def hot_symbols():
+    return list(dict.fromkeys([*TICKER_TO_NAME.keys(), *DEFAULT_WATCHLIST, *EXTRA_SYMBOLS]))
+
+
+class Prewarmer:
+    """Refreshes the hot set per market. `quote_fn(symbol, within=seconds)` is sync, `history_fn(symbol, period)` async.
+
+    `quote_fn` should load the same full quote interactive requests read, not a
+    batch approximation of it.
+    """
+
+    def __init__(self, quote_fn, history_fn, symbols=None):
+        self.quote_fn = quote_fn
+        self.history_fn = history_fn
+        self.symbols = symbols or hot_symbols()
+        self._due = {}  # (kind, market) -> monotonic time of next refresh
+        self.runs = defaultdict(int)
+        self.last_error = None
+
+    def _markets(self):
+        groups = defaultdict(list)
+        for symbol in self.symbols:
+            groups[session_for(symbol).market].append(symbol)
+        return groups
+
+    def _take_due(self, kind, market, is_open):
+        """Seconds until this market's next `kind` pass if one is due now, else None."""
+        now = time.monotonic()
+        if now < self._due.get((kind, market), 0):
+            return None
+        if kind == "quotes":
+            wait = QUOTE_REFRESH_OPEN if is_open else QUOTE_REFRESH_CLOSED
+        else:
+            wait = HISTORY_REFRESH_OPEN if is_open else HISTORY_REFRESH_CLOSED
+        self._due[(kind, market)] = now + wait
+        return wait
+
+    async def _warm_quotes(self, symbols, within):
+        semaphore = asyncio.Semaphore(QUOTE_CONCURRENCY)
+
+        async def _one(symbol):
+            async with semaphore:
+                try:
+                    await run_in_threadpool(self.quote_fn, symbol, within=within)
+                except UpstreamThrottled:
+                    raise
+                except Exception as e:
+                    print(f"[PREWARM] Quote for {symbol} failed: {e}")
+
+        await asyncio.gather(*(_one(s) for s in symbols))
+
+    async def _warm_history(self, symbols):
+        semaphore = asyncio.Semaphore(HISTORY_CONCURRENCY)
+
+        async def _one(symbol):
+            async with semaphore:
+                try:
+                    await self.history_fn(symbol, HISTORY_PERIOD)
+                except UpstreamThrottled:
+                    raise
+                except Exception as e:
+                    print(f"[PREWARM] History for {symbol} failed: {e}")
+
+        await asyncio.gather(*(_one(s) for s in symbols))
+
+    async def tick(self):
+        with priority(BACKGROUND):
+            for market, symbols in self._markets().items():
+                is_open = is_market_open(symbols[0])
+                try:
+                    wait = self._take_due("quotes", market, is_open)
+                    if wait is not None:
+                        await self._warm_quotes(symbols, within=wait + TICK_SECONDS)
+                        self.runs[f"quotes:{market}"] += 1
+                    if self._take_due("history", market, is_open) is not None:
+                        await self._warm_history(symbols)
+                        self.runs[f"history:{market}"] += 1
+                except UpstreamThrottled as e:
+                    # Out of background budget: retry this market on the next tick
+                    self._due.pop(("quotes", market), None)
+                    self._due.pop(("history", market), None)
+                    self.last_error = str(e)
+                    return
+
+    async def run(self):
+        print(f"[PREWARM] Warming {len(self.symbols)} symbols across {len(self._markets())} markets")
+        while True:
+            try:
+                await self.tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"[PREWARM] Tick failed: {e}")
+            await asyncio.sleep(TICK_SECONDS)
+
+
+def start_prewarmer(quote_fn, history_fn, symbols=None):
+    global _task
+    if not PREWARM_ENABLED or _task is not None:
+        return None
+    warmer = Prewarmer(quote_fn, history_fn, symbols)
+    _task = asyncio.create_task(warmer.run())
+    return warmer
+
+
+async def stop_prewarmer():
+    global _task
+    if _task is None:
+        return
+    _task.cancel()
+    try:
+        await _task
+    except asyncio.CancelledError:
+        pass
+    _task = None
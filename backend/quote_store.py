@@ -0,0 +1,314 @@
+"""
+Persistent daily price history in the `stock_quotes` table.
+
+On Postgres/TimescaleDB the table is turned into a hypertable and large loads go
+through COPY into a staging table; smaller batches (and SQLite) use a bulk
+executemany upsert. Daily bars are keyed by their trading date (midnight, stored
+as naive UTC) so the same date is produced regardless of the exchange time zone.
+
+The read path (`get_daily_history`) answers chart/technical requests from the
+database and only calls the upstream fetcher to backfill missing sessions.
+Closes are auto-adjusted, so when a backfill brings in a dividend or split the
+symbol's whole stored window is re-downloaded and rewritten, as OHLCVStore does;
+otherwise older rows would keep the previous adjustment factor.
+"""
+import asyncio
+import sys
+import time
+from decimal import Decimal
+
+import pandas as pd
+from starlette.concurrency import run_in_threadpool
+
+from ohlcv_store import _has_corporate_action, period_days
+from market_calendar import valid_until, last_close, is_market_open, SETTLE_SECONDS
+
+try:
+    from sqlalchemy import func, select, text
+    from sqlalchemy.dialects.postgresql import insert as pg_insert
+    from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+    from database import engine, AsyncSessionLocal, SQLALCHEMY_AVAILABLE
+    from models import StockQuote
+    QUOTE_STORE_AVAILABLE = SQLALCHEMY_AVAILABLE
+except ImportError as e:
+    print(f"[WARNING] Quote store disabled: {e}")
+    QUOTE_STORE_AVAILABLE = False
+
+UPSERT_BATCH_SIZE = 500
+COPY_THRESHOLD = 2000          # Rows above which Postgres loads use COPY
+DB_REFRESH_SECONDS = 300       # How long a backfilled symbol is trusted before re-checking upstream
+_COLUMNS = ("open", "high", "low", "close", "volume")
+# Periods tried, shortest first, when re-downloading a stored window after a corporate action
+RELOAD_PERIODS = ("1mo", "3mo", "6mo", "1y", "2y", "5y", "10y", "max")
+
+# symbol -> (synced_at, covered_days, last_bar); per-process memory of recent backfills
+_synced = {}
+# Keep references to fire-and-forget upserts so they are not garbage collected
+_pending_writes = set()
+
+
+def _to_session_dates(df):
+    """Re-key daily bars by trading date (naive midnight) so the stored date never shifts across time zones."""
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    out = df.copy()
+    out.index = index.normalize()
+    out.index.name = "Date"
+    return out[~out.index.duplicated(keep="last")]
+
+
+def _naive_utc(value):
+    ts = pd.Timestamp(value)
+    return ts.tz_convert("UTC").tz_localize(None) if ts.tzinfo is not None else ts
+
+
+def _to_rows(symbol, df):
+    rows = []
+    for ts, bar in df.iterrows():
+        if pd.isna(bar.get("Close")):
+            continue
+        rows.append({
+            "time": ts.tz_localize("UTC").to_pydatetime(),
+            "symbol": symbol,
+            "open": Decimal(str(round(float(bar["Open"]), 6))),
+            "high": Decimal(str(round(float(bar["High"]), 6))),
+            "low": Decimal(str(round(float(bar["Low"]), 6))),
+            "close": Decimal(str(round(float(bar["Close"]), 6))),
+            "volume": int(bar["Volume"]) if pd.notna(bar.get("Volume")) else 0,
+        })
+    return rows
+
+
+def _upsert_statement(dialect_name):
+    insert = pg_insert if dialect_name == "postgresql" else sqlite_insert
+    stmt = insert(StockQuote.__table__)
+    return stmt.on_conflict_do_update(
+        index_elements=["time", "symbol"],
+        set_={col: stmt.excluded[col] for col in _COLUMNS},
+    )
+
+
+async def ensure_hypertable():
+    """Convert stock_quotes into a TimescaleDB hypertable when running on Postgres with the extension."""
+    if not QUOTE_STORE_AVAILABLE or engine is None or engine.dialect.name != "postgresql":
+        return
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS timescaledb"))
+            await conn.execute(text(
+                "SELECT create_hypertable('stock_quotes', 'time', if_not_exists => TRUE, migrate_data => TRUE)"
+            ))
+        print("[STARTUP] stock_quotes hypertable ready.")
+    except Exception as e:
+        print(f"[WARNING] Could not create stock_quotes hypertable: {e}")
+
+
+async def _copy_upsert_pg(conn, rows):
+    """COPY rows into a staging table, then merge them into stock_quotes in one statement."""
+    raw = await conn.get_raw_connection()
+    await conn.execute(text(
+        "CREATE TEMP TABLE IF NOT EXISTS stock_quotes_stage "
+        "(LIKE stock_quotes INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+    ))
+    columns = ["time", "symbol", *_COLUMNS]
+    await raw.driver_connection.copy_records_to_table(
+        "stock_quotes_stage", records=[tuple(r[c] for c in columns) for r in rows], columns=columns
+    )
+    updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in _COLUMNS)
+    await conn.execute(text(
+        f"INSERT INTO stock_quotes ({', '.join(columns)}) "
+        f"SELECT {', '.join(columns)} FROM stock_quotes_stage "
+        f"ON CONFLICT (time, symbol) DO UPDATE SET {updates}"
+    ))
+
+
+async def upsert_bars(symbol, df):
+    """Bulk upsert daily OHLCV bars for one symbol. Returns the number of rows written."""
+    if not QUOTE_STORE_AVAILABLE or df is None or df.empty:
+        return 0
+    rows = _to_rows(symbol.upper(), _to_session_dates(df))
+    if not rows:
+        return 0
+    dialect = engine.dialect.name
+    async with engine.begin() as conn:
+        if dialect == "postgresql" and len(rows) >= COPY_THRESHOLD:
+            await _copy_upsert_pg(conn, rows)
+        else:
+            stmt = _upsert_statement(dialect)
+            for i in range(0, len(rows), UPSERT_BATCH_SIZE):
+                # A list of parameter sets runs as one executemany per batch
+                await conn.execute(stmt, rows[i:i + UPSERT_BATCH_SIZE])
+    return len(rows)
+
+
+async def load_bars(symbol, start=None, end=None):
+    """Read daily bars for a symbol as an OHLCV DataFrame indexed by trading date."""
+    if not QUOTE_STORE_AVAILABLE:
+        return pd.DataFrame()
+    stmt = select(StockQuote).where(StockQuote.symbol == symbol.upper())
+    if start is not None:
+        stmt = stmt.where(StockQuote.time >= start)
+    if end is not None:
+        stmt = stmt.where(StockQuote.time <= end)
+    stmt = stmt.order_by(StockQuote.time)
+    async with AsyncSessionLocal() as session:
+        quotes = (await session.execute(stmt)).scalars().all()
+    if not quotes:
+        return pd.DataFrame()
+    df = pd.DataFrame(
+        {
+            "Open": [float(q.open) for q in quotes],
+            "High": [float(q.high) for q in quotes],
+            "Low": [float(q.low) for q in quotes],
+            "Close": [float(q.close) for q in quotes],
+            "Volume": [int(q.volume or 0) for q in quotes],
+        },
+        index=pd.DatetimeIndex([_naive_utc(q.time) for q in quotes], name="Date"),
+    )
+    return df
+
+
+async def stored_start(symbol):
+    """Trading date of the oldest stored bar for a symbol, or None."""
+    async with AsyncSessionLocal() as session:
+        first = (await session.execute(
+            select(func.min(StockQuote.time)).where(StockQuote.symbol == symbol.upper())
+        )).scalar()
+    return None if first is None else _naive_utc(first).normalize()
+
+
+def _covering_period(start):
+    days = (pd.Timestamp.now().normalize() - start).days + 7  # slack for a weekend or holiday at the start
+    return next(period for period in RELOAD_PERIODS if period_days(period) >= days)
+
+
+def _needs_backfill(symbol, df, period):
+    wanted_days = period_days(period)
+    if df.empty:
+        return True
+    synced = _synced.get(symbol)
+    # Trust a recent backfill once its write has landed (the last bar it saw is in the table);
+    # after a settled close "recent" lasts until the next open
+    if (synced and time.time() < valid_until(symbol, synced[0], DB_REFRESH_SECONDS)
+            and synced[1] >= wanted_days and df.index[-1] >= synced[2]):
+        return False
+    today = pd.Timestamp.now().normalize()
+    # Leave a week of slack for weekends and holidays at the start of the window
+    if df.index[0] > today - pd.Timedelta(days=wanted_days) + pd.Timedelta(days=7):
+        return True
+    closed = last_close(symbol)
+    if closed is None:
+        return True
+    # Missing a completed session, or today's bar is still moving
+    if df.index[-1] < pd.Timestamp(closed.date()) or is_market_open(symbol):
+        return True
+    # Closed: one backfill after the close has settled makes the stored last bar final
+    return not synced or synced[0] < closed.timestamp() + SETTLE_SECONDS
+
+
+def _schedule_upsert(symbol, df):
+    task = asyncio.create_task(upsert_bars(symbol, df))
+    _pending_writes.add(task)
+    task.add_done_callback(_pending_writes.discard)
+
+
+async def _reload_stored_window(symbol, fetch, fresh):
+    """Rewrite every stored bar of a symbol after a dividend or split re-adjusted its history."""
+    try:
+        start = await stored_start(symbol)
+        if start is not None and start < fresh.index[0]:
+            period = _covering_period(start)
+            print(f"[QUOTE STORE] Corporate action for {symbol}, reloading {period} of daily bars")
+            reloaded = await _call_fetch(fetch, symbol, period)
+            if not reloaded.empty:
+                fresh = _to_session_dates(reloaded)
+        await upsert_bars(symbol, fresh)
+    except Exception as e:
+        print(f"[QUOTE STORE] Reload after corporate action failed for {symbol}: {e}")
+
+
+def _schedule_reload(symbol, fetch, fresh):
+    task = asyncio.create_task(_reload_stored_window(symbol, fetch, fresh))
+    _pending_writes.add(task)
+    task.add_done_callback(_pending_writes.discard)
+
+
+async def _call_fetch(fetch, symbol, period):
+    if asyncio.iscoroutinefunction(fetch):
+        return await fetch(symbol, period, "1d")
+    return await run_in_threadpool(fetch, symbol, period, "1d")
+
+
+async def get_daily_history(symbol, period, fetch):
+    """Serve a daily-bar window from the database, backfilling gaps through `fetch`.
+
+    `fetch(symbol, period, interval)` is the upstream fetcher: a coroutine
+    function (fetch_stock_data_async) is awaited, a synchronous one
+    (fetch_stock_data) runs in the threadpool. Its result is upserted in the
+    background.
+    """
+    symbol = symbol.upper()
+    wanted_days = period_days(period)
+    if not QUOTE_STORE_AVAILABLE or wanted_days is None or wanted_days == float("inf"):
+        return await _call_fetch(fetch, symbol, period)
+
+    start = pd.Timestamp.now().normalize() - pd.Timedelta(days=wanted_days)
+    try:
+        df = await load_bars(symbol, start=start.tz_localize("UTC").to_pydatetime())
+    except Exception as e:
+        print(f"[QUOTE STORE] Read failed for {symbol}: {e}")
+        df = pd.DataFrame()
+
+    if not _needs_backfill(symbol, df, period):
+        df.attrs["ticker_symbol"] = symbol
+        return df
+
+    fresh = await _call_fetch(fetch, symbol, period)
+    if fresh.empty:
+        return df if not df.empty else fresh
+    fresh = _to_session_dates(fresh)
+    if not df.empty and _has_corporate_action(fresh[~fresh.index.isin(df.index)]):
+        # The new sessions carry a dividend or split: every stored close needs the new adjustment
+        _schedule_reload(symbol, fetch, fresh)
+    else:
+        # Only write sessions the database is missing plus the latest (possibly still-forming) bar
+        new_rows = fresh if df.empty else fresh[(~fresh.index.isin(df.index)) | (fresh.index >= df.index[-1])]
+        if not new_rows.empty:
+            _schedule_upsert(symbol, new_rows)
+    _synced[symbol] = (time.time(), max(wanted_days, _synced.get(symbol, (0, 0, None))[1]), fresh.index[-1])
+    fresh.attrs["ticker_symbol"] = symbol
+    return fresh
+
+
+async def ingest_daily_bars(symbols, period="1y"):
+    """Bulk-load daily bars for many symbols with one batched download."""
+    import yfinance as yf
+
+    data = await run_in_threadpool(
+        yf.download, list(symbols), period=period, interval="1d",
+        group_by="ticker", progress=False, threads=False
+    )
+    written = 0
+    for symbol in symbols:
+        try:
+            bars = data[symbol] if isinstance(data.columns, pd.MultiIndex) else data
+            written += await upsert_bars(symbol, bars.dropna(subset=["Close"]))
+        except Exception as e:
+            print(f"[QUOTE STORE] Ingest failed for {symbol}: {e}")
+    return written
+
+
+if __name__ == "__main__":
+    # Usage: python quote_store.py AAPL MSFT RELIANCE.NS [period]
+    args = sys.argv[1:]
+    ingest_period = args.pop() if args and period_days(args[-1]) is not None else "1y"
+
+    async def _main():
+        from database import Base
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        await ensure_hypertable()
+        print(f"Ingested {await ingest_daily_bars(args, ingest_period)} bars.")
+
+    asyncio.run(_main())
@@ -1,16 +1,135 @@
 import os
-import redis.asyncio as redis
 import json
+import redis as redis_sync
+import redis.asyncio as redis
+import pandas as pd
+
+# Compact binary codec: orjson (or msgpack) for plain values, Arrow IPC + lz4 for DataFrames
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import pyarrow as pa
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 
-redis_client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+# Values are binary-tagged, so the clients return raw bytes
+redis_client = redis.Redis.from_url(REDIS_URL)
+# Blocking client for code that runs in worker threads (tight timeouts: a cache must never stall a request)
+sync_redis_client = redis_sync.Redis.from_url(REDIS_URL, socket_timeout=0.25, socket_connect_timeout=0.25)
+
+_TAG_ORJSON = b"\x01"
+_TAG_MSGPACK = b"\x02"
+_TAG_ARROW = b"\x03"
+_ATTRS_KEY = b"stockseer.attrs"
+
+
+def _encode_frame(df: pd.DataFrame) -> bytes:
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    if df.attrs:
+        metadata = dict(table.schema.metadata or {})
+        metadata[_ATTRS_KEY] = json.dumps(df.attrs, default=str).encode()
+        table = table.replace_schema_metadata(metadata)
+    sink = pa.BufferOutputStream()
+    options = pa.ipc.IpcWriteOptions(compression="lz4")
+    with pa.ipc.new_stream(sink, table.schema, options=options) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _decode_frame(payload: bytes) -> pd.DataFrame:
+    table = pa.ipc.open_stream(payload).read_all()
+    df = table.to_pandas()
+    attrs = (table.schema.metadata or {}).get(_ATTRS_KEY)
+    if attrs:
+        df.attrs.update(json.loads(attrs))
+    return df
+
+
+def encode(value) -> bytes:
+    if isinstance(value, pd.DataFrame) and ARROW_AVAILABLE:
+        return _TAG_ARROW + _encode_frame(value)
+    if ORJSON_AVAILABLE:
+        return _TAG_ORJSON + orjson.dumps(
+            value, default=str, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+    if MSGPACK_AVAILABLE:
+        return _TAG_MSGPACK + msgpack.packb(value, default=str, use_bin_type=True)
+    return json.dumps(value, default=str).encode()
+
+
+def decode(raw):
+    if raw is None:
+        return None
+    tag, payload = raw[:1], raw[1:]
+    if tag == _TAG_ARROW:
+        return _decode_frame(payload)
+    if tag == _TAG_ORJSON:
+        return orjson.loads(payload)
+    if tag == _TAG_MSGPACK:
+        return msgpack.unpackb(payload, raw=False)
+    # Untagged: plain JSON written before the binary codec
+    return json.loads(raw)
+
 
 async def get_cached_val(key: str):
-    data = await redis_client.get(key)
-    if data:
-        return json.loads(data)
-    return None
+    return decode(await redis_client.get(key))
+
+async def set_cached_val(key: str, data, ttl_seconds: int = 300):
+    await redis_client.setex(key, ttl_seconds, encode(data))
+
+async def get_many(keys, raw=False):
+    """One MGET for all keys; misses come back as None. `raw` skips decoding."""
+    if not keys:
+        return []
+    values = await redis_client.mget(keys)
+    return values if raw else [decode(v) for v in values]
+
+async def set_many(mapping: dict, ttl_seconds: int = 300, raw=False):
+    """Write many keys in one pipelined round trip."""
+    if not mapping:
+        return
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for key, value in mapping.items():
+            pipe.setex(key, ttl_seconds, value if raw else encode(value))
+        await pipe.execute()
+
+async def delete_many(keys):
+    if keys:
+        await redis_client.delete(*keys)
+
+def get_cached_val_sync(key: str):
+    return decode(sync_redis_client.get(key))
+
+def set_cached_val_sync(key: str, data, ttl_seconds: int = 300):
+    sync_redis_client.setex(key, ttl_seconds, encode(data))
+
+def get_many_sync(keys, raw=False):
+    if not keys:
+        return []
+    values = sync_redis_client.mget(keys)
+    return values if raw else [decode(v) for v in values]
+
+def set_many_sync(mapping: dict, ttl_seconds: int = 300, raw=False):
+    if not mapping:
+        return
+    pipe = sync_redis_client.pipeline(transaction=False)
+    for key, value in mapping.items():
+        pipe.setex(key, ttl_seconds, value if raw else encode(value))
+    pipe.execute()
 
-async def set_cached_val(key: str, data: dict, ttl_seconds: int = 300):
-    await redis_client.setex(key, ttl_seconds, json.dumps(data))
+def delete_many_sync(keys):
+    if keys:
+        sync_redis_client.delete(*keys)
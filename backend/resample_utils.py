@@ -0,0 +1,49 @@
+"""
+Local OHLCV resampling.
+
+Coarser intraday bars are derived from a finer series instead of being fetched
+separately: first open, max high, min low, last close, summed volume. Buckets are
+anchored on each session's first bar, which matches how Yahoo aligns its hourly
+bars to the market open (09:30, 10:30, ... for US listings).
+"""
+import pandas as pd
+
+from ohlcv_store import interval_seconds
+
+OHLCV_AGG = {
+    'Open': 'first',
+    'High': 'max',
+    'Low': 'min',
+    'Close': 'last',
+    'Volume': 'sum',
+    'Dividends': 'sum',
+    'Stock Splits': 'max',
+}
+
+# Finest interval we fetch for chart views, and the longest period Yahoo serves it for
+BASE_INTERVAL = '5m'
+BASE_PERIOD = '5d'
+BASE_MAX_DAYS = 60
+
+
+def can_resample(from_interval, to_interval):
+    """True if to_interval bars can be built from from_interval bars within a session."""
+    src, dst = interval_seconds(from_interval), interval_seconds(to_interval)
+    if not src or not dst or dst < src or dst >= 86400:
+        return False
+    return dst % src == 0
+
+
+def resample_ohlcv(df, interval):
+    """Aggregate an intraday OHLCV frame into coarser `interval` bars."""
+    if df.empty:
+        return df
+    step = pd.Timedelta(seconds=interval_seconds(interval))
+    index = df.index
+    session_open = pd.DatetimeIndex(pd.Series(index, index=index).groupby(index.normalize()).transform('min'))
+    buckets = session_open + ((index - session_open) // step) * step
+    agg = {col: how for col, how in OHLCV_AGG.items() if col in df.columns}
+    out = df.groupby(buckets.rename(index.name)).agg(agg)
+    out = out.dropna(subset=['Close'])
+    out.attrs.update(df.attrs)
+    return out
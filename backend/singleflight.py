@@ -0,0 +1,109 @@
+"""
+Single-flight request coalescing for upstream market-data fetches.
+
+Concurrent callers asking for the same key share one in-flight call and all of
+them receive its result (or its exception). Keys are plain tuples such as
+("history", "AAPL", "1y", "1d") or ("quote", "AAPL").
+
+Callers modify what they get back (dropna(inplace=True), attrs, added
+indicator columns), so when a call was shared, every caller, the leader
+included, receives its own copy of a DataFrame, Series, dict or list result.
+An unshared call returns the result itself.
+"""
+import asyncio
+import threading
+
+import pandas as pd
+
+import deadline
+from deadline import DeadlineExceeded
+
+
+def _wait_timeout():
+    left = deadline.remaining()
+    return None if left is None else max(0.0, left)
+
+
+def _own_copy(value):
+    if isinstance(value, (pd.DataFrame, pd.Series, dict, list)):
+        return value.copy()
+    return value
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Deduplicates concurrent identical calls, for threads and for asyncio tasks."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._tasks = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) once per key at a time; other callers block and share the result."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.calls += 1
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+
+        if not leader:
+            # Followers give up at their own request deadline; the leader keeps going for the others
+            if not call.done.wait(_wait_timeout()):
+                raise DeadlineExceeded(f"shared upstream call {key}")
+            if call.error is not None:
+                raise call.error
+            return _own_copy(call.result)
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        # No follower can join once the key is gone, so `waiters` is final here
+        return _own_copy(call.result) if call.waiters else call.result
+
+    async def do_async(self, key, coro_fn, *args, **kwargs):
+        """Async variant: one task per key, awaited (shielded) by every caller."""
+        entry = self._tasks.get(key)
+        if entry is None:
+            entry = [asyncio.ensure_future(coro_fn(*args, **kwargs)), 0]  # task, followers
+            self._tasks[key] = entry
+            self.calls += 1
+            entry[0].add_done_callback(lambda _t: self._tasks.pop(key, None))
+        else:
+            entry[1] += 1
+            self.coalesced += 1
+        task = entry[0]
+        # Shield so a cancelled (or timed-out) waiter does not cancel the fetch shared by the others
+        try:
+            result = await asyncio.wait_for(asyncio.shield(task), _wait_timeout())
+            # The key is dropped as the task finishes, before any waiter resumes, so the count is final
+            return _own_copy(result) if entry[1] else result
+        except asyncio.TimeoutError:
+            if task.done():
+                raise
+            raise DeadlineExceeded(f"shared upstream call {key}") from None
+
+    def in_flight(self):
+        return len(self._calls) + len(self._tasks)
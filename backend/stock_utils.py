@@ -1,9 +1,13 @@
-import yfinance as yf
 import pandas as pd
-import ta
 import numpy as np
 import asyncio
 from datetime import datetime, timedelta
+from ohlcv_store import ohlcv_store, ticker_history_fetcher
+import yahoo_client
+from market_data_provider import market_data
+from upstream_scheduler import UpstreamThrottled
+from info_cache import info_cache
+from indicator_engine import IndicatorFrame
 
 # --- Data Fetching and Processing ---
 
@@ -23,13 +27,26 @@ def create_yf_session():
 YF_SESSION = create_yf_session()
 
 async def fetch_stock_data_async(ticker_symbol, period='3mo', interval='1d'):
-    """Fetch stock data asynchronously using threads for yfinance"""
+    """Fetch stock data on the async Yahoo client, falling back to yfinance in a thread"""
     def _fetch():
-        stock = yf.Ticker(ticker_symbol, session=YF_SESSION)
-        df = stock.history(period=period, interval=interval)
-        df.dropna(inplace=True)
-        return df
-    return await asyncio.to_thread(_fetch)
+        stock = market_data.ticker(ticker_symbol, session=YF_SESSION)
+        # Shared local store: only bars newer than the last stored one hit the network
+        return ohlcv_store.read_through(ticker_symbol, period, interval, ticker_history_fetcher(stock, interval))
+
+    async def _fetch_native(period=None, start=None):
+        return await market_data.history_async(ticker_symbol, period, interval, start=start)
+
+    try:
+        return await ohlcv_store.read_through_async(ticker_symbol, period, interval, _fetch_native)
+    except yahoo_client.YahooClientError as e:
+        print(f"[YAHOO CLIENT] {ticker_symbol} falling back to yfinance: {e}")
+        return await asyncio.to_thread(_fetch)
+    except yahoo_client.YahooSymbolNotFound as e:
+        print(f"[YAHOO CLIENT] {e}")
+        return pd.DataFrame()
+    except UpstreamThrottled as e:
+        print(f"[SCHEDULER] Skipping history for {ticker_symbol}: {e}")
+        return pd.DataFrame()
 
 async def add_technical_indicators_async(df):
     """Add technical indicators asynchronously"""
@@ -37,9 +54,10 @@ async def add_technical_indicators_async(df):
         if df_in.empty or 'Close' not in df_in.columns:
             return pd.DataFrame()
         df_ta = df_in.copy()
-        df_ta['SMA_20'] = ta.trend.sma_indicator(df_ta['Close'], window=20)
-        df_ta['RSI'] = ta.momentum.rsi(df_ta['Close'], window=14)
-        df_ta['MACD'] = ta.trend.macd_diff(df_ta['Close'])
+        columns = IndicatorFrame(df_ta).compute(('SMA_20', 'RSI', 'MACD_hist'))
+        df_ta['SMA_20'] = columns['SMA_20']
+        df_ta['RSI'] = columns['RSI']
+        df_ta['MACD'] = columns['MACD_hist']
         return df_ta
     return await asyncio.to_thread(_calc, df)
 
@@ -69,11 +87,12 @@ async def generate_signal_detailed_async(df):
         previous = df_in.iloc[-2] 
         rsi_val = latest['RSI']; macd_hist_val = latest['MACD']
         try:
-            macd_line_series = ta.trend.macd(df_in['Close'])
-            macd_signal_series = ta.trend.macd_signal(df_in['Close'])
+            # One EMA pass for both lines instead of recomputing the 12/26 EMAs per line
+            macd = IndicatorFrame(df_in).compute(('MACD_line', 'MACD_signal'))
+            macd_line_series, macd_signal_series = macd['MACD_line'], macd['MACD_signal']
             if len(macd_line_series) < 2 or len(macd_signal_series) < 2: return "N/A", "Not enough data for MACD line calculation."
-            macd_line_val = macd_line_series.iloc[-1]; macd_signal_line_val = macd_signal_series.iloc[-1]
-            prev_macd_line = macd_line_series.iloc[-2]; prev_macd_signal_line = macd_signal_series.iloc[-2]
+            macd_line_val = macd_line_series[-1]; macd_signal_line_val = macd_signal_series[-1]
+            prev_macd_line = macd_line_series[-2]; prev_macd_signal_line = macd_signal_series[-2]
         except Exception as e: return "N/A", f"Error calculating MACD lines: {e}"
         close_price = latest['Close']; sma20 = latest['SMA_20']
         reasons = []; buy_score = 0; sell_score = 0
@@ -103,8 +122,7 @@ async def generate_signal_detailed_async(df):
 async def get_company_info_async(ticker_symbol):
     def _fetch():
         try:
-            stock = yf.Ticker(ticker_symbol, session=YF_SESSION)
-            info = stock.info
+            info = info_cache.get(ticker_symbol)
             if not info: return "Info not available.", "N/A", "N/A", None, "N/A", {}
             return (info.get('longBusinessSummary', "No summary available via yfinance API."), info.get('sector', 'N/A'), info.get('industry', 'N/A'),
                     info.get('marketCap'), info.get('exchange', 'N/A'), info)
@@ -129,8 +147,7 @@ def get_company_info_yfinance(*args, **kwargs):
     # This matches the signature expected by app.py
     import pandas as pd
     try:
-        stock = yf.Ticker(args[0], session=YF_SESSION)
-        info = stock.info
+        info = info_cache.get(args[0])
         if not info: return "Info not available.", "N/A", "N/A", None, "N/A", {}, pd.DataFrame(), pd.DataFrame(), None, None, pd.DataFrame(), pd.DataFrame()
         return (info.get('longBusinessSummary', "No summary available."), info.get('sector', 'N/A'), info.get('industry', 'N/A'),
                 info.get('marketCap'), info.get('exchange', 'N/A'), info,
@@ -0,0 +1,110 @@
+import asyncio
+
+import pandas as pd
+import pytest
+
+import circuit_breaker as cb
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen
+from upstream_scheduler import UpstreamThrottled
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = Clock()
+    monkeypatch.setattr(cb, "time", fake)
+    return fake
+
+
+def fail():
+    raise ConnectionError("upstream down")
+
+
+def trip(breaker, n):
+    for _ in range(n):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_seconds=10)
+    trip(breaker, 2)
+    assert breaker.call(lambda: "ok") == "ok"  # a success resets the count
+    trip(breaker, 3)
+    assert breaker.state == OPEN
+    called = []
+    with pytest.raises(CircuitOpen) as info:
+        breaker.call(called.append, 1)
+    assert not called and info.value.retry_after == pytest.approx(10)
+
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=10)
+    trip(breaker, 1)
+    clock.now += 10
+    breaker.check()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.check()  # everyone else keeps failing fast while the probe is out
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.call(lambda: "ok") == "ok"
+
+
+def test_failed_probe_reopens_with_a_doubled_wait(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=10, max_reset_seconds=25)
+    trip(breaker, 1)
+    for expected in (20, 25):
+        clock.now += 100
+        trip(breaker, 1)  # the probe fails
+        assert breaker.state == OPEN
+        assert breaker.stats()["retry_after"] == pytest.approx(expected)
+    clock.now += 25
+    assert breaker.call(lambda: "ok") == "ok"
+    # Recovery resets the wait
+    trip(breaker, 1)
+    assert breaker.stats()["retry_after"] == pytest.approx(10)
+
+
+def test_throttling_and_rate_limits_do_not_trip(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1)
+    for error in (UpstreamThrottled("yahoo", 1.0), Exception("Too Many Requests")):
+        def throttled():
+            raise error
+        with pytest.raises(type(error)):
+            breaker.call(throttled)
+    assert breaker.state == CLOSED
+
+
+def test_async_calls_go_through_the_breaker(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1)
+
+    async def down():
+        raise ConnectionError("upstream down")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(breaker.call_async(down))
+    with pytest.raises(CircuitOpen):
+        asyncio.run(breaker.call_async(down))
+
+
+def test_last_good_is_a_stale_copy(clock):
+    breaker = CircuitBreaker("test", last_good_max=2)
+    df = pd.DataFrame({"Close": [1.0]})
+    breaker.remember("a", df)
+    breaker.remember("b", {"price": 1.0})
+    stale = breaker.last_good("a")
+    assert stale.attrs["stale"] and "stale" not in df.attrs
+    assert breaker.last_good("b") == {"price": 1.0, "stale": True}
+    breaker.remember("c", [])
+    assert breaker.last_good("a") is None  # evicted, oldest first
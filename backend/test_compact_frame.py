@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from compact_frame import CompactFrame, compact, expand
+
+
+def make_frame(n=50, tz="America/New_York"):
+    rng = np.random.default_rng(0)
+    close = 100 + rng.standard_normal(n).cumsum()
+    index = pd.date_range("2026-01-02", periods=n, freq="B", tz=tz, name="Date")
+    df = pd.DataFrame({
+        "Open": close, "High": close + 1, "Low": close - 1, "Close": close,
+        "Volume": rng.integers(1, 1_000_000, n),
+        "RSI": rng.uniform(0, 100, n), "SMA_20": close / 3,
+    }, index=index)
+    df.attrs["ticker_symbol"] = "AAPL"
+    return df
+
+
+@pytest.mark.parametrize("tz", [None, "America/New_York", "Asia/Kolkata"])
+def test_round_trip(tz):
+    df = make_frame(tz=tz)
+    out = CompactFrame.from_pandas(df).to_pandas()
+    pd.testing.assert_index_equal(out.index, df.index)
+    assert list(out.columns) == list(df.columns)
+    assert out.attrs == df.attrs
+    # Every column comes back exactly, in its own dtype
+    pd.testing.assert_frame_equal(out, df, check_exact=True, check_freq=False)
+    assert out["Volume"].dtype == np.int64
+
+
+def test_large_float_sums_stay_exact():
+    df = make_frame()
+    df["OBV"] = 1e12 + np.arange(len(df)) * 0.25
+    out = CompactFrame.from_pandas(df).to_pandas()
+    np.testing.assert_array_equal(out["OBV"].to_numpy(), df["OBV"].to_numpy())
+
+
+def test_slice_is_a_view_with_matching_rows():
+    df = make_frame()
+    frame = CompactFrame.from_pandas(df)
+    part = frame.slice(10, 20)
+    assert len(part) == 10
+    assert all(np.shares_memory(a, b) for a, b in zip(part.blocks, frame.blocks))
+    pd.testing.assert_frame_equal(part.to_pandas(), frame.to_pandas().iloc[10:20])
+    pd.testing.assert_frame_equal(frame.slice(-5).to_pandas(), frame.to_pandas().iloc[-5:])
+
+
+def test_to_pandas_columns_and_index():
+    df = make_frame()
+    frame = CompactFrame.from_pandas(df)
+    out = frame.to_pandas(columns=["Close", "RSI", "Missing"])
+    assert list(out.columns) == ["Close", "RSI"]
+    out = frame.slice(5).to_pandas(index=df.index[5:])
+    assert out.index.equals(df.index[5:])
+    np.testing.assert_array_equal(out["Close"].to_numpy(), df["Close"].to_numpy()[5:])
+
+
+def test_results_are_writable_copies():
+    frame = CompactFrame.from_pandas(make_frame())
+    out = frame.to_pandas()
+    out.iloc[0, 0] = -1.0
+    assert frame.to_pandas().iloc[0, 0] != -1.0
+    assert not any(block.flags.writeable for block in frame.blocks)
+
+
+def test_frames_with_the_same_columns_share_a_layout():
+    a, b = CompactFrame.from_pandas(make_frame(30)), CompactFrame.from_pandas(make_frame(40))
+    assert a.layout is b.layout
+
+
+def test_empty_frame():
+    frame = CompactFrame.from_pandas(make_frame().iloc[:0])
+    assert frame.empty and len(frame) == 0
+    assert frame.to_pandas().empty
+
+
+def test_compact_and_expand():
+    df = make_frame()
+    assert isinstance(compact(df), CompactFrame)
+    plain = pd.DataFrame({"x": [1.0, 2.0]})
+    assert compact(plain) is plain
+    assert expand(plain) is not plain
+    pd.testing.assert_frame_equal(expand(plain), plain)
+    with pytest.raises(TypeError):
+        CompactFrame.from_pandas(plain)
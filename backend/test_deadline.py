@@ -0,0 +1,125 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import deadline
+import hedging
+from deadline import DeadlineExceeded, deadline_scope
+from hedging import Hedger
+
+
+def test_budget_from_header_is_clamped():
+    assert deadline.budget_from_header("5000") == 5.0
+    assert deadline.budget_from_header("10") == deadline.MIN_REQUEST_BUDGET
+    assert deadline.budget_from_header(str(10**9)) == deadline.MAX_REQUEST_BUDGET
+    assert deadline.budget_from_header(None) == deadline.REQUEST_BUDGET
+    assert deadline.budget_from_header("-1") == deadline.REQUEST_BUDGET
+
+
+def test_scopes_never_extend_an_outer_deadline():
+    assert deadline.remaining() is None
+    with deadline_scope(1.0):
+        with deadline_scope(60):
+            assert deadline.remaining() <= 1.0
+        with deadline_scope(None):
+            assert deadline.remaining() is None  # background work drops the deadline
+        assert deadline.timeout(30) <= 1.0
+        assert deadline.timeout(0.1) == 0.1
+    assert deadline.remaining() is None and deadline.timeout(30) == 30
+
+
+def test_spent_budget_raises():
+    with deadline_scope(0):
+        with pytest.raises(DeadlineExceeded):
+            deadline.check()
+        with pytest.raises(DeadlineExceeded):
+            deadline.timeout(5)
+
+
+def test_deadline_follows_work_into_threads():
+    async def main():
+        with deadline_scope(2.0):
+            return await asyncio.to_thread(deadline.remaining)
+
+    assert 0 < asyncio.run(main()) <= 2.0
+
+
+def warmed(delay_seconds, host=None):
+    hedger = Hedger("test", host)
+    for _ in range(hedging.HEDGE_MIN_SAMPLES):
+        hedger.record(delay_seconds)
+    return hedger
+
+
+def test_no_hedge_before_enough_samples():
+    hedger = Hedger("test")
+    assert hedger.delay() is None
+    assert hedger.call(lambda: "ok") == "ok"
+    assert hedger.stats()["hedged"] == 0 and hedger.stats()["samples"] == 1
+
+
+def test_no_hedge_when_the_deadline_is_shorter_than_the_delay():
+    hedger = warmed(0.5)
+    assert hedger.delay() == pytest.approx(0.5)
+    with deadline_scope(0.2):
+        assert hedger.delay() is None
+
+
+def test_slow_call_is_hedged_and_the_duplicate_wins():
+    hedger, attempts, lock = warmed(0.05), [], threading.Lock()
+
+    def fetch():
+        with lock:
+            attempts.append(1)
+            first = len(attempts) == 1
+        time.sleep(1.0 if first else 0.0)
+        return "slow" if first else "fast"
+
+    assert hedger.call(fetch) == "fast"
+    assert len(attempts) == 2
+    stats = hedger.stats()
+    assert stats["hedged"] == 1 and stats["hedge_won"] == 1
+
+
+def test_threaded_call_gives_up_at_the_deadline():
+    hedger = warmed(0.05)
+    with deadline_scope(0.3):
+        with pytest.raises(DeadlineExceeded):
+            hedger.call(time.sleep, 1.0)
+
+
+def test_async_loser_is_cancelled():
+    hedger, cancelled = warmed(0.05), []
+    calls = iter([1.0, 0.0])
+
+    async def fetch():
+        pause = next(calls)
+        try:
+            await asyncio.sleep(pause)
+        except asyncio.CancelledError:
+            cancelled.append(pause)
+            raise
+        return pause
+
+    async def main():
+        result = await hedger.call_async(fetch)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(main()) == 0.0
+    assert cancelled == [1.0]
+    assert hedger.stats()["hedge_won"] == 1
+
+
+def test_no_hedge_without_a_rate_limit_token(monkeypatch):
+    hedger = warmed(0.05, host="hedge.test")
+    monkeypatch.setattr(hedging.upstream_scheduler, "try_acquire", lambda host: (False, 1.0))
+
+    async def slow():
+        await asyncio.sleep(0.2)
+        return "ok"
+
+    assert asyncio.run(hedger.call_async(slow)) == "ok"
+    assert hedger.stats()["hedged"] == 0
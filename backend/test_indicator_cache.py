@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import indicator_engine as ie
+from compact_frame import CompactFrame
+from indicator_cache import IndicatorCache, frame_key
+
+
+def make_bars(n=300, symbol="AAPL"):
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    index = pd.date_range("2024-01-01", periods=n, freq="B", name="Date")
+    df = pd.DataFrame({
+        "Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close,
+        "Volume": rng.integers(10_000_000, 90_000_000, n).astype(float) + 0.5,
+    }, index=index)
+    df.attrs["ticker_symbol"] = symbol
+    return df
+
+
+@pytest.mark.parametrize("fn", [ie.enhanced_indicators, ie.basic_indicators])
+def test_hit_returns_exactly_what_the_miss_computed(fn):
+    cache, df = IndicatorCache(), make_bars()
+    miss = cache.get_or_compute("set", df, fn, adds_columns=True)
+    hit = cache.get_or_compute("set", df, fn, adds_columns=True)
+    pd.testing.assert_frame_equal(hit, miss, check_exact=True)
+    assert cache.metrics.counts()["set"] == {"misses": 1, "hits": 1}
+
+
+def test_adds_columns_entries_hold_only_the_new_columns():
+    cache, df = IndicatorCache(), make_bars()
+    cache.get_or_compute("set", df, ie.enhanced_indicators, adds_columns=True)
+    (entry,) = cache._frames.values()
+    assert isinstance(entry, CompactFrame)
+    assert not set(entry.columns) & set(df.columns)
+
+
+def test_hits_are_private_copies():
+    cache, df = IndicatorCache(), make_bars()
+    cache.get_or_compute("set", df, ie.basic_indicators, adds_columns=True)
+    first = cache.get_or_compute("set", df, ie.basic_indicators, adds_columns=True)
+    first["RSI"] = -1.0
+    assert (cache.get_or_compute("set", df, ie.basic_indicators, adds_columns=True)["RSI"] != -1.0).any()
+
+
+def test_new_bar_changes_the_key():
+    df = make_bars()
+    moved = df.copy()
+    moved.iloc[-1, moved.columns.get_loc("Close")] *= 1.01
+    assert frame_key(df) != frame_key(moved)
+    assert frame_key(df.iloc[:-1]) != frame_key(df)
+
+
+def test_frames_without_a_symbol_are_not_cached():
+    cache, df = IndicatorCache(), make_bars()
+    df.attrs.clear()
+    cache.get_or_compute("set", df, ie.basic_indicators)
+    assert not cache._frames
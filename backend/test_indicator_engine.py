@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+import ta
+
+import indicator_engine as ie
+
+
+def make_bars(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    high = close * (1 + rng.uniform(0, 0.02, n))
+    low = close * (1 - rng.uniform(0, 0.02, n))
+    volume = rng.integers(100_000, 1_000_000, n).astype(float)
+    index = pd.date_range("2024-01-01", periods=n, freq="B", name="Date")
+    return pd.DataFrame({"Open": close, "High": high, "Low": low, "Close": close, "Volume": volume}, index=index)
+
+
+def ta_reference(df, name):
+    c, h, l, v = df["Close"], df["High"], df["Low"], df["Volume"]
+    bands = ta.volatility.BollingerBands(c, 20, 2)
+    stoch = ta.momentum.StochasticOscillator(h, l, c)
+    references = {
+        "SMA_20": lambda: ta.trend.sma_indicator(c, 20),
+        "EMA_20": lambda: ta.trend.ema_indicator(c, 20),
+        "SMA_50": lambda: ta.trend.sma_indicator(c, 50),
+        "EMA_50": lambda: ta.trend.ema_indicator(c, 50),
+        "SMA_200": lambda: ta.trend.sma_indicator(c, 200),
+        "EMA_200": lambda: ta.trend.ema_indicator(c, 200),
+        "BB_High": bands.bollinger_hband,
+        "BB_Mid": bands.bollinger_mavg,
+        "BB_Low": bands.bollinger_lband,
+        "BB_Width": lambda: (bands.bollinger_hband() - bands.bollinger_lband()) / bands.bollinger_mavg(),
+        "BB_Position": lambda: (c - bands.bollinger_lband()) / (bands.bollinger_hband() - bands.bollinger_lband()),
+        "RSI": lambda: ta.momentum.rsi(c, 14),
+        "RSI_MA": lambda: ta.trend.sma_indicator(ta.momentum.rsi(c, 14), 14),
+        "MACD_line": lambda: ta.trend.macd(c),
+        "MACD_signal": lambda: ta.trend.macd_signal(c),
+        "MACD_hist": lambda: ta.trend.macd_diff(c),
+        "Stoch_K": stoch.stoch,
+        "Stoch_D": stoch.stoch_signal,
+        "Williams_R": lambda: ta.momentum.williams_r(h, l, c),
+        "CCI": lambda: ta.trend.cci(h, l, c),
+        "ATR": lambda: ta.volatility.average_true_range(h, l, c),
+        "OBV": lambda: ta.volume.on_balance_volume(c, v),
+        "MFI": lambda: ta.volume.money_flow_index(h, l, c, v),
+    }
+    return references[name]().to_numpy(dtype=float)
+
+
+def assert_same(actual, expected):
+    assert np.array_equal(np.isnan(actual), np.isnan(expected))
+    np.testing.assert_allclose(actual, expected, rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+@pytest.mark.parametrize("name", ie.ENHANCED_COLUMNS)
+def test_matches_ta(name):
+    df = make_bars(300)
+    assert_same(ie.add_indicators(df, [name])[name].to_numpy(dtype=float), ta_reference(df, name))
+
+
+@pytest.mark.parametrize("n", [5, 15, 21, 60])
+def test_short_frames_leave_out_indicators_without_enough_bars(n):
+    df = make_bars(n)
+    out = ie.enhanced_indicators(df)
+    expected = [name for name in ie.ENHANCED_COLUMNS if n > ie.INDICATORS[name].min_bars]
+    assert [col for col in out.columns if col not in df.columns] == expected
+    for name in expected:
+        assert_same(out[name].to_numpy(dtype=float), ta_reference(df, name))
+
+
+def test_basic_indicators_fill_gated_columns_with_nan():
+    out = ie.basic_indicators(make_bars(30))
+    assert set(ie.BASIC_COLUMNS) <= set(out.columns)
+    assert out["SMA_50"].isna().all()
+
+
+def test_latest_values_match_full_frame():
+    df = make_bars(250)
+    full = ie.enhanced_indicators(df).iloc[-1]
+    latest = ie.latest_values(df, ie.ENHANCED_COLUMNS)
+    for name in ie.ENHANCED_COLUMNS:
+        assert latest[name] == pytest.approx(full[name], rel=1e-12)
+
+
+def test_plan_rejects_unknown_names():
+    with pytest.raises(KeyError):
+        ie.plan(["NOT_AN_INDICATOR"])
+
+
+def test_cross_section_handles_frames_missing_columns():
+    full, close_only, no_volume = make_bars(300, 1), make_bars(300, 2)[["Close"]], make_bars(300, 3).drop(columns=["Volume"])
+    table = ie.cross_section({"A": full, "B": close_only, "C": no_volume})
+    assert list(table.index) == ["A", "B", "C"]
+    for name, value in ie.latest_values(full, ie.ENHANCED_COLUMNS).items():
+        assert table.loc["A", name] == pytest.approx(value, rel=1e-9)
+    assert not np.isnan(table.loc["B", "RSI"]) and np.isnan(table.loc["B", "ATR"])
+    assert not np.isnan(table.loc["C", "ATR"]) and np.isnan(table.loc["C", "OBV"])
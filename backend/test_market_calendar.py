@@ -0,0 +1,77 @@
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+import market_calendar as mc
+
+NEW_YORK = ZoneInfo("America/New_York")
+KOLKATA = ZoneInfo("Asia/Kolkata")
+OPEN_TTL = 300
+
+
+def at(year, month, day, hour, minute, tz):
+    return datetime(year, month, day, hour, minute, tzinfo=tz)
+
+
+def test_open_market_uses_the_open_ttl():
+    fetched = at(2026, 10, 14, 11, 0, NEW_YORK).timestamp()
+    assert mc.valid_until("AAPL", fetched, OPEN_TTL) == fetched + OPEN_TTL
+
+
+def test_just_after_the_close_still_settling():
+    fetched = at(2026, 10, 14, 16, 10, NEW_YORK).timestamp()
+    assert mc.valid_until("AAPL", fetched, OPEN_TTL) == fetched + OPEN_TTL
+
+
+def test_friday_close_is_valid_until_monday_open():
+    fetched = at(2026, 10, 16, 18, 0, NEW_YORK).timestamp()
+    assert mc.valid_until("AAPL", fetched, OPEN_TTL) == at(2026, 10, 19, 9, 30, NEW_YORK).timestamp()
+
+
+def test_saturday_fetch_is_valid_until_monday_open():
+    fetched = at(2026, 10, 17, 12, 0, NEW_YORK).timestamp()
+    assert mc.valid_until("AAPL", fetched, OPEN_TTL) == at(2026, 10, 19, 9, 30, NEW_YORK).timestamp()
+
+
+def test_us_holiday_is_skipped():
+    # Thanksgiving 2026 is Thursday November 26th
+    assert date(2026, 11, 26) in mc.holidays(mc.session_for("AAPL"), 2026)
+    fetched = at(2026, 11, 25, 18, 0, NEW_YORK).timestamp()
+    assert mc.valid_until("AAPL", fetched, OPEN_TTL) == at(2026, 11, 27, 9, 30, NEW_YORK).timestamp()
+
+
+def test_holiday_before_a_weekend_runs_to_monday():
+    # Good Friday 2026 is April 3rd
+    fetched = at(2026, 4, 2, 18, 0, NEW_YORK).timestamp()
+    assert mc.valid_until("AAPL", fetched, OPEN_TTL) == at(2026, 4, 6, 9, 30, NEW_YORK).timestamp()
+
+
+def test_nse_holiday_is_skipped():
+    # Diwali Balipratipada, Tuesday November 10th 2026
+    assert date(2026, 11, 10) in mc.holidays(mc.session_for("RELIANCE.NS"), 2026)
+    assert not mc.is_market_open("RELIANCE.NS", at(2026, 11, 10, 11, 0, KOLKATA))
+    fetched = at(2026, 11, 9, 17, 0, KOLKATA).timestamp()
+    assert mc.valid_until("RELIANCE.NS", fetched, OPEN_TTL) == at(2026, 11, 11, 9, 15, KOLKATA).timestamp()
+
+
+def test_closed_ttl_is_capped():
+    fetched = at(2026, 10, 16, 18, 0, NEW_YORK).timestamp()
+    assert mc.valid_until("AAPL", fetched, OPEN_TTL) - fetched <= mc.MAX_CLOSED_TTL
+
+
+def test_crypto_never_closes():
+    fetched = at(2026, 10, 17, 12, 0, NEW_YORK).timestamp()
+    assert mc.valid_until("BTC-USD", fetched, OPEN_TTL) == fetched + OPEN_TTL
+
+
+@pytest.mark.skipif(mc.XCALS_AVAILABLE, reason="exchange_calendars covers the year, not just the file")
+def test_year_past_the_holidays_file_warns_once(capsys, monkeypatch):
+    monkeypatch.setattr(mc, "_UNCOVERED_WARNED", set())
+    mc.holidays.cache_clear()
+    last = max(mc._holiday_file()["IN"]).year
+    mc.holidays(mc.session_for("RELIANCE.NS"), last)
+    assert "holiday-free" not in capsys.readouterr().out
+    mc.holidays(mc.session_for("RELIANCE.NS"), last + 1)
+    mc.holidays(mc.session_for("TCS.BO"), last + 2)
+    assert capsys.readouterr().out.count("holiday-free") == 1
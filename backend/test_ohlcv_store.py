@@ -0,0 +1,88 @@
+import asyncio
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import ohlcv_store as store_module
+from ohlcv_store import OHLCVStore
+
+pytestmark = pytest.mark.skipif(not store_module.PYARROW_AVAILABLE, reason="pyarrow not installed")
+
+SYMBOL = "BTC-USD"  # Trades around the clock, so freshness only depends on refresh_seconds
+
+
+def make_bars(end, n):
+    index = pd.date_range(end=end, periods=n, freq="D", tz="UTC", name="Date")
+    close = 100 + np.arange(n, dtype=float)
+    return pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1, "Close": close,
+                         "Volume": np.full(n, 1000.0)}, index=index)
+
+
+class Upstream:
+    """Fake fetch(period=..., start=...) serving slices of one long series."""
+
+    def __init__(self, bars):
+        self.bars = bars
+        self.calls = []
+
+    def __call__(self, period=None, start=None):
+        self.calls.append(("start", start) if start is not None else ("period", period))
+        if start is not None:
+            return self.bars[self.bars.index >= start]
+        return store_module.slice_period(self.bars, period)
+
+    async def fetch_async(self, period=None, start=None):
+        return self(period=period, start=start)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return OHLCVStore(root=str(tmp_path), enabled=True)
+
+
+def test_plan(store):
+    bars = make_bars(pd.Timestamp.now(tz="UTC").normalize(), 40)
+    assert store._plan(SYMBOL, pd.DataFrame(), {}, "1mo", "1d") == ("full", "1mo")
+    fresh = {"covered_period": "1mo", "synced_at": time.time()}
+    assert store._plan(SYMBOL, bars, fresh, "5d", "1d") == ("hit", None)
+    assert store._plan(SYMBOL, bars, fresh, "1y", "1d") == ("full", "1y")
+    old = {"covered_period": "1mo", "synced_at": time.time() - 3600}
+    assert store._plan(SYMBOL, bars, old, "1mo", "1d") == ("append", bars.index[-1])
+
+
+def test_read_through_fetches_full_then_serves_hits(store):
+    upstream = Upstream(make_bars(pd.Timestamp.now(tz="UTC").normalize(), 400))
+    first = store.read_through(SYMBOL, "1mo", "1d", upstream)
+    second = store.read_through(SYMBOL, "5d", "1d", upstream)
+    assert upstream.calls == [("period", "1mo")]
+    pd.testing.assert_frame_equal(second, first.iloc[-5:], check_freq=False)
+
+
+def test_read_through_appends_after_last_stored_bar(store):
+    bars = make_bars(pd.Timestamp.now(tz="UTC").normalize(), 400)
+    store.read_through(SYMBOL, "1mo", "1d", Upstream(bars.iloc[:-3]))
+    stored, meta = store.load(SYMBOL, "1d")
+    store.save(SYMBOL, "1d", stored, {**meta, "synced_at": 0})
+    upstream = Upstream(bars)
+    out = store.read_through(SYMBOL, "1mo", "1d", upstream)
+    assert upstream.calls == [("start", bars.index[-4])]
+    assert out.index[-1] == bars.index[-1]
+    assert store.load(SYMBOL, "1d")[1]["covered_period"] == "1mo"
+
+
+def test_async_commit_keeps_a_concurrent_write(store):
+    bars = make_bars(pd.Timestamp.now(tz="UTC").normalize(), 400)
+    upstream = Upstream(bars)
+
+    async def fetch(period=None, start=None):
+        # A worker thread fills a longer window while this request is still downloading
+        store.read_through(SYMBOL, "1y", "1d", upstream)
+        return await upstream.fetch_async(period=period, start=start)
+
+    out = asyncio.run(store.read_through_async(SYMBOL, "1mo", "1d", fetch))
+    stored, meta = store.load(SYMBOL, "1d")
+    assert meta["covered_period"] == "1y"
+    assert len(stored) == len(store_module.slice_period(bars, "1y"))
+    assert out.index[-1] == bars.index[-1]
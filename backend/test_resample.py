@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from resample_utils import can_resample, resample_ohlcv
+
+
+def five_minute_session(day, first="09:30", last="15:55", tz="America/New_York"):
+    index = pd.date_range(f"{day} {first}", f"{day} {last}", freq="5min", tz=tz, name="Datetime")
+    n = len(index)
+    close = 100 + np.arange(n, dtype=float)
+    return pd.DataFrame({
+        "Open": close - 0.5, "High": close + 1, "Low": close - 1, "Close": close,
+        "Volume": np.full(n, 10, dtype="int64"),
+    }, index=index)
+
+
+def test_hourly_buckets_start_at_the_session_open():
+    out = resample_ohlcv(five_minute_session("2026-10-14"), "1h")
+    assert [ts.strftime("%H:%M") for ts in out.index] == [
+        "09:30", "10:30", "11:30", "12:30", "13:30", "14:30", "15:30",
+    ]
+    # The last bucket only has the six bars up to the 16:00 close
+    assert out["Volume"].tolist() == [120] * 6 + [60]
+
+
+def test_bucket_edges_and_aggregation():
+    df = five_minute_session("2026-10-14")
+    out = resample_ohlcv(df, "1h")
+    first = df.between_time("09:30", "10:25")
+    assert out.iloc[0].to_dict() == pytest.approx({
+        "Open": first["Open"].iat[0], "High": first["High"].max(), "Low": first["Low"].min(),
+        "Close": first["Close"].iat[-1], "Volume": first["Volume"].sum(),
+    })
+    # 10:30 opens the next bucket rather than closing the first
+    assert out.iloc[1]["Open"] == df.loc[df.index.strftime("%H:%M") == "10:30", "Open"].iat[0]
+
+
+def test_each_session_is_anchored_on_its_own_first_bar():
+    df = pd.concat([five_minute_session("2026-10-14"), five_minute_session("2026-10-15", first="09:45")])
+    out = resample_ohlcv(df, "30m")
+    second_day = out[out.index.normalize() == pd.Timestamp("2026-10-15", tz="America/New_York")]
+    assert second_day.index[0].strftime("%H:%M") == "09:45"
+    assert second_day.index[1].strftime("%H:%M") == "10:15"
+    assert out.index.tz == df.index.tz
+    assert out["Volume"].sum() == df["Volume"].sum()
+
+
+def test_resampling_to_the_same_interval_keeps_bars():
+    df = five_minute_session("2026-10-14")
+    out = resample_ohlcv(df, "5m")
+    pd.testing.assert_frame_equal(out, df, check_freq=False)
+
+
+def test_can_resample():
+    assert can_resample("5m", "15m")
+    assert can_resample("5m", "1h")
+    assert not can_resample("15m", "5m")
+    assert not can_resample("5m", "7m")
+    assert not can_resample("5m", "1d")
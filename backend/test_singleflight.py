@@ -0,0 +1,121 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from deadline import DeadlineExceeded, deadline_scope
+from singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flight, started, release = SingleFlight(), threading.Event(), threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return pd.DataFrame({"Close": [1.0, 2.0]})
+
+    with ThreadPoolExecutor(4) as pool:
+        leader = pool.submit(flight.do, "key", fetch)
+        started.wait(5)
+        followers = [pool.submit(flight.do, "key", fetch) for _ in range(3)]
+        while flight.coalesced < 3:
+            time.sleep(0.01)
+        release.set()
+        frames = [leader.result(5)] + [f.result(5) for f in followers]
+    assert len(calls) == 1 and flight.calls == 1
+    assert all(df["Close"].tolist() == [1.0, 2.0] for df in frames)
+    # Every caller of a shared call gets its own copy
+    assert len({id(df) for df in frames}) == 4
+    frames[0].loc[0, "Close"] = -1.0
+    assert frames[1].loc[0, "Close"] == 1.0
+    assert flight.in_flight() == 0
+
+
+def test_unshared_call_returns_the_result_itself():
+    flight, value = SingleFlight(), {"price": 1.0}
+    assert flight.do("key", lambda: value) is value
+
+
+def test_errors_reach_every_caller():
+    flight, started, release = SingleFlight(), threading.Event(), threading.Event()
+
+    def fail():
+        started.set()
+        release.wait(5)
+        raise ValueError("upstream down")
+
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(flight.do, "key", fail)
+        started.wait(5)
+        follower = pool.submit(flight.do, "key", fail)
+        while flight.coalesced < 1:
+            time.sleep(0.01)
+        release.set()
+        for future in (leader, follower):
+            with pytest.raises(ValueError):
+                future.result(5)
+
+
+def test_follower_gives_up_at_its_deadline():
+    flight, started, release = SingleFlight(), threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "done"
+
+    def follow():
+        with deadline_scope(0.1):
+            return flight.do("key", slow)
+
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(flight.do, "key", slow)
+        started.wait(5)
+        with pytest.raises(DeadlineExceeded):
+            pool.submit(follow).result(5)
+        release.set()
+        # The leader keeps going for anyone still waiting
+        assert leader.result(5) == "done"
+
+
+def test_async_callers_share_one_task_and_get_copies():
+    flight, calls = SingleFlight(), []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"price": 1.0}
+
+    async def main():
+        return await asyncio.gather(*(flight.do_async("key", fetch) for _ in range(3)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1 and flight.coalesced == 2
+    assert all(r == {"price": 1.0} for r in results) and len({id(r) for r in results}) == 3
+
+
+def test_async_follower_timeout_does_not_cancel_the_fetch():
+    flight = SingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.2)
+        return "done"
+
+    async def follow():
+        with deadline_scope(0.05):
+            return await flight.do_async("key", slow)
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do_async("key", slow))
+        await asyncio.sleep(0)
+        with pytest.raises(DeadlineExceeded):
+            await follow()
+        return await leader
+
+    assert asyncio.run(main()) == "done"
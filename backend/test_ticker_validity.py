@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+import ticker_validity as tv
+from tiered_cache import TieredCache
+
+
+@pytest.fixture
+def validity():
+    cache = TieredCache(name="test_validity")
+    cache._redis_down_until = float("inf")  # memory only
+    return tv.TickerValidity(cache)
+
+
+def test_invalid_symbol_errors():
+    assert tv.is_invalid_symbol_error(Exception("$ZZZZ: possibly delisted; no price data found"))
+    assert tv.is_invalid_symbol_error(Exception("Quote not found for symbol: ZZZZ"))
+    assert not tv.is_invalid_symbol_error(ConnectionError("Read timed out"))
+    assert not tv.is_invalid_symbol_error(Exception("Too Many Requests"))
+
+
+def test_unknown_symbols_are_let_through(validity):
+    assert validity.lookup("AAPL") is None
+    assert not validity.is_invalid("AAPL")
+    assert validity.rejected == 0
+
+
+def test_invalid_symbols_are_rejected_until_the_ttl(validity):
+    validity.mark_invalid("zzzz", "possibly delisted")
+    assert validity.is_invalid("ZZZZ") and validity.is_invalid("zzzz")
+    assert validity.rejected == 2 and validity.marked_invalid == 1
+    assert validity.cache.servable_for(tv.NAMESPACE, "ZZZZ") == pytest.approx(tv.INVALID_TTL, abs=5)
+
+
+def test_recently_valid_symbol_gets_the_short_recheck(validity):
+    validity.mark_valid("AAPL")
+    assert validity.lookup("AAPL") is True
+    validity.mark_invalid("AAPL", "no data")
+    assert validity.is_invalid("AAPL")
+    assert validity.cache.servable_for(tv.NAMESPACE, "AAPL") == pytest.approx(tv.RECHECK_TTL, abs=5)
+
+
+def test_async_helpers_share_the_entries(validity):
+    async def main():
+        await validity.mark_invalid_async("ZZZZ")
+        await validity.mark_valid_async("MSFT")
+        return await validity.is_invalid_async("ZZZZ"), await validity.is_invalid_async("MSFT")
+
+    assert asyncio.run(main()) == (True, False)
+    assert validity.is_invalid("ZZZZ") and validity.lookup("MSFT") is True
@@ -0,0 +1,151 @@
+import asyncio
+import threading
+
+import pytest
+
+import tiered_cache as tc
+from tiered_cache import FRESH, TieredCache
+
+
+class FakeRedis:
+    """Dict-backed stand-in for the redis_client helpers TieredCache calls."""
+
+    def __init__(self):
+        self.store = {}
+        self.down = False
+
+    def _check(self):
+        if self.down:
+            raise ConnectionError("redis down")
+
+    def get_many_sync(self, keys, raw=False):
+        self._check()
+        return [self.store.get(key) for key in keys]
+
+    def set_many_sync(self, mapping, ttl_seconds=300, raw=False):
+        self._check()
+        self.store.update(mapping)
+
+    def delete_many_sync(self, keys):
+        self._check()
+        for key in keys:
+            self.store.pop(key, None)
+
+    async def get_many(self, keys, raw=False):
+        return self.get_many_sync(keys, raw)
+
+    async def set_many(self, mapping, ttl_seconds=300, raw=False):
+        self.set_many_sync(mapping, ttl_seconds, raw)
+
+    async def delete_many(self, keys):
+        self.delete_many_sync(keys)
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+    for name in ("get_many_sync", "set_many_sync", "delete_many_sync", "get_many", "set_many", "delete_many"):
+        monkeypatch.setattr(tc, name, getattr(fake, name))
+    return fake
+
+
+def test_entries_are_shared_through_redis(redis):
+    writer, reader = TieredCache(name="test_writer"), TieredCache(name="test_reader")
+    writer.set("quote", "AAPL", {"price": 1.0})
+    assert reader.get("quote", "AAPL") == ({"price": 1.0}, FRESH)
+    assert asyncio.run(TieredCache(name="test_async").get_async("quote", "AAPL")) == ({"price": 1.0}, FRESH)
+
+
+def test_redis_outage_falls_back_to_memory(redis):
+    cache = TieredCache(name="test_outage")
+    redis.down = True
+    cache.set("quote", "AAPL", {"price": 1.0})
+    assert not cache.stats()["redis"]
+    assert cache.get("quote", "AAPL") == ({"price": 1.0}, FRESH)
+    assert cache.get("quote", "MSFT") == (None, None)
+
+
+def test_delete_removes_both_tiers(redis):
+    cache, other = TieredCache(name="test_delete"), TieredCache(name="test_delete_other")
+    cache.set("quote", "AAPL", {"price": 1.0})
+    cache.set("quote", "MSFT", {"price": 2.0})
+    cache.delete("quote", "AAPL")
+    asyncio.run(cache.delete_async("quote", "MSFT"))
+    assert redis.store == {}
+    assert cache.get("quote", "AAPL") == (None, None)
+    assert other.get("quote", "MSFT") == (None, None)
+
+
+def test_servable_for_counts_the_stale_window(redis):
+    cache = TieredCache(name="test_servable")
+    assert cache.servable_for("quote", "AAPL") is None
+    cache.set("quote", "AAPL", {"price": 1.0}, ttl=60)
+    fresh_ttl, stale_ttl = tc.NAMESPACES["quote"]
+    assert 60 + stale_ttl - 1 < cache.servable_for("quote", "AAPL") <= 60 + stale_ttl
+    assert cache.metrics.counts() == {}
+
+
+def age(cache, namespace, key, seconds):
+    """Move an LRU entry `seconds` into the past."""
+    value, fresh_until, stale_until, size = cache._lru[(namespace, key)]
+    cache._lru[(namespace, key)] = (value, fresh_until - seconds, stale_until - seconds, size)
+
+
+def test_stale_entry_is_served_while_one_refresh_runs(redis):
+    cache, release, calls = TieredCache(name="test_swr"), threading.Event(), []
+    cache.set("quote", "AAPL", 1)
+    age(cache, "quote", "AAPL", 400)
+
+    def load():
+        calls.append(1)
+        release.wait(5)
+        return 2
+
+    assert cache.get_or_load("quote", "AAPL", load) == 1
+    assert cache.get_or_load("quote", "AAPL", load) == 1  # the refresh is already running
+    release.set()
+    cache._executor.shutdown(wait=True)
+    assert calls == [1]
+    assert cache.get("quote", "AAPL") == (2, FRESH)
+
+
+def test_entry_past_the_stale_window_is_a_miss(redis):
+    cache = TieredCache(name="test_expired")
+    cache.set("quote", "AAPL", 1)
+    age(cache, "quote", "AAPL", sum(tc.NAMESPACES["quote"]) + 1)
+    redis.store.clear()
+    assert cache.get("quote", "AAPL") == (None, None)
+    assert cache.get_or_load("quote", "AAPL", lambda: 2) == 2
+
+
+def test_failed_refresh_keeps_the_stale_value(redis):
+    cache = TieredCache(name="test_refresh_fails")
+    cache.set("quote", "AAPL", 1)
+    age(cache, "quote", "AAPL", 400)
+
+    def down():
+        raise ConnectionError("upstream down")
+
+    assert cache.get_or_load("quote", "AAPL", down) == 1
+    cache._executor.shutdown(wait=True)
+    assert cache.get("quote", "AAPL") == (1, tc.STALE)
+
+
+def test_async_stale_entry_refreshes_in_the_background(redis):
+    cache, calls = TieredCache(name="test_swr_async"), []
+    cache.set("quote", "AAPL", 1)
+    age(cache, "quote", "AAPL", 400)
+
+    async def load():
+        calls.append(1)
+        return 2
+
+    async def main():
+        first = await cache.get_or_load_async("quote", "AAPL", load)
+        second = await cache.get_or_load_async("quote", "AAPL", load)
+        await asyncio.sleep(0.01)
+        return first, second
+
+    assert asyncio.run(main()) == (1, 1)
+    assert calls == [1]
+    assert cache.get("quote", "AAPL") == (2, FRESH)
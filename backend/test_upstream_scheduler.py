@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+import upstream_scheduler as us
+
+HOST = "bucket.test"
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    monkeypatch.setattr(us, "REDIS_AVAILABLE", False)
+    monkeypatch.setitem(us.HOST_LIMITS, HOST, (1.0, 10))
+    return us.UpstreamScheduler()
+
+
+def drain(scheduler, level):
+    taken = 0
+    while scheduler.try_acquire(HOST, level)[0]:
+        taken += 1
+    return taken
+
+
+def test_interactive_can_drain_the_bucket(scheduler):
+    assert drain(scheduler, us.INTERACTIVE) == 10
+    allowed, wait = scheduler.try_acquire(HOST, us.INTERACTIVE)
+    assert not allowed and 0 < wait <= 1.0
+
+
+def test_lower_classes_leave_their_reserve(scheduler):
+    # Background stops at half the bucket, batch at a fifth, interactive takes the rest
+    assert drain(scheduler, us.BACKGROUND) == 5
+    assert drain(scheduler, us.BATCH) == 3
+    assert drain(scheduler, us.INTERACTIVE) == 2
+
+
+def test_available_does_not_spend_tokens(scheduler):
+    for _ in range(20):
+        assert scheduler.available(HOST, us.INTERACTIVE)[0]
+    assert asyncio.run(scheduler.available_async(HOST, us.INTERACTIVE))[0]
+    assert drain(scheduler, us.INTERACTIVE) == 10
+
+
+def test_priority_context_sets_the_default_class(scheduler):
+    with us.priority(us.BACKGROUND):
+        assert drain(scheduler, None) == 5
+    assert scheduler.granted["background"] == 5 and scheduler.denied["background"] == 1
+
+
+def test_acquire_gives_up_after_the_max_wait(scheduler):
+    drain(scheduler, us.INTERACTIVE)
+    with pytest.raises(us.UpstreamThrottled):
+        scheduler.acquire(HOST, us.INTERACTIVE, timeout=0.1)
+    with pytest.raises(us.UpstreamThrottled):
+        asyncio.run(scheduler.acquire_async(HOST, us.INTERACTIVE, timeout=0.1))
+
+
+def test_reported_429_backs_off_every_class(scheduler):
+    scheduler.report_throttled(HOST, retry_after="7")
+    allowed, wait = scheduler.try_acquire(HOST, us.INTERACTIVE)
+    assert not allowed and 6 < wait <= 7
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP Error {status_code}")
+        self.response = type("Response", (), {"status_code": status_code})()
+
+
+def test_is_rate_limit_error():
+    assert us.is_rate_limit_error(HTTPError(429))
+    assert not us.is_rate_limit_error(HTTPError(404))
+    assert not us.is_rate_limit_error(ValueError("no data for symbol ABC429"))
+    assert us.is_rate_limit_error(Exception("Too Many Requests. Rate limited. Try after a while."))
+    if us.YFRateLimitError is not None:
+        assert us.is_rate_limit_error(us.YFRateLimitError())
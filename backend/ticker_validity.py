@@ -0,0 +1,107 @@
+"""
+Ticker validity index with negative caching.
+
+Typos, delisted symbols and autocomplete fragments would otherwise run the full
+upstream retry loop on every request. Symbols Yahoo explicitly rejects (one of
+yfinance's "missing ticker" errors, or the chart endpoint's "Not Found") are
+remembered as invalid and failed fast for INVALID_TICKER_TTL seconds; a plain
+empty answer is treated as transient. Symbols that recently returned data
+get a much shorter negative period, since an empty answer for them is more
+likely a transient upstream hiccup than a delisting.
+
+Entries live in their own TieredCache (validity_cache), so a burst of bad
+symbols can't evict quotes from data_cache's LRU; the index is still shared
+between workers through Redis when it is available.
+"""
+import os
+
+from tiered_cache import TieredCache
+
+try:
+    from yfinance.exceptions import YFTickerMissingError, YFPricesMissingError, YFTzMissingError
+    _MISSING_ERRORS = (YFTickerMissingError, YFPricesMissingError, YFTzMissingError)
+except ImportError:
+    _MISSING_ERRORS = ()
+
+INVALID_TTL = int(os.getenv("INVALID_TICKER_TTL", str(6 * 3600)))
+RECHECK_TTL = int(os.getenv("INVALID_TICKER_RECHECK_SECONDS", "300"))
+VALID_TTL = 24 * 3600
+VALIDITY_MAX_ENTRIES = int(os.getenv("TICKER_VALIDITY_MAX_ENTRIES", "20000"))
+NAMESPACE = "ticker_validity"
+
+_MISSING_MARKERS = (
+    "possibly delisted", "may be delisted", "no data found", "quote not found",
+    "no timezone found", "no price data found",
+)
+
+
+def is_invalid_symbol_error(e):
+    """True for upstream errors that mean the symbol doesn't exist, as opposed to a transient failure."""
+    if _MISSING_ERRORS and isinstance(e, _MISSING_ERRORS):
+        return True
+    message = str(e).lower()
+    return any(marker in message for marker in _MISSING_MARKERS)
+
+
+class TickerValidity:
+    def __init__(self, cache=None):
+        self.cache = cache if cache is not None else validity_cache
+        self.rejected = 0
+        self.marked_invalid = 0
+
+    def lookup(self, symbol):
+        """True / False when the symbol's validity is known, None otherwise."""
+        entry, state = self.cache.get(NAMESPACE, str(symbol).upper())
+        return None if state is None else entry.get("valid")
+
+    async def lookup_async(self, symbol):
+        entry, state = await self.cache.get_async(NAMESPACE, str(symbol).upper())
+        return None if state is None else entry.get("valid")
+
+    def _rejects(self, valid):
+        if valid is False:
+            self.rejected += 1
+            return True
+        return False
+
+    def is_invalid(self, symbol):
+        """Check before going upstream; counts the requests it turns away."""
+        return self._rejects(self.lookup(symbol))
+
+    async def is_invalid_async(self, symbol):
+        return self._rejects(await self.lookup_async(symbol))
+
+    def _invalid_entry(self, symbol, known, reason):
+        ttl = RECHECK_TTL if known else INVALID_TTL
+        self.marked_invalid += 1
+        print(f"[TICKER] {symbol} marked invalid for {ttl}s: {reason}")
+        return {"valid": False, "reason": str(reason)[:200]}, ttl
+
+    def mark_invalid(self, symbol, reason="no data"):
+        symbol = str(symbol).upper()
+        entry, ttl = self._invalid_entry(symbol, self.lookup(symbol), reason)
+        self.cache.set(NAMESPACE, symbol, entry, ttl=ttl)
+
+    async def mark_invalid_async(self, symbol, reason="no data"):
+        symbol = str(symbol).upper()
+        entry, ttl = self._invalid_entry(symbol, await self.lookup_async(symbol), reason)
+        await self.cache.set_async(NAMESPACE, symbol, entry, ttl=ttl)
+
+    def mark_valid(self, symbol):
+        symbol = str(symbol).upper()
+        if self.lookup(symbol) is not True:
+            self.cache.set(NAMESPACE, symbol, {"valid": True}, ttl=VALID_TTL)
+
+    async def mark_valid_async(self, symbol):
+        symbol = str(symbol).upper()
+        if await self.lookup_async(symbol) is not True:
+            await self.cache.set_async(NAMESPACE, symbol, {"valid": True}, ttl=VALID_TTL)
+
+    def stats(self):
+        return {"rejected": self.rejected, "marked_invalid": self.marked_invalid,
+                "invalid_ttl": INVALID_TTL, "recheck_ttl": RECHECK_TTL, "cache": self.cache.stats()}
+
+
+# Entries are a few bytes each, so this LRU can be much larger than data_cache's
+validity_cache = TieredCache(max_entries=VALIDITY_MAX_ENTRIES, name="validity_cache")
+ticker_validity = TickerValidity()
@@ -0,0 +1,318 @@
+"""
+Two-tier cache: a size-bounded in-process LRU in front of Redis.
+
+Entries belong to a namespace with its own freshness TTL and stale window.
+Within the TTL an entry is served as-is; past it, and until the stale window
+closes, it is still served immediately while one background refresh reloads
+it (stale-while-revalidate). Redis shares entries between workers; when it is
+unreachable the cache keeps working from the LRU alone.
+
+All timestamps are epoch seconds, so ages are never truncated the way
+timedelta.seconds is.
+"""
+import asyncio
+import contextvars
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from cache_metrics import register, tally_sizes
+from deadline import deadline_scope
+from redis_client import (
+    encode, decode, get_many, set_many, delete_many, get_many_sync, set_many_sync, delete_many_sync
+)
+
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "5000"))
+REDIS_RETRY_SECONDS = 30
+REFRESH_WORKERS = 4
+
+# namespace -> (fresh ttl, extra seconds a stale entry may still be served)
+NAMESPACES = {
+    "quote": (300, 3600),
+    "quote_bars": (300, 3600),  # batch quotes built from daily bars; kept apart from full quotes
+    "search_info": (300, 1800),
+    "ticker_validity": (24 * 3600, 0),  # callers pass their own ttl; never served stale
+    "indicator_state": (7 * 24 * 3600, 0),  # callers pass their own ttl; rebuilt from history on a miss
+}
+DEFAULT_NAMESPACE = (300, 600)
+
+FRESH, STALE = "fresh", "stale"
+_HEADER = struct.Struct("<dd")  # fresh_until, stale_until ahead of the encoded value
+
+
+def _pack(entry):
+    value, fresh_until, stale_until = entry[:3]
+    return _HEADER.pack(fresh_until, stale_until) + encode(value)
+
+
+def _unpack(raw):
+    fresh_until, stale_until = _HEADER.unpack_from(raw)
+    return decode(raw[_HEADER.size:]), fresh_until, stale_until
+
+
+class TieredCache:
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, prefix="cache", name="data_cache"):
+        self.max_entries = max_entries
+        self.prefix = prefix
+        self._lru = OrderedDict()  # (namespace, key) -> (value, fresh_until, stale_until, packed size)
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._executor = ThreadPoolExecutor(max_workers=REFRESH_WORKERS, thread_name_prefix="cache-refresh")
+        self._redis_down_until = 0.0
+        self.metrics = register(name, self.usage)
+
+    # --- Redis tier ---
+
+    def _redis_key(self, namespace, key):
+        return f"{self.prefix}:{namespace}:{key}"
+
+    def _redis_usable(self):
+        return time.time() >= self._redis_down_until
+
+    def _redis_failed(self, e):
+        print(f"[CACHE] Redis unavailable, serving from memory only for {REDIS_RETRY_SECONDS}s: {e}")
+        self._redis_down_until = time.time() + REDIS_RETRY_SECONDS
+
+    def _envelope(self, namespace, value, ttl):
+        fresh_ttl, stale_ttl = NAMESPACES.get(namespace, DEFAULT_NAMESPACE)
+        now = time.time()
+        fresh_until = now + (fresh_ttl if ttl is None else ttl)
+        return value, fresh_until, fresh_until + stale_ttl
+
+    # --- LRU tier ---
+
+    def _get_local(self, entry_key, now):
+        with self._lock:
+            entry = self._lru.get(entry_key)
+            if entry is None:
+                return None
+            if now >= entry[2]:
+                del self._lru[entry_key]
+                return None
+            self._lru.move_to_end(entry_key)
+            return entry
+
+    def _put_local(self, entry_key, entry):
+        with self._lock:
+            self._lru[entry_key] = entry
+            self._lru.move_to_end(entry_key)
+            while len(self._lru) > self.max_entries:
+                (evicted_namespace, _), _ = self._lru.popitem(last=False)
+                self.metrics.record(evicted_namespace, "evictions")
+
+    def _classify(self, namespace, entry, now):
+        if entry is None:
+            self.metrics.record(namespace, "misses")
+            return None, None
+        state = FRESH if now < entry[1] else STALE
+        self.metrics.record(namespace, "hits" if state == FRESH else "stale_hits")
+        return entry[0], state
+
+    # --- Public API ---
+
+    def _from_redis(self, namespace, keys, raws, now, found):
+        for key, raw in zip(keys, raws):
+            if raw is None:
+                continue
+            entry = (*_unpack(raw), len(raw))
+            if now < entry[2]:
+                self._put_local((namespace, key), entry)
+                found[key] = entry
+
+    def _entries(self, namespace, keys, now):
+        found = {key: self._get_local((namespace, key), now) for key in keys}
+        missing = [key for key, entry in found.items() if entry is None]
+        if missing and self._redis_usable():
+            try:
+                raws = get_many_sync([self._redis_key(namespace, k) for k in missing], raw=True)
+                self._from_redis(namespace, missing, raws, now, found)
+            except Exception as e:
+                self._redis_failed(e)
+        return found
+
+    def get_many(self, namespace, keys):
+        """{key: (value, "fresh" | "stale" | None)}; LRU first, then one MGET for the rest."""
+        now = time.time()
+        found = self._entries(namespace, keys, now)
+        return {key: self._classify(namespace, found[key], now) for key in keys}
+
+    def servable_for(self, namespace, key):
+        """Seconds until the entry can't be served even stale, or None if there is none. Not counted as a hit."""
+        now = time.time()
+        entry = self._entries(namespace, [key], now)[key]
+        return None if entry is None else entry[2] - now
+
+    async def get_many_async(self, namespace, keys):
+        now = time.time()
+        found = {key: self._get_local((namespace, key), now) for key in keys}
+        missing = [key for key, entry in found.items() if entry is None]
+        if missing and self._redis_usable():
+            try:
+                raws = await get_many([self._redis_key(namespace, k) for k in missing], raw=True)
+                self._from_redis(namespace, missing, raws, now, found)
+            except Exception as e:
+                self._redis_failed(e)
+        return {key: self._classify(namespace, found[key], now) for key in keys}
+
+    def get(self, namespace, key):
+        """Return (value, "fresh" | "stale") or (None, None) on a miss."""
+        return self.get_many(namespace, [key])[key]
+
+    async def get_async(self, namespace, key):
+        return (await self.get_many_async(namespace, [key]))[key]
+
+    def _stage(self, namespace, items, ttl):
+        staged, stale_until = {}, time.time()
+        for key, value in items.items():
+            entry = self._envelope(namespace, value, ttl)
+            packed = _pack(entry)
+            self._put_local((namespace, key), (*entry, len(packed)))
+            staged[self._redis_key(namespace, key)] = packed
+            stale_until = max(stale_until, entry[2])
+        # Redis drops the key once nothing could serve it any more, even stale
+        return staged, max(1, int(stale_until - time.time()))
+
+    def set_many(self, namespace, items, ttl=None):
+        """Store several entries; the Redis writes go out in one pipeline."""
+        staged, redis_ttl = self._stage(namespace, items, ttl)
+        if staged and self._redis_usable():
+            try:
+                set_many_sync(staged, redis_ttl, raw=True)
+            except Exception as e:
+                self._redis_failed(e)
+
+    async def set_many_async(self, namespace, items, ttl=None):
+        staged, redis_ttl = self._stage(namespace, items, ttl)
+        if staged and self._redis_usable():
+            try:
+                await set_many(staged, redis_ttl, raw=True)
+            except Exception as e:
+                self._redis_failed(e)
+
+    def set(self, namespace, key, value, ttl=None):
+        self.set_many(namespace, {key: value}, ttl)
+
+    async def set_async(self, namespace, key, value, ttl=None):
+        await self.set_many_async(namespace, {key: value}, ttl)
+
+    def delete(self, namespace, key):
+        """Drop an entry from both tiers, so no worker serves it again."""
+        with self._lock:
+            self._lru.pop((namespace, key), None)
+        if self._redis_usable():
+            try:
+                delete_many_sync([self._redis_key(namespace, key)])
+            except Exception as e:
+                self._redis_failed(e)
+
+    async def delete_async(self, namespace, key):
+        with self._lock:
+            self._lru.pop((namespace, key), None)
+        if self._redis_usable():
+            try:
+                await delete_many([self._redis_key(namespace, key)])
+            except Exception as e:
+                self._redis_failed(e)
+
+    def refresh_in_background(self, token, fn, *args):
+        """Run fn(*args) on the refresh pool unless a refresh for `token` is already running."""
+        with self._lock:
+            if token in self._refreshing:
+                return False
+            self._refreshing.add(token)
+
+        def _run():
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"[CACHE] Background refresh {token} failed, keeping stale value: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(token)
+
+        # Revalidation outlives the request that noticed the stale entry: keep its
+        # context (scheduler priority, ...) but drop its deadline, as _refresh_async does
+        with deadline_scope(None):
+            ctx = contextvars.copy_context()
+        self._executor.submit(ctx.run, _run)
+        return True
+
+    def get_or_load(self, namespace, key, loader, ttl=None):
+        """Serve from cache, revalidating stale entries in the background; load synchronously on a miss."""
+        value, state = self.get(namespace, key)
+        if state == FRESH:
+            return value
+        if state == STALE:
+            self.refresh_in_background((namespace, key), lambda: self.set(namespace, key, loader(), ttl))
+            return value
+        value = loader()
+        self.set(namespace, key, value, ttl)
+        return value
+
+    async def get_or_load_async(self, namespace, key, loader, ttl=None):
+        """Async get_or_load; `loader` is a coroutine function."""
+        value, state = await self.get_async(namespace, key)
+        if state == FRESH:
+            return value
+        if state == STALE:
+            token = (namespace, key)
+            with self._lock:
+                start = token not in self._refreshing
+                self._refreshing.add(token)
+            if start:
+                asyncio.create_task(self._refresh_async(token, namespace, key, loader, ttl))
+            return value
+        value = await loader()
+        await self.set_async(namespace, key, value, ttl)
+        return value
+
+    async def _refresh_async(self, token, namespace, key, loader, ttl):
+        try:
+            # Revalidation outlives the request that noticed the stale entry, so drop its deadline
+            with deadline_scope(None):
+                await self.set_async(namespace, key, await loader(), ttl)
+        except Exception as e:
+            print(f"[CACHE] Background refresh {token} failed, keeping stale value: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(token)
+
+    def usage(self):
+        with self._lock:
+            sizes = [(namespace, entry[3]) for (namespace, _), entry in self._lru.items()]
+        return tally_sizes(sizes)
+
+    # --- Snapshots (cache_snapshot.py) ---
+
+    def export(self):
+        """[(namespace, key, packed entry)] for every LRU entry, oldest first."""
+        with self._lock:
+            items = list(self._lru.items())
+        return [(namespace, key, _pack(entry)) for (namespace, key), entry in items]
+
+    def restore(self, items):
+        """Load exported entries into the LRU, dropping any whose stale window has closed."""
+        now, restored = time.time(), 0
+        for namespace, key, packed in items:
+            entry = (*_unpack(packed), len(packed))
+            if now < entry[2]:
+                self._put_local((namespace, key), entry)
+                restored += 1
+        return restored
+
+    def stats(self):
+        with self._lock:
+            size = len(self._lru)
+        return {
+            "entries": size,
+            "max_entries": self.max_entries,
+            "refreshing": len(self._refreshing),
+            "redis": self._redis_usable(),
+        }
+
+
+# Shared instance for quotes and other small JSON-able API payloads
+data_cache = TieredCache()
@@ -0,0 +1,314 @@
+"""
+Upstream request scheduler.
+
+Every request we make to a market-data or news host first takes a token from
+that host's bucket. Buckets live in Redis (one atomic Lua script per take) so
+all uvicorn workers share the same budget; if Redis is unreachable each
+process falls back to an in-memory bucket with the same parameters.
+
+Priority classes share a bucket but lower classes must leave a reserve in it:
+background warmers and news scrapes stop taking tokens once the bucket drops
+below half, batch work below a fifth, and interactive quote requests can drain
+it. A 429 from the host puts it into an exponential backoff window that every
+worker honours.
+"""
+import asyncio
+import contextlib
+import contextvars
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+import deadline as request_deadline
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    print("[WARNING] redis not available. Upstream scheduler runs per-process.")
+    REDIS_AVAILABLE = False
+
+try:
+    from yfinance.exceptions import YFRateLimitError
+except ImportError:
+    YFRateLimitError = None
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_RETRY_SECONDS = 30
+
+INTERACTIVE, BATCH, BACKGROUND = 0, 1, 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch", BACKGROUND: "background"}
+# Share of the bucket each class must leave for the classes above it
+RESERVE_FRACTION = {INTERACTIVE: 0.0, BATCH: 0.2, BACKGROUND: 0.5}
+# How long a caller of each class is willing to wait for a token
+MAX_WAIT_SECONDS = {INTERACTIVE: 2.0, BATCH: 5.0, BACKGROUND: 30.0}
+
+YAHOO = "yahoo"
+# host -> (tokens per second, burst capacity)
+HOST_LIMITS = {
+    YAHOO: (float(os.getenv("YAHOO_RATE_PER_SEC", "0.5")), int(os.getenv("YAHOO_BURST", "30"))),
+    "news.google.com": (0.5, 10),
+}
+DEFAULT_LIMIT = (2.0, 20)
+
+BACKOFF_BASE_SECONDS = 2.0
+BACKOFF_MAX_SECONDS = 120.0
+STRIKE_MEMORY_SECONDS = 600   # Consecutive 429s are forgotten after this long without one
+
+_priority = contextvars.ContextVar("upstream_priority", default=INTERACTIVE)
+
+# KEYS: bucket hash, backoff flag. ARGV: rate, capacity, now, reserve, consume.
+# Returns {allowed, wait_ms}.
+_TAKE_SCRIPT = """
+local pttl = redis.call('PTTL', KEYS[2])
+if pttl > 0 then return {0, pttl} end
+local rate, capacity, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local reserve, consume = tonumber(ARGV[4]), tonumber(ARGV[5])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed, wait_ms = 0, 0
+if tokens - 1 >= reserve then
+  allowed = 1
+  if consume == 1 then tokens = tokens - 1 end
+else
+  wait_ms = math.ceil((reserve + 1 - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return {allowed, wait_ms}
+"""
+
+
+def host_key(url_or_host):
+    """Bucket name for a URL or hostname; all Yahoo Finance hosts share one bucket."""
+    host = urlparse(url_or_host).netloc if "://" in str(url_or_host) else str(url_or_host)
+    host = host.split(":")[0].lower()
+    return YAHOO if host == YAHOO or host.endswith("yahoo.com") else host
+
+
+@contextlib.contextmanager
+def priority(level):
+    """Run the enclosed upstream calls (including asyncio.to_thread work) at `level`."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def _max_wait(level, timeout):
+    """How long to wait for a token: the class's max wait, never past the request's deadline budget."""
+    wait = MAX_WAIT_SECONDS[level] if timeout is None else timeout
+    left = request_deadline.remaining()
+    return wait if left is None else max(0.0, min(wait, left))
+
+
+class UpstreamThrottled(Exception):
+    def __init__(self, host, retry_after):
+        super().__init__(f"Upstream {host} throttled, retry after {retry_after:.1f}s")
+        self.host = host
+        self.retry_after = retry_after
+
+
+class _LocalBucket:
+    __slots__ = ("tokens", "ts")
+
+    def __init__(self, capacity):
+        self.tokens = float(capacity)
+        self.ts = time.time()
+
+
+class UpstreamScheduler:
+    def __init__(self, redis_url=REDIS_URL):
+        self.redis_url = redis_url
+        self._redis = None
+        self._script = None
+        self._redis_down_until = 0.0
+        self._redis_ok = False
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._backoff_until = {}
+        self._strikes = {}
+        self.granted = {name: 0 for name in PRIORITY_NAMES.values()}
+        self.denied = {name: 0 for name in PRIORITY_NAMES.values()}
+        self.throttled = {}
+
+    # --- Redis plumbing ---
+
+    def _client(self):
+        if not REDIS_AVAILABLE or time.time() < self._redis_down_until:
+            return None
+        if self._redis is None:
+            self._redis = redis.Redis.from_url(
+                self.redis_url, socket_timeout=0.2, socket_connect_timeout=0.2
+            )
+            self._script = self._redis.register_script(_TAKE_SCRIPT)
+        return self._redis
+
+    def _redis_failed(self, e):
+        print(f"[SCHEDULER] Redis unavailable, using per-process buckets for {REDIS_RETRY_SECONDS}s: {e}")
+        self._redis_down_until = time.time() + REDIS_RETRY_SECONDS
+
+    # --- Token bucket ---
+
+    def _take(self, host, level, consume=True):
+        """One attempt at a token: returns (allowed, seconds to wait before retrying)."""
+        rate, capacity = HOST_LIMITS.get(host, DEFAULT_LIMIT)
+        reserve = RESERVE_FRACTION[level] * capacity
+        client = self._client()
+        if client is not None:
+            try:
+                allowed, wait_ms = self._script(
+                    keys=[f"upstream:bucket:{host}", f"upstream:backoff:{host}"],
+                    args=[rate, capacity, time.time(), reserve, int(consume)],
+                    client=client,
+                )
+                self._redis_ok = True
+                return bool(allowed), int(wait_ms) / 1000.0
+            except redis.RedisError as e:
+                self._redis_failed(e)
+        return self._take_local(host, rate, capacity, reserve, consume)
+
+    async def _take_async(self, host, level, consume=True):
+        """_take for the event loop: the Redis round-trip runs in a worker thread."""
+        if self._client() is None:
+            return self._take(host, level, consume)
+        return await asyncio.to_thread(self._take, host, level, consume)
+
+    def _take_local(self, host, rate, capacity, reserve, consume):
+        with self._lock:
+            now = time.time()
+            backoff = self._backoff_until.get(host, 0) - now
+            if backoff > 0:
+                return False, backoff
+            bucket = self._buckets.setdefault(host, _LocalBucket(capacity))
+            bucket.tokens = min(capacity, bucket.tokens + max(0.0, now - bucket.ts) * rate)
+            bucket.ts = now
+            if bucket.tokens - 1 >= reserve:
+                if consume:
+                    bucket.tokens -= 1
+                return True, 0.0
+            return False, (reserve + 1 - bucket.tokens) / rate
+
+    def _record(self, level, allowed):
+        counter = self.granted if allowed else self.denied
+        counter[PRIORITY_NAMES[level]] += 1
+
+    def try_acquire(self, host=YAHOO, level=None):
+        """Take a token without waiting. Returns (allowed, retry_after_seconds)."""
+        level = _priority.get() if level is None else level
+        allowed, wait = self._take(host_key(host), level)
+        self._record(level, allowed)
+        return allowed, wait
+
+    def available(self, host=YAHOO, level=None):
+        """Would a request at `level` be admitted right now? Does not spend a token."""
+        level = _priority.get() if level is None else level
+        return self._take(host_key(host), level, consume=False)
+
+    async def available_async(self, host=YAHOO, level=None):
+        """available() for async handlers, without blocking the event loop on Redis."""
+        level = _priority.get() if level is None else level
+        return await self._take_async(host_key(host), level, consume=False)
+
+    def acquire(self, host=YAHOO, level=None, timeout=None):
+        """Blocking take for worker threads; raises UpstreamThrottled after the class's max wait."""
+        level = _priority.get() if level is None else level
+        host = host_key(host)
+        deadline = time.monotonic() + _max_wait(level, timeout)
+        while True:
+            allowed, wait = self._take(host, level)
+            if allowed:
+                self._record(level, True)
+                return
+            remaining = deadline - time.monotonic()
+            if wait > remaining:
+                self._record(level, False)
+                raise UpstreamThrottled(host, wait)
+            time.sleep(wait)
+
+    async def acquire_async(self, host=YAHOO, level=None, timeout=None):
+        """Event-loop take; waits with asyncio.sleep instead of blocking a thread."""
+        level = _priority.get() if level is None else level
+        host = host_key(host)
+        deadline = time.monotonic() + _max_wait(level, timeout)
+        while True:
+            allowed, wait = await self._take_async(host, level)
+            if allowed:
+                self._record(level, True)
+                return
+            remaining = deadline - time.monotonic()
+            if wait > remaining:
+                self._record(level, False)
+                raise UpstreamThrottled(host, wait)
+            await asyncio.sleep(wait)
+
+    # --- Adaptive backoff ---
+
+    def report_throttled(self, host=YAHOO, retry_after=None):
+        """Record a 429 from `host`; every worker pauses it for an exponentially growing window."""
+        host = host_key(host)
+        try:
+            retry_after = float(retry_after or 0)
+        except (TypeError, ValueError):
+            retry_after = 0.0  # HTTP-date form of Retry-After; fall back to our own schedule
+        client = self._client()
+        strikes = None
+        if client is not None:
+            try:
+                strikes_key = f"upstream:strikes:{host}"
+                pipe = client.pipeline()
+                pipe.incr(strikes_key)
+                pipe.expire(strikes_key, STRIKE_MEMORY_SECONDS)
+                strikes = pipe.execute()[0]
+            except redis.RedisError as e:
+                self._redis_failed(e)
+                client = None
+        with self._lock:
+            if strikes is None:
+                last_strike, count = self._strikes.get(host, (0, 0))
+                count = count + 1 if time.time() - last_strike < STRIKE_MEMORY_SECONDS else 1
+                self._strikes[host] = (time.time(), count)
+                strikes = count
+            self.throttled[host] = self.throttled.get(host, 0) + 1
+        delay = min(BACKOFF_MAX_SECONDS, max(retry_after, BACKOFF_BASE_SECONDS * 2 ** (strikes - 1)))
+        print(f"[SCHEDULER] 429 from {host} (strike {strikes}), backing off {delay:.0f}s")
+        if client is not None:
+            try:
+                client.set(f"upstream:backoff:{host}", 1, px=int(delay * 1000))
+                return
+            except redis.RedisError as e:
+                self._redis_failed(e)
+        with self._lock:
+            self._backoff_until[host] = time.time() + delay
+
+    def stats(self):
+        hosts = sorted(set(HOST_LIMITS) | set(self._buckets) | set(self.throttled))
+        return {
+            "backend": "redis" if self._redis_ok and time.time() >= self._redis_down_until else "local",
+            "granted": dict(self.granted),
+            "denied": dict(self.denied),
+            "throttled": dict(self.throttled),
+            "limits": {h: {"rate_per_sec": HOST_LIMITS.get(h, DEFAULT_LIMIT)[0],
+                           "burst": HOST_LIMITS.get(h, DEFAULT_LIMIT)[1]} for h in hosts},
+        }
+
+
+def is_rate_limit_error(error):
+    """Is `error` an upstream 429: YFRateLimitError, or an HTTP error carrying status 429?"""
+    if YFRateLimitError is not None and isinstance(error, YFRateLimitError):
+        return True
+    if getattr(error, "status_code", None) == 429:
+        return True
+    response = getattr(error, "response", None)
+    if getattr(response, "status_code", None) == 429:
+        return True
+    # Older yfinance raises a bare Exception with the HTTP reason phrase
+    return "too many requests" in str(error).lower()
+
+
+# Shared instance for the API, the async Yahoo client and the news workers
+upstream_scheduler = UpstreamScheduler()
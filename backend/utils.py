@@ -1,4 +1,6 @@
-import yfinance as yf
+from market_data_provider import market_data
+from info_cache import info_cache
+from market_calendar import market_status
 from datetime import datetime
 import json
 import pandas as pd
@@ -41,8 +43,8 @@ def format_large_number(number):
 def get_about_stock_info(ticker_symbol):
     """Get comprehensive information about a stock."""
     try:
-        stock = yf.Ticker(ticker_symbol)
-        info = stock.info
+        stock = market_data.ticker(ticker_symbol)
+        info = info_cache.get(ticker_symbol)
         
         if not info:
             return ("Info not available.", "N/A", "N/A", None, "N/A", {}, 
@@ -176,24 +178,11 @@ def validate_ticker_symbol(ticker):
     pattern = r'^[A-Za-z0-9.-]+$'
     return bool(re.match(pattern, cleaned))
 
-def get_market_status():
-    """Get current market status (open/closed)."""
+def get_market_status(symbol=""):
+    """OPEN/CLOSED for a symbol's exchange (the US market by default), from the trading calendar."""
     try:
-        # Check if US market is open (simplified logic)
-        now = datetime.now()
-        weekday = now.weekday()
-        hour = now.hour
-        
-        # US market hours: Monday-Friday, 9:30 AM - 4:00 PM EST
-        # This is a simplified check - in production you'd want to account for holidays
-        if weekday < 5:  # Monday = 0, Friday = 4
-            if 9 <= hour < 16:  # 9 AM to 4 PM
-                return "OPEN"
-            else:
-                return "CLOSED"
-        else:
-            return "CLOSED"
-    except:
+        return market_status(symbol)["status"]
+    except Exception:
         return "UNKNOWN"
 
 def calculate_risk_metrics(returns):
@@ -0,0 +1,233 @@
+"""
+Asyncio-native Yahoo Finance chart client.
+
+Talks to the v8 chart JSON endpoint over one shared, pooled httpx.AsyncClient
+instead of yfinance's blocking requests session, so a fetch waits on the event
+loop rather than holding a threadpool slot. `fetch_history` returns the same
+frame `Ticker.history()` does: auto-adjusted Open/High/Low/Close, Volume,
+Dividends and Stock Splits, indexed in the exchange time zone ("Date" for daily
+bars, "Datetime" for intraday).
+"""
+import asyncio
+import os
+import random
+
+import numpy as np
+import pandas as pd
+
+import deadline
+from circuit_breaker import yfinance_breaker
+from deadline import DeadlineExceeded
+from upstream_scheduler import upstream_scheduler, UpstreamThrottled, YAHOO
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    print("[WARNING] httpx not available. Async Yahoo client disabled.")
+    HTTPX_AVAILABLE = False
+
+CHART_URL = "https://query2.finance.yahoo.com/v8/finance/chart/{symbol}"
+MAX_CONNECTIONS = int(os.getenv("YAHOO_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE = int(os.getenv("YAHOO_MAX_KEEPALIVE", "20"))
+REQUEST_TIMEOUT = float(os.getenv("YAHOO_TIMEOUT", "25"))
+CONNECT_TIMEOUT = 10.0
+MAX_RETRIES = 3
+RETRY_STATUSES = {429, 500, 502, 503, 504}  # 429 waits on the scheduler's backoff instead of sleeping
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+
+_client = None
+_client_loop = None
+
+
+class YahooClientError(Exception):
+    """Transport or protocol failure; callers fall back to the threaded yfinance path."""
+
+
+class YahooSymbolNotFound(Exception):
+    """Yahoo's chart endpoint says the symbol doesn't exist (its 404 error body); no fallback helps."""
+
+
+def get_client():
+    """Shared AsyncClient, created on first use inside the running event loop."""
+    global _client, _client_loop
+    if not HTTPX_AVAILABLE:
+        raise YahooClientError("httpx is not installed")
+    loop = asyncio.get_running_loop()
+    # Pooled connections are bound to the loop that opened them (asyncio.run() wrappers make new loops)
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client_loop = loop
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(REQUEST_TIMEOUT, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_KEEPALIVE),
+            headers={"User-Agent": USER_AGENT, "Accept": "application/json"},
+        )
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+
+
+async def _get_json(url, params):
+    # Shares yfinance's breaker: both talk to Yahoo, so either noticing an outage fails both fast
+    return await yfinance_breaker.call_async(_request_json, url, params)
+
+
+async def _request_json(url, params):
+    client = get_client()
+    for attempt in range(MAX_RETRIES):
+        # Waits out the shared backoff window after a 429; raises UpstreamThrottled if too long
+        await upstream_scheduler.acquire_async(YAHOO)
+        try:
+            resp = await client.get(url, params=params, timeout=_request_timeout())
+        except httpx.HTTPError as e:
+            if attempt == MAX_RETRIES - 1:
+                raise YahooClientError(f"{type(e).__name__}: {e}") from e
+        else:
+            if resp.status_code == 404:
+                # Unknown symbol: Yahoo still answers with a JSON error body
+                return _json(resp, url)
+            if resp.status_code == 429:
+                retry_after = _retry_after(resp)
+                upstream_scheduler.report_throttled(YAHOO, retry_after)
+                if attempt == MAX_RETRIES - 1:
+                    raise UpstreamThrottled(YAHOO, retry_after or 0)
+                continue
+            if resp.status_code not in RETRY_STATUSES:
+                if resp.status_code >= 400:
+                    raise YahooClientError(f"HTTP {resp.status_code} for {url}")
+                return _json(resp, url)
+            if attempt == MAX_RETRIES - 1:
+                raise YahooClientError(f"HTTP {resp.status_code} for {url}")
+        # Same backoff shape as the requests Retry on YF_SESSION, plus jitter
+        pause = 0.5 * (2 ** attempt) + random.uniform(0, 0.25)
+        left = deadline.remaining()
+        if left is not None and left <= pause:
+            raise DeadlineExceeded("Yahoo chart retry")
+        await asyncio.sleep(pause)
+
+
+def _json(resp, url):
+    # An HTML or empty error page must take the yfinance fallback like any other protocol failure
+    try:
+        payload = resp.json()
+    except ValueError as e:
+        raise YahooClientError(f"Non-JSON HTTP {resp.status_code} body for {url}: {e}") from e
+    if not isinstance(payload, dict):
+        raise YahooClientError(f"Unexpected HTTP {resp.status_code} payload for {url}: {type(payload).__name__}")
+    return payload
+
+
+def _request_timeout():
+    # Each attempt gets at most what is left of the request's deadline budget
+    total = deadline.timeout(REQUEST_TIMEOUT)
+    return httpx.Timeout(total, connect=min(CONNECT_TIMEOUT, total))
+
+
+def _retry_after(resp):
+    try:
+        return float(resp.headers.get("Retry-After", 0))
+    except ValueError:
+        return None
+
+
+def _chart_params(period, interval, start):
+    params = {"interval": interval, "includePrePost": "false", "events": "div,splits"}
+    if start is not None:
+        params["period1"] = int(pd.Timestamp(start).timestamp())
+        params["period2"] = int(pd.Timestamp.now(tz="UTC").timestamp())
+    else:
+        params["range"] = period
+    return params
+
+
+def _events_series(events, name, value_fn, index):
+    out = pd.Series(0.0, index=index)
+    for event in (events or {}).get(name, {}).values():
+        ts = pd.Timestamp(event["date"], unit="s", tz="UTC").tz_convert(index.tz)
+        if index.name == "Date":
+            ts = ts.normalize()
+        pos = index.searchsorted(ts, side="right") - 1
+        if pos >= 0:
+            out.iloc[pos] = value_fn(event)
+    return out
+
+
+def parse_chart(payload, interval):
+    """Convert a v8 chart response into a Ticker.history()-shaped DataFrame."""
+    chart = (payload or {}).get("chart") or {}
+    results = chart.get("result") or []
+    if not results or not results[0].get("timestamp"):
+        return pd.DataFrame()
+    result = results[0]
+    meta = result.get("meta", {})
+    quote = (result.get("indicators", {}).get("quote") or [{}])[0]
+    daily = interval in ("1d", "5d", "1wk", "1mo", "3mo")
+
+    index = pd.to_datetime(result["timestamp"], unit="s", utc=True).tz_convert(
+        meta.get("exchangeTimezoneName") or "UTC"
+    )
+    if daily:
+        index = index.normalize()
+    index.name = "Date" if daily else "Datetime"
+
+    df = pd.DataFrame(
+        {col.capitalize(): np.asarray(quote.get(col) or [np.nan] * len(index), dtype="float64")
+         for col in ("open", "high", "low", "close", "volume")},
+        index=index,
+    )
+    adjclose = (result.get("indicators", {}).get("adjclose") or [{}])[0].get("adjclose")
+    if adjclose is not None:
+        # yfinance's default auto_adjust scales OHLC by adjclose / close
+        ratio = np.asarray(adjclose, dtype="float64") / df["Close"].to_numpy()
+        for col in ("Open", "High", "Low", "Close"):
+            df[col] = df[col] * ratio
+
+    events = result.get("events")
+    df["Dividends"] = _events_series(events, "dividends", lambda e: float(e["amount"]), index)
+    df["Stock Splits"] = _events_series(
+        events, "splits", lambda e: float(e["numerator"]) / float(e["denominator"]), index
+    )
+    df = df[~df.index.duplicated(keep="last")].dropna()
+    df["Volume"] = df["Volume"].astype("int64")
+    return df
+
+
+async def fetch_history(symbol, period="1y", interval="1d", start=None):
+    """Async equivalent of fetch_stock_data's upstream call; empty frame when Yahoo has no bars.
+
+    Raises YahooSymbolNotFound when Yahoo reports the symbol as unknown, so callers
+    can tell a missing ticker from a window that just has no bars.
+    """
+    payload = await _get_json(CHART_URL.format(symbol=symbol), _chart_params(period, interval, start))
+    error = (payload.get("chart") or {}).get("error")
+    if error and error.get("code") == "Not Found":
+        raise YahooSymbolNotFound(f"{symbol}: {error.get('description') or 'No data found, symbol may be delisted'}")
+    try:
+        df = parse_chart(payload, interval)
+    except (KeyError, TypeError, ValueError) as e:
+        raise YahooClientError(f"Unexpected chart payload for {symbol}: {e}") from e
+    df.attrs["ticker_symbol"] = symbol
+    return df
+
+
+async def fetch_many(symbols, period="1y", interval="1d", concurrency=MAX_CONNECTIONS):
+    """Fetch several symbols concurrently; failed symbols map to an empty frame."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _one(symbol):
+        async with semaphore:
+            try:
+                return symbol, await fetch_history(symbol, period, interval)
+            except (YahooClientError, YahooSymbolNotFound, UpstreamThrottled) as e:
+                print(f"[YAHOO CLIENT] {symbol} failed: {e}")
+                return symbol, pd.DataFrame()
+
+    return dict(await asyncio.gather(*(_one(s) for s in symbols)))